@@ -0,0 +1,84 @@
+"""Time the question changelist of the admin as the questions grow to 100k.
+
+The questions are added to one fresh SQLite database in steps, each with
+three choices, and ANALYZE runs after every step like a maintained
+database. Then the changelist is opened by a superuser through the test
+client: the first page, a deep page, the state filter and the prefix
+search. The milliseconds of every page should stay about the same at
+every step.
+
+Usage:
+    python benchmarks/admin_changelist.py --steps 1000 10000 100000 --repeat 5
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def run(args):
+    """Grow the questions step by step and time the changelist pages at every step."""
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'mysite.settings'
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.utils import timezone
+    from polls.models import Question, Choice
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    client = Client()
+    client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'bench-password'))
+    pages = {'first': {}, 'deep': {'p': 5}, 'open': {'state': 'open'}, 'search': {'q': 'question 12'}}
+    now = timezone.now()
+    result = {}
+    for total in args.steps:
+        start = Question.objects.count()
+        last = Question.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        Question.objects.bulk_create([
+            Question(question_text='Question %d?' % number, pub_date=now - datetime.timedelta(minutes=number),
+                     end_date=now + datetime.timedelta(minutes=number if number % 2 else -number))
+            for number in range(start, total)], batch_size=2000)
+        # SQLite does not return the ids of bulk_create, read them back.
+        question_ids = Question.objects.filter(pk__gt=last).values_list('pk', flat=True)
+        Choice.objects.bulk_create([Choice(question_id=question_id, choice_text='Choice %d' % number, votes=number)
+                                    for question_id in question_ids for number in range(3)], batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        timings = {}
+        for name, params in pages.items():
+            response = client.get('/admin/polls/question/', params)
+            assert response.status_code == 200, response.status_code
+            began = time.perf_counter()
+            for _ in range(args.repeat):
+                client.get('/admin/polls/question/', params)
+            timings[name] = round((time.perf_counter() - began) / args.repeat * 1000, 1)
+        result['%d questions (ms)' % total] = timings
+    return result
+
+
+def main():
+    """Run the benchmark on a temporary database and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(POLLS_SQLITE_PATH=os.path.join(directory, 'admin.sqlite3'),
+                          POLLS_AUDIT_WRITER='log')
+        print(json.dumps(run(args), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Benchmark the polls pages under WSGI (gunicorn) and ASGI (uvicorn).
+
+The script seeds a throwaway SQLite database, starts each server on a
+local port and drives the index, detail and results pages with many
+concurrent keep-alive clients. It prints requests/sec and latency
+percentiles of every page as JSON.
+
+Usage:
+    python benchmarks/asgi_vs_wsgi.py --clients 200 --seconds 10
+
+gunicorn and uvicorn are needed only for this script.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(values, fraction):
+    """Return the value at the fraction of the sorted values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def seed(env, questions, choices):
+    """Migrate the throwaway database and create the questions."""
+    code = (
+        "import datetime\n"
+        "import django\n"
+        "django.setup()\n"
+        "from django.core.management import call_command\n"
+        "from django.utils import timezone\n"
+        "from polls.models import Question, Choice\n"
+        "call_command('migrate', verbosity=0)\n"
+        "now = timezone.now()\n"
+        "for number in range(%d):\n"
+        "    question = Question.objects.create(question_text='Question %%d' %% number,\n"
+        "        pub_date=now - datetime.timedelta(days=1), end_date=now + datetime.timedelta(days=30))\n"
+        "    Choice.objects.bulk_create([Choice(question=question, choice_text='Choice %%d' %% c)\n"
+        "                                for c in range(%d)])\n"
+    ) % (questions, choices)
+    subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, env=env, check=True)
+
+
+def start_server(kind, port, workers, env):
+    """Start gunicorn or uvicorn on the port and wait until it answers."""
+    if kind == 'wsgi':
+        command = [sys.executable, '-m', 'gunicorn', 'mysite.wsgi', '-b', '127.0.0.1:%d' % port,
+                   '-w', str(workers), '--threads', '8', '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'mysite.asgi:application', '--port', str(port),
+                   '--workers', str(workers), '--log-level', 'warning', '--no-access-log']
+        env = dict(env, POLLS_ASYNC_VIEWS='1')
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            asyncio.run(fetch_once(port, '/polls/'))
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('%s server did not start' % kind)
+
+
+async def fetch_once(port, path):
+    """Send one GET request on a new connection."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        await request(reader, writer, path)
+    finally:
+        writer.close()
+
+
+async def request(reader, writer, path):
+    """Send one GET request on the keep-alive connection and read the whole response."""
+    writer.write(('GET %s HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: keep-alive\r\n\r\n' % path).encode())
+    await writer.drain()
+    status = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status.split()[1])
+
+
+async def client(port, paths, stop_at, latencies, errors):
+    """Request the paths in turn on one connection until the time is up."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    number = 0
+    try:
+        while time.perf_counter() < stop_at:
+            name, path = paths[number % len(paths)]
+            number += 1
+            start = time.perf_counter()
+            status = await request(reader, writer, path)
+            latencies[name].append(time.perf_counter() - start)
+            if status >= 400:
+                errors[name] += 1
+    finally:
+        writer.close()
+
+
+async def drive(port, paths, clients, seconds):
+    """Run the clients against the server and return the latencies and the errors of every page."""
+    latencies = {name: [] for name, path in paths}
+    errors = {name: 0 for name, path in paths}
+    stop_at = time.perf_counter() + seconds
+    await asyncio.gather(*[client(port, paths[number:] + paths[:number], stop_at, latencies, errors)
+                           for number in range(clients)])
+    return latencies, errors
+
+
+def report(latencies, errors, seconds):
+    """Summarize the latencies of every page."""
+    return {name: {'requests': len(values),
+                   'errors': errors[name],
+                   'req_per_sec': round(len(values) / seconds, 1),
+                   'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+                   'p99_ms': round(percentile(values, 0.99) * 1000, 2)}
+            for name, values in latencies.items()}
+
+
+def main():
+    """Run the benchmark for both servers and print the result."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--questions', type=int, default=50)
+    parser.add_argument('--choices', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='mysite.settings',
+                   POLLS_SQLITE_PATH=os.path.join(directory, 'bench.sqlite3'))
+        seed(env, args.questions, args.choices)
+        paths = [('polls:index', '/polls/'), ('polls:detail', '/polls/1/'), ('polls:results', '/polls/1/results/')]
+        result = {}
+        for kind in ('wsgi', 'asgi'):
+            process = start_server(kind, args.port, args.workers, env)
+            try:
+                latencies, errors = asyncio.run(drive(args.port, paths, args.clients, args.seconds))
+            finally:
+                process.terminate()
+                process.wait()
+            result[kind] = report(latencies, errors, args.seconds)
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
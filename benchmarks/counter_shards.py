@@ -0,0 +1,56 @@
+"""Measure concurrent votes on one choice with 1 and with 16 counter shards.
+
+Every vote of every process goes to the single choice of the single
+question, the worst case of a flash poll. The workers and the timing are
+the ones of db_profiles.py, only POLLS_VOTE_COUNTER_SHARDS changes.
+
+SQLite locks the whole database for every write, so the shards can not
+help there. The row locks of PostgreSQL are where one hot Choice.votes
+row serializes the votes, run it with --postgresql.
+
+Usage:
+    python benchmarks/counter_shards.py --processes 8 --votes 200
+    POLLS_DB_NAME=polls_bench POLLS_DB_USER=polls python benchmarks/counter_shards.py --postgresql
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import db_profiles
+
+
+def main():
+    """Run K=1 and K=16 in their own interpreters and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--votes', type=int, default=200, help='votes of every process')
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--postgresql', action='store_true', help='use the POLLS_DB_* PostgreSQL database')
+    parser.add_argument('--profile', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.questions = args.choices = 1
+
+    if args.profile:
+        print(json.dumps(db_profiles.run(json.loads(args.profile), args)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = {}
+        for shards in (1, args.shards):
+            env = {'POLLS_VOTE_COUNTER_SHARDS': str(shards)}
+            if args.postgresql:
+                env['POLLS_DB_ENGINE'] = 'postgresql'
+            else:
+                env.update(POLLS_DB_ENGINE='sqlite', POLLS_SQLITE_TUNED='1',
+                           POLLS_SQLITE_PATH=os.path.join(directory, 'shards%d.sqlite3' % shards))
+            output = subprocess.run([sys.executable, __file__, '--profile', json.dumps(env)] + sys.argv[1:],
+                                    check=True, stdout=subprocess.PIPE).stdout
+            result['K=%d' % shards] = json.loads(output.splitlines()[-1])
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Measure the concurrent vote throughput under every database profile.
+
+Every profile gets a fresh database with the questions and the users,
+then many processes vote at the same time like separate workers: every
+vote is one request that records the vote, reads the choices of the
+question and then ends, closing its connection unless CONN_MAX_AGE
+keeps it.
+
+Profiles:
+    sqlite-default   SQLite defaults, a new connection for every request
+    sqlite-tuned     WAL, synchronous=NORMAL, mmap, busy timeout and persistent connections
+    postgresql       the POLLS_DB_* environment, only with --postgresql
+
+Usage:
+    python benchmarks/db_profiles.py --processes 8 --votes 200
+    POLLS_DB_NAME=polls_bench POLLS_DB_USER=polls python benchmarks/db_profiles.py --postgresql
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup(env):
+    """Set the environment of the profile and set up Django in this process."""
+    os.environ.update(env)
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'mysite.settings'
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    django.setup()
+
+
+def seed(questions, choices, users):
+    """Create the questions, their choices and the users, and return the choice ids of every question."""
+    import datetime
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from polls.models import Question, Choice, Vote, ArchivedVote
+
+    Vote.objects.all().delete()
+    ArchivedVote.objects.all().delete()
+    Question.objects.all().delete()
+    User.objects.filter(username__startswith='voter').delete()
+    now = timezone.now()
+    Question.objects.bulk_create([Question(question_text='Question %d' % number, pub_date=now,
+                                           end_date=now + datetime.timedelta(days=1))
+                                  for number in range(questions)])
+    question_ids = list(Question.objects.values_list('id', flat=True))
+    Choice.objects.bulk_create([Choice(question_id=question_id, choice_text='Choice %d' % number)
+                                for question_id in question_ids for number in range(choices)])
+    User.objects.bulk_create([User(username='voter%d' % number, password='!') for number in range(users)])
+    choice_ids = {}
+    for choice_id, question_id in Choice.objects.values_list('id', 'question_id'):
+        choice_ids.setdefault(question_id, []).append(choice_id)
+    return choice_ids, list(User.objects.filter(username__startswith='voter').values_list('id', flat=True))
+
+
+def vote(plan):
+    """Cast the votes of one worker, every vote as one request, and return its latencies and errors."""
+    from django.db import close_old_connections, DatabaseError
+    from polls.models import Question, Choice
+    from polls.tally import record_vote
+    from django.contrib.auth.models import User
+
+    latencies, errors = [], 0
+    for user_id, question_id, choice_id in plan:
+        start = time.perf_counter()
+        try:
+            record_vote(User(pk=user_id), Question(pk=question_id), Choice(pk=choice_id))
+            list(Choice.objects.filter(question_id=question_id).values_list('votes', flat=True))
+        except DatabaseError:
+            errors += 1
+        finally:
+            close_old_connections()
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+def run(env, args):
+    """Seed the database of the profile and measure its concurrent votes."""
+    from django.core.management import call_command
+    from django.db import connections
+
+    setup(env)
+    call_command('migrate', verbosity=0)
+    choice_ids, user_ids = seed(args.questions, args.choices, args.processes * args.votes)
+    connections.close_all()
+    question_ids = sorted(choice_ids)
+    plan = [(user_id, question_ids[number % len(question_ids)],
+             choice_ids[question_ids[number % len(question_ids)]][number % args.choices])
+            for number, user_id in enumerate(user_ids)]
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(args.processes, initializer=setup, initargs=(env,)) as pool:
+        pool.map(abs, range(args.processes))
+        start = time.perf_counter()
+        results = pool.map(vote, [plan[number::args.processes] for number in range(args.processes)])
+        elapsed = time.perf_counter() - start
+    latencies = sorted(latency for worker, errors in results for latency in worker)
+    return {'votes': len(latencies), 'errors': sum(errors for worker, errors in results),
+            'votes_per_sec': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+            'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2)}
+
+
+def main():
+    """Run every profile in its own interpreter and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--votes', type=int, default=200, help='votes of every process')
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--choices', type=int, default=4)
+    parser.add_argument('--postgresql', action='store_true', help='also run the POLLS_DB_* PostgreSQL profile')
+    parser.add_argument('--profile', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(run(json.loads(args.profile), args)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        profiles = {
+            'sqlite-default': {'POLLS_DB_ENGINE': 'sqlite', 'POLLS_SQLITE_TUNED': '0', 'POLLS_DB_CONN_MAX_AGE': '0',
+                               'POLLS_SQLITE_PATH': os.path.join(directory, 'default.sqlite3')},
+            'sqlite-tuned': {'POLLS_DB_ENGINE': 'sqlite', 'POLLS_SQLITE_TUNED': '1', 'POLLS_DB_CONN_MAX_AGE': '60',
+                             'POLLS_SQLITE_PATH': os.path.join(directory, 'tuned.sqlite3')},
+        }
+        if args.postgresql:
+            profiles['postgresql'] = {'POLLS_DB_ENGINE': 'postgresql'}
+        result = {}
+        for name, env in profiles.items():
+            # Every profile runs in a fresh interpreter, the settings are read once.
+            output = subprocess.run([sys.executable, __file__, '--profile', json.dumps(env)] + sys.argv[1:],
+                                    check=True, stdout=subprocess.PIPE).stdout
+            result[name] = json.loads(output.splitlines()[-1])
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Time the render of the index with and without the cached template fragments.
+
+The script builds a throwaway SQLite database with the given number of
+open questions, lists all of them on one index page and times the render
+of the page for an anonymous and a logged in user, first with the
+fragments turned off (a dummy 'template_fragments' cache) and then with
+a warm local memory cache.
+
+Usage:
+    python benchmarks/fragment_cache.py --questions 1000 --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def seed(questions):
+    """Create the open questions and the user."""
+    import datetime
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from polls.models import Question
+
+    now = timezone.now()
+    Question.objects.bulk_create([Question(question_text='Question %d' % number,
+                                           pub_date=now - datetime.timedelta(minutes=number),
+                                           end_date=now + datetime.timedelta(days=number % 2 * 2 - 1))
+                                  for number in range(questions)])
+    return User.objects.create_user('bench', password='!')
+
+
+def measure(user, repeat):
+    """Time the render of the index of the anonymous and the logged in user, in ms per page."""
+    from django.contrib.auth.models import AnonymousUser
+    from django.contrib.sessions.backends.cache import SessionStore
+    from django.test import RequestFactory
+    from polls.views import IndexView
+
+    result = {}
+    for name, visitor in (('anonymous', AnonymousUser()), ('logged in', user)):
+        request = RequestFactory().get('/polls/')
+        request.user = visitor
+        request.session = SessionStore()
+        view = IndexView.as_view()
+        view(request).render()
+        render = 0.0
+        for number in range(repeat):
+            response = view(request)
+            start = time.perf_counter()
+            response.render()
+            render += time.perf_counter() - start
+        result[name] = round(render * 1000 / repeat, 3)
+    return result
+
+
+def main():
+    """Seed the database and print the render times with and without the fragments."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DJANGO_SETTINGS_MODULE'] = 'mysite.settings'
+        os.environ['POLLS_SQLITE_PATH'] = os.path.join(directory, 'bench.sqlite3')
+        sys.path.insert(0, str(BASE_DIR))
+        import django
+        django.setup()
+        from django.conf import settings
+        from django.core.management import call_command
+        from django.test import override_settings
+
+        call_command('migrate', verbosity=0)
+        user = seed(args.questions)
+        result = {'questions': args.questions}
+        for name, backend in (('without fragments', 'django.core.cache.backends.dummy.DummyCache'),
+                              ('with fragments', 'django.core.cache.backends.locmem.LocMemCache')):
+            caches = dict(settings.CACHES, template_fragments={'BACKEND': backend, 'LOCATION': 'fragments',
+                                                               'OPTIONS': {'MAX_ENTRIES': 20000}})
+            with override_settings(CACHES=caches, POLLS_INDEX_PAGE_SIZE=args.questions):
+                result[name] = measure(user, args.repeat)
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
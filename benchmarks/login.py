@@ -0,0 +1,99 @@
+"""Measure the logins a second on account/login/ under every auth profile.
+
+Every profile gets a fresh SQLite database with the users, then every
+user logs in through the test client with a POST to account/login/ and
+opens the index once logged in. The logins and the logged in pages are
+timed apart, the first is bound by the password hasher and the second by
+the session and the user lookups.
+
+Profiles:
+    before           database sessions, the user read on every request, the login time saved in the login
+    fast-path        cached_db sessions, the cached user and the login time saved after the response
+    signed-cookies   the fast path with the sessions in the cookie
+    fast-path+hasher the fast path with POLLS_PBKDF2_ITERATIONS=--iterations, only with --iterations
+
+Usage:
+    python benchmarks/login.py --users 50
+    python benchmarks/login.py --users 50 --iterations 100000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def run(env, args):
+    """Set up Django with the profile, log every user in and time it."""
+    os.environ.update(env)
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'mysite.settings'
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    django.setup()
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from polls.blocking import _executor
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    password = make_password('bench-password')
+    User.objects.bulk_create([User(username='voter%d' % number, password=password) for number in range(args.users)])
+    logins = pages = 0.0
+    for number in range(args.users):
+        client = Client()
+        start = time.perf_counter()
+        response = client.post('/account/login/', {'username': 'voter%d' % number, 'password': 'bench-password'})
+        logins += time.perf_counter() - start
+        assert response.status_code == 302, response.status_code
+        start = time.perf_counter()
+        for _ in range(args.pages):
+            client.get('/polls/')
+        pages += time.perf_counter() - start
+    _executor.shutdown(wait=True)
+    return {'logins_per_sec': round(args.users / logins, 1),
+            'pages_per_sec': round(args.users * args.pages / pages, 1)}
+
+
+def main():
+    """Run every profile in its own interpreter and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=5, help='index pages of every logged in user')
+    parser.add_argument('--iterations', type=int, help='also run the fast path with these PBKDF2 iterations')
+    parser.add_argument('--profile', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(run(json.loads(args.profile), args)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        fast = {'POLLS_SESSION_ENGINE': 'cached_db', 'POLLS_USER_CACHE_TIMEOUT': '300', 'POLLS_DEFER_LAST_LOGIN': '1'}
+        profiles = {
+            'before': {'POLLS_SESSION_ENGINE': 'db', 'POLLS_USER_CACHE_TIMEOUT': '0', 'POLLS_DEFER_LAST_LOGIN': '0'},
+            'fast-path': fast,
+            'signed-cookies': dict(fast, POLLS_SESSION_ENGINE='signed_cookies'),
+        }
+        if args.iterations:
+            profiles['fast-path+hasher'] = dict(fast, POLLS_PBKDF2_ITERATIONS=str(args.iterations))
+        result = {}
+        for name, env in profiles.items():
+            env = dict(env, POLLS_SQLITE_PATH=os.path.join(directory, '%s.sqlite3' % name),
+                       POLLS_AUDIT_WRITER='log', DJANGO_DEBUG='0')
+            # Every profile runs in a fresh interpreter, the settings are read once.
+            output = subprocess.run([sys.executable, __file__, '--profile', json.dumps(env)] + sys.argv[1:],
+                                    check=True, stdout=subprocess.PIPE).stdout
+            result[name] = json.loads(output.splitlines()[-1])
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Show the query plans and timings of the vote lookups before and after the Vote indexes.
+
+The script builds a throwaway SQLite database at migration 0012 (no
+Vote constraint or composite index), fills the Vote table, explains and
+times the two lookups of the vote path, then migrates to 0014 and does
+the same again.
+
+Usage:
+    python benchmarks/vote_index_plans.py --users 10000 --questions 100
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def seed(users, questions, choices):
+    """Create the users, the questions, the choices and one vote of every user on every question."""
+    import datetime
+    from django.contrib.auth.models import User
+    from django.db import connection, transaction
+    from django.utils import timezone
+    from polls.models import Question, Choice
+
+    now = timezone.now()
+    with transaction.atomic():
+        User.objects.bulk_create([User(username='user%d' % number, password='!') for number in range(users)],
+                                 batch_size=5000)
+        Question.objects.bulk_create([Question(question_text='Question %d' % number, pub_date=now,
+                                               end_date=now + datetime.timedelta(days=1))
+                                      for number in range(questions)])
+        question_ids = list(Question.objects.values_list('id', flat=True))
+        Choice.objects.bulk_create([Choice(question_id=question_id, choice_text='Choice %d' % number)
+                                    for question_id in question_ids for number in range(choices)])
+        choice_ids = {}
+        for choice_id, question_id in Choice.objects.values_list('id', 'question_id'):
+            choice_ids.setdefault(question_id, []).append(choice_id)
+        user_ids = list(User.objects.values_list('id', flat=True))
+        with connection.cursor() as cursor:
+            for user_id in user_ids:
+                cursor.executemany(
+                    'INSERT INTO polls_vote (user_id, question_id, selected_choice_id) VALUES (%s, %s, %s)',
+                    [(user_id, question_id, choice_ids[question_id][user_id % choices])
+                     for question_id in question_ids])
+    return user_ids, question_ids, choice_ids
+
+
+def measure(user_ids, question_ids, choice_ids, repeat):
+    """Explain and time the vote lookup of a user and the vote count of a choice."""
+    from polls.models import Vote
+
+    user_id, question_id = user_ids[len(user_ids) // 2], question_ids[len(question_ids) // 2]
+    choice_id = choice_ids[question_id][0]
+    lookups = {
+        'vote of the user': lambda: Vote.objects.filter(user_id=user_id, question_id=question_id),
+        'votes of the choice': lambda: Vote.objects.filter(question_id=question_id, selected_choice_id=choice_id),
+    }
+    result = {}
+    for name, queryset in lookups.items():
+        start = time.perf_counter()
+        for number in range(repeat):
+            queryset().count()
+        result[name] = {'plan': queryset().explain(),
+                        'ms_per_query': round((time.perf_counter() - start) * 1000 / repeat, 3)}
+    return result
+
+
+def main():
+    """Seed the database and print the plans before and after the migration."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--choices', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DJANGO_SETTINGS_MODULE'] = 'mysite.settings'
+        os.environ['POLLS_SQLITE_PATH'] = os.path.join(directory, 'bench.sqlite3')
+        sys.path.insert(0, str(BASE_DIR))
+        import django
+        django.setup()
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        call_command('migrate', 'polls', '0012', verbosity=0)
+        ids = seed(args.users, args.questions, args.choices)
+        result = {'votes': args.users * args.questions, 'before': measure(*ids, args.repeat)}
+        call_command('migrate', 'polls', verbosity=0)
+        result['after'] = measure(*ids, args.repeat)
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from polls.stream import ResultsStreamApp  # noqa: E402 (needs the apps loaded by get_asgi_application)
+
+application = ResultsStreamApp(django_application)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 # from decouple import config
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -24,26 +25,32 @@ SECRET_KEY = ')#5zw=gttx(q#y1lze)3^141+$=7)_3_i0fd+6_^v(bn5(bd4='
 
 # SECURITY WARNING: don't run with debug turned on in production!
 # DEBUG = config('DEBUG', default=False, cast=bool)
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
 
+# django.contrib.auth is ready before the polls, which replace its
+# receiver of the login time, and the polls come before the admin, whose
+# templates they override.
 INSTALLED_APPS = [
-    'polls.apps.PollsConfig',
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
+    'polls.apps.PollsConfig',
+    'django.contrib.admin',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
 ]
 
 MIDDLEWARE = [
+    'polls.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'polls.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'polls.middleware.ReplicaStickinessMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -53,18 +60,26 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'mysite.urls'
 
+_TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'polls.context_processors.fragment_cache',
+                'polls.context_processors.live_results',
             ],
+            # Templates are compiled once per process unless DEBUG is on.
+            'loaders': _TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', _TEMPLATE_LOADERS)],
         },
     },
 ]
@@ -75,13 +90,203 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
-DATABASES = {
+# The profile is set from the environment. POLLS_DB_ENGINE=postgresql uses
+# PostgreSQL with persistent connections, set POLLS_DB_PGBOUNCER=1 when the
+# connections go through a PgBouncer pool in transaction mode. Otherwise
+# SQLite is used, tuned by POLLS_SQLITE_PRAGMAS on every new connection.
+POLLS_DB_ENGINE = os.environ.get('POLLS_DB_ENGINE', 'sqlite')
+
+if POLLS_DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POLLS_DB_NAME', 'polls'),
+            'USER': os.environ.get('POLLS_DB_USER', ''),
+            'PASSWORD': os.environ.get('POLLS_DB_PASSWORD', ''),
+            'HOST': os.environ.get('POLLS_DB_HOST', ''),
+            'PORT': os.environ.get('POLLS_DB_PORT', ''),
+            # Seconds a connection is kept for the next requests of the thread.
+            'CONN_MAX_AGE': int(os.environ.get('POLLS_DB_CONN_MAX_AGE', 60)),
+            # A transaction pooler can not keep the cursors of iterator() open.
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('POLLS_DB_PGBOUNCER', '') == '1',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('POLLS_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('POLLS_DB_CONN_MAX_AGE', 60)),
+        }
+    }
+
+# Read replicas of the default database as a comma separated list, SQLite
+# paths or PostgreSQL hosts. polls.routers.ReplicaRouter sends the reads to
+# them and every write to the default database. The SQLite copies are
+# refreshed with the sync_replicas command.
+POLLS_DB_REPLICAS = [replica for replica in os.environ.get('POLLS_DB_REPLICAS', '').split(',') if replica]
+for _number, _replica in enumerate(POLLS_DB_REPLICAS, 1):
+    DATABASES['replica%d' % _number] = dict(DATABASES['default'], **{
+        'HOST' if POLLS_DB_ENGINE == 'postgresql' else 'NAME': _replica,
+        # The tests read the replicas through the test database.
+        'TEST': {'MIRROR': 'default'},
+    })
+POLLS_READ_REPLICAS = ['replica%d' % number for number in range(1, len(POLLS_DB_REPLICAS) + 1)]
+DATABASE_ROUTERS = ['polls.routers.ReplicaRouter']
+# Seconds the reads of a session stay on the default database after it writes.
+POLLS_REPLICA_STICKY_SECONDS = 5
+
+# PRAGMAs run on every new SQLite connection, set POLLS_SQLITE_TUNED=0 to
+# keep the SQLite defaults. WAL lets the reads go on during a write.
+POLLS_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Milliseconds a write waits for the lock of another writer.
+    'busy_timeout': 20000,
+    'temp_store': 'MEMORY',
+} if os.environ.get('POLLS_SQLITE_TUNED', '1') == '1' else {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ku-polls',
+        # Room for the version stamp and the fragments of every listed question.
+        'OPTIONS': {'MAX_ENTRIES': 20000},
     }
 }
 
+# Cache alias that keeps the version stamps and the results snapshots of the polls.
+POLLS_CACHE = 'default'
+# Keep the previous votes of the user in the session under the version of
+# their votes, False reads them on every page.
+POLLS_CACHE_PREVIOUS_VOTES = True
+# Seconds to keep a results snapshot.
+POLLS_RESULTS_TIMEOUT = 300
+# Rows above which the admin changelist estimates the count of an unfiltered table.
+POLLS_ADMIN_EXACT_COUNT = 10000
+# Choices of a question edited inline in the admin, a question with more shows them read-only a page at a time.
+POLLS_ADMIN_INLINE_CHOICES = 50
+# Most buckets of a vote time series, a longer poll gets wider buckets.
+POLLS_ANALYTICS_MAX_BUCKETS = 10000
+
+# Seconds to keep a rendered template fragment, the fragments are keyed by
+# the version of their question. Point the 'template_fragments' cache alias
+# elsewhere to keep them apart from the other cached data.
+POLLS_FRAGMENT_TIMEOUT = 300
+# Freeze the results of a closed question the first time they are read.
+POLLS_FREEZE_ON_READ = True
+
+# Part of the ETags of the poll pages, set a new POLLS_RELEASE when a deploy
+# changes the templates so the browsers do not keep the old pages.
+POLLS_ETAG_VERSION = os.environ.get('POLLS_RELEASE', '')
+
+# Number of the questions on one page of the index.
+POLLS_INDEX_PAGE_SIZE = 20
+
+# 'sync' writes every vote in its request, 'buffered' keeps the votes in a
+# write-behind buffer that is flushed in batches.
+POLLS_VOTE_WRITE_MODE = 'sync'
+# Number of pending votes that triggers an early flush.
+POLLS_VOTE_BUFFER_SIZE = 500
+# Seconds between two flushes of the vote buffer.
+POLLS_VOTE_FLUSH_INTERVAL = 1.0
+# Directory of the journal of the vote buffer. Every buffered vote is
+# fsynced there before the user is answered, and the next worker that
+# starts writes the votes of a killed one. Without it the votes accepted
+# since the last flush, up to POLLS_VOTE_FLUSH_INTERVAL seconds of them,
+# are lost when a worker is killed or recycled before its exit flush.
+POLLS_VOTE_JOURNAL_DIR = os.environ.get('POLLS_VOTE_JOURNAL_DIR') or None
+# Counter shards of every choice, a vote adds to a random one so the votes
+# of a hot choice do not wait for the same row. 1 counts in Choice.votes.
+# Run the compact_counters command periodically to fold them back in.
+POLLS_VOTE_COUNTER_SHARDS = int(os.environ.get('POLLS_VOTE_COUNTER_SHARDS', 1))
+
+# Serve the async views, set POLLS_ASYNC_VIEWS=1 when running mysite.asgi.
+POLLS_ASYNC_VIEWS = os.environ.get('POLLS_ASYNC_VIEWS', '') == '1'
+# Size of the thread pool that runs the blocking database work of the async views.
+POLLS_DB_THREADS = int(os.environ.get('POLLS_DB_THREADS', 8))
+
+# Broker that fans the vote deltas out to the live results streams.
+POLLS_PUBSUB_BACKEND = 'polls.pubsub.LocalBroker'
+# Most updates a second sent to one results stream, bursts are summed.
+POLLS_STREAM_MAX_RATE = 2
+# Seconds between two keep-alive comments of an idle results stream.
+POLLS_STREAM_KEEPALIVE = 15
+# Open the live results stream on the results pages, only mysite.asgi serves
+# it. Set POLLS_LIVE_RESULTS=1 when running it, it follows POLLS_ASYNC_VIEWS.
+POLLS_LIVE_RESULTS = os.environ.get('POLLS_LIVE_RESULTS', '1' if POLLS_ASYNC_VIEWS else '') == '1'
+# Seconds a client that opens the stream url under WSGI waits before asking again.
+POLLS_STREAM_FALLBACK_RETRY = 30
+
+# Number of the last requests of every url name kept for the metrics.
+POLLS_METRICS_WINDOW = 1000
+# Requests slower than this many seconds are logged, None turns it off.
+POLLS_SLOW_REQUEST_SECONDS = 0.5
+
+# Cache alias that keeps the rate limit buckets and the last votes of the vote endpoint.
+POLLS_ADMISSION_CACHE = 'default'
+# Token buckets of the vote endpoint as (burst, tokens refilled a second),
+# None turns one off. Set POLLS_VOTE_RATE_LIMITS=0 to turn both off.
+_rate_limits = os.environ.get('POLLS_VOTE_RATE_LIMITS', '1') == '1'
+POLLS_VOTE_USER_RATE = (10, 1.0) if _rate_limits else None
+POLLS_VOTE_IP_RATE = (100, 20.0) if _rate_limits else None
+# Answer the same re-vote from the admission cache without any write. None
+# turns it on only when POLLS_ADMISSION_CACHE is shared by the workers, a
+# per-process cache misses the votes written by the other workers.
+POLLS_VOTE_DEDUPE = None
+# Number of the reverse proxies in front of the site that append the client
+# to X-Forwarded-For. 0 trusts no X-Forwarded-For and uses REMOTE_ADDR.
+POLLS_TRUSTED_PROXIES = int(os.environ.get('POLLS_TRUSTED_PROXIES', 0))
+# Seconds a vote is remembered to answer the same re-vote without any write.
+POLLS_VOTE_DEDUPE_TIMEOUT = 600
+
+# Writer of the audit trail of the logins, the logouts and the votes: 'log'
+# for the polls logger, 'jsonl' for rotating files or 'model' for AuditEvent.
+POLLS_AUDIT_WRITER = os.environ.get('POLLS_AUDIT_WRITER', 'log')
+POLLS_AUDIT_FILE = os.environ.get('POLLS_AUDIT_FILE', BASE_DIR / 'audit.jsonl')
+# Bytes of one JSONL file before it is rotated, and the rotated files kept.
+POLLS_AUDIT_MAX_BYTES = 10 * 1024 * 1024
+POLLS_AUDIT_BACKUP_COUNT = 5
+# Audit records waiting for the writer, more are dropped and counted.
+POLLS_AUDIT_QUEUE_SIZE = 10000
+# Most audit records written at once.
+POLLS_AUDIT_BATCH_SIZE = 100
+
+
+# Sessions and authentication
+# The sessions are kept in the database, set POLLS_SESSION_ENGINE=signed_cookies
+# to keep them in the cookie or cached_db to read them from the cache. Only
+# use cached_db with a default cache shared by all the workers, a per-process
+# cache keeps a logged out session in the other workers.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('POLLS_SESSION_ENGINE', 'db')
+
+AUTHENTICATION_BACKENDS = ['polls.auth.CachedModelBackend']
+# Seconds the user of a session is cached, 0 reads it on every request.
+# Only set it with a POLLS_CACHE shared by all the workers, a per-process
+# cache keeps a changed password or a deactivation in the other workers.
+POLLS_USER_CACHE_TIMEOUT = int(os.environ.get('POLLS_USER_CACHE_TIMEOUT', 0))
+# Save the login time after the response instead of in the login request,
+# in the POLLS_DEFER_THREADS threads of the deferred work. Once
+# POLLS_DEFER_QUEUE writes wait, the next ones run in the login request.
+POLLS_DEFER_LAST_LOGIN = os.environ.get('POLLS_DEFER_LAST_LOGIN', '1') == '1'
+POLLS_DEFER_THREADS = int(os.environ.get('POLLS_DEFER_THREADS', 1))
+POLLS_DEFER_QUEUE = 1000
+
+PASSWORD_HASHERS = [
+    'polls.auth.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+# Iterations of the new PBKDF2 hashes, the default of Django when unset. The
+# stored hashes are rehashed with them on the next login of their users.
+POLLS_PBKDF2_ITERATIONS = int(os.environ.get('POLLS_PBKDF2_ITERATIONS', 0)) or None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -120,4 +325,18 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
 STATIC_URL = '/static/'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+# collectstatic copies the files here, StaticFilesMiddleware serves them
+# from here once they are collected.
+STATIC_ROOT = os.environ.get('POLLS_STATIC_ROOT', BASE_DIR / 'staticfiles')
+# Without DEBUG the collected files get content-hashed names and gzip and
+# brotli variants, so run collectstatic with the same DJANGO_DEBUG. DEBUG
+# serves the files of the apps as they are, without a manifest.
+if not DEBUG:
+    STATICFILES_STORAGE = 'polls.staticfiles.CompressedManifestStaticFilesStorage'
+# Seconds the browsers cache the static files without a hashed name.
+POLLS_STATIC_MAX_AGE = 60
+# Serve the collected files from the Django process, turn it off when a
+# web server in front serves STATIC_ROOT.
+POLLS_SERVE_STATIC = os.environ.get('POLLS_SERVE_STATIC', '1') == '1'
 LOGIN_REDIRECT_URL = '/polls/'
@@ -13,12 +13,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
+polls_urls = 'polls.async_urls' if settings.POLLS_ASYNC_VIEWS else 'polls.urls'
+
 urlpatterns = [
-    path('', include('polls.urls'), name="Home"),
-    path('polls/', include('polls.urls')),
+    path('', include(polls_urls), name="Home"),
+    path('polls/', include(polls_urls)),
     path('admin/', admin.site.urls),
     path('account/', include('django.contrib.auth.urls'))
 ]
@@ -1,6 +1,48 @@
 """Module for using in admin."""
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from .models import Question, Choice
+from .pagination import EstimatedCountPaginator
+from .transfer import EXPORT_HEADERS, encode, export_rows
+
+
+def stream_export(kind, queryset, anonymous=False):
+    """Return the streaming CSV response of the export of the selected questions."""
+    rows = export_rows(kind, queryset, anonymous=anonymous)
+    response = StreamingHttpResponse(encode(rows, EXPORT_HEADERS[kind], 'csv'), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="polls-%s.csv"' % kind
+    return response
+
+
+class StateListFilter(admin.SimpleListFilter):
+    """Class for filtering the questions by their state in SQL."""
+
+    title = 'state'
+    parameter_name = 'state'
+
+    def lookups(self, request, model_admin):
+        """Return the states to filter by."""
+        return [('published', 'Published'), ('open', 'Open for voting'), ('closed', 'Closed'),
+                ('recent', 'Published recently')]
+
+    def queryset(self, request, queryset):
+        """Return the questions in the selected state."""
+        if self.value() == 'published':
+            return queryset.published()
+        if self.value() == 'open':
+            return queryset.open_for_voting()
+        if self.value() == 'closed':
+            return queryset.closed()
+        if self.value() == 'recent':
+            return queryset.recent()
+        return queryset
+
+
+def inline_choices():
+    """Return the most choices of a question edited inline, and the choices of a page of the read-only inline."""
+    return getattr(settings, 'POLLS_ADMIN_INLINE_CHOICES', 50)
 
 
 class ChoiceInline(admin.TabularInline):
@@ -10,6 +52,43 @@ class ChoiceInline(admin.TabularInline):
     extra = 3
 
 
+class ChoicePageInline(admin.TabularInline):
+    """Class for the read-only choices of a question with many of them, a page at a time.
+
+    ...
+
+    The page is picked by ?choices_page= and kept as page for the template.
+    """
+
+    model = Choice
+    fields = ('choice_text', 'tally')
+    readonly_fields = ('choice_text', 'tally')
+    template = 'admin/polls/choice_page_inline.html'
+    can_delete = False
+    extra = 0
+    page = None
+
+    def has_add_permission(self, request, obj=None):
+        """Return False, the choices of a large question are added elsewhere."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Return False, the inline only shows the choices."""
+        return False
+
+    def get_queryset(self, request):
+        """Return the choices of the page of the question with their tallies."""
+        object_id = request.resolver_match.kwargs['object_id']
+        choice_ids = Choice.objects.filter(question_id=object_id).order_by('pk').values_list('pk', flat=True)
+        self.page = Paginator(choice_ids, inline_choices()).get_page(request.GET.get('choices_page'))
+        return super().get_queryset(request).with_tally().filter(pk__in=list(self.page)).order_by('pk')
+
+    def tally(self, obj):
+        """Return the votes of the choice with its counter shards."""
+        return obj.tally
+    tally.short_description = 'votes'
+
+
 class QuestionAdmin(admin.ModelAdmin):
     """Class for question in admin."""
 
@@ -19,9 +98,51 @@ class QuestionAdmin(admin.ModelAdmin):
          'fields': ('pub_date', 'end_date'), 'classes': ['collapse']}),
     ]
     inlines = [ChoiceInline]
-    list_display = ('question_text', 'pub_date', 'was_published_recently')
-    list_filter = ['pub_date']
-    search_fields = ['question_text']
+    list_display = ('question_text', 'pub_date', 'published_recently', 'is_open', 'total_votes')
+    list_filter = [StateListFilter, 'pub_date']
+    search_fields = ['^question_text']
+    ordering = ('-pub_date', '-pk')
+    sortable_by = ('pub_date',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['export_results', 'export_votes']
+
+    def get_queryset(self, request):
+        """Annotate the state and the votes of every question, so the list reads the columns."""
+        return super().get_queryset(request).with_is_open().with_published_recently().with_total_votes()
+
+    def get_inlines(self, request, obj):
+        """Show the choices of a question with many of them read-only, a page at a time."""
+        if obj is not None and obj.choice_set.count() > inline_choices():
+            return [ChoicePageInline]
+        return self.inlines
+
+    def published_recently(self, obj):
+        """Return the annotated published_recently of the question."""
+        return obj.published_recently
+    published_recently.boolean = True
+    published_recently.short_description = 'Published recently?'
+
+    def is_open(self, obj):
+        """Return the annotated is_open of the question."""
+        return obj.is_open
+    is_open.boolean = True
+    is_open.short_description = 'Open for voting?'
+
+    def total_votes(self, obj):
+        """Return the annotated total_votes of the question."""
+        return obj.total_votes
+    total_votes.short_description = 'Votes'
+
+    def export_results(self, request, queryset):
+        """Export the choices and tallies of the selected questions as CSV."""
+        return stream_export('questions', queryset)
+    export_results.short_description = 'Export results of selected questions as CSV'
+
+    def export_votes(self, request, queryset):
+        """Export the anonymized votes of the selected questions as CSV."""
+        return stream_export('votes', queryset, anonymous=True)
+    export_votes.short_description = 'Export anonymized votes of selected questions as CSV'
 
 
 admin.site.register(Question, QuestionAdmin)
@@ -0,0 +1,136 @@
+"""Module for admitting the vote requests before they reach the database."""
+import math
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseRedirect
+from django.urls import reverse
+
+
+PROCESS_CACHES = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+
+def get_admission_cache():
+    """Return the cache that keeps the rate limit buckets and the last votes, set by POLLS_ADMISSION_CACHE."""
+    return caches[getattr(settings, 'POLLS_ADMISSION_CACHE', 'default')]
+
+
+def dedupe_enabled():
+    """
+    Return whether the same re-vote may be answered from the last vote in the admission cache.
+
+    POLLS_VOTE_DEDUPE turns it on or off, None turns it on only when the
+    admission cache is shared by all the workers. A per-process cache
+    does not see the votes written by the other workers, so it could
+    swallow a vote that changes the stored one back.
+    """
+    dedupe = getattr(settings, 'POLLS_VOTE_DEDUPE', None)
+    if dedupe is None:
+        alias = getattr(settings, 'POLLS_ADMISSION_CACHE', 'default')
+        return settings.CACHES[alias]['BACKEND'] not in PROCESS_CACHES
+    return dedupe
+
+
+def voted_key(user_id, question_id):
+    """Return the cache key of the last admitted vote of the user on the question."""
+    return 'polls:voted:%d:%d' % (user_id, question_id)
+
+
+def take_token(key, rate, now=None):
+    """
+    Take one token from the token bucket.
+
+    The bucket holds up to burst tokens and gets refill tokens back every
+    second. It is read and written without a lock, so under concurrent
+    requests the limit is approximate, which is enough to stop floods.
+
+    Parameters
+    ----------
+    key : str
+        cache key of the bucket
+    rate : tuple
+        (burst, refill) of the bucket
+    now : float, optional
+        the current time in seconds
+
+    Return:
+    0 if a token is taken, otherwise the seconds until the next token.
+    """
+    burst, refill = rate
+    now = time.time() if now is None else now
+    cache = get_admission_cache()
+    tokens, updated = cache.get(key) or (burst, now)
+    tokens = min(burst, tokens + (now - updated) * refill)
+    if tokens < 1:
+        return (1 - tokens) / refill
+    cache.set(key, (tokens - 1, now), timeout=math.ceil(burst / refill) + 1)
+    return 0
+
+
+def too_many_requests(retry_after):
+    """Return the 429 response that asks the client to retry after the seconds."""
+    response = HttpResponse('Too many votes, please try again later.', status=429, content_type='text/plain')
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admit_vote(request, question_id, ip):
+    """
+    Decide whether the vote request may reach the database.
+
+    A re-vote of the same choice as the stored vote is answered from the
+    cache without any write, when dedupe_enabled(). Otherwise the request
+    takes a token
+    from the bucket of its user, set by POLLS_VOTE_USER_RATE, and from the
+    bucket of its IP, set by POLLS_VOTE_IP_RATE.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The vote request of the logged in user
+    question_id : int
+        id of the voted question
+    ip : str
+        the client ip of the request
+
+    Return:
+    the response that answers the request, None if it is admitted.
+    """
+    choice = request.POST.get('choice')
+    if choice is not None and dedupe_enabled():
+        same_vote = get_admission_cache().get(voted_key(request.user.pk, question_id)) == choice
+    else:
+        same_vote = False
+    if same_vote:
+        return HttpResponseRedirect(reverse('polls:results', args=(question_id,)))
+    limits = (('polls:rate:user:%s' % request.user.pk, getattr(settings, 'POLLS_VOTE_USER_RATE', None)),
+              ('polls:rate:ip:%s' % ip, getattr(settings, 'POLLS_VOTE_IP_RATE', None)))
+    for key, rate in limits:
+        if rate is not None:
+            retry_after = take_token(key, rate)
+            if retry_after:
+                return too_many_requests(retry_after)
+    return None
+
+
+def vote_admitted(user_id, question_id, choice_id):
+    """
+    Remember the vote of the user, so the same re-vote is short-circuited.
+
+    It is called by polls.tally.record_vote() once the vote is committed,
+    and by the vote buffer for the vote it will write, so the cache follows
+    the vote that is stored whichever worker wrote it.
+
+    Parameters
+    ----------
+    user_id : int
+        id of the user who voted
+    question_id : int
+        id of the voted question
+    choice_id : int
+        id of the selected choice
+    """
+    if not dedupe_enabled():
+        return
+    get_admission_cache().set(voted_key(user_id, question_id), str(choice_id),
+                              getattr(settings, 'POLLS_VOTE_DEDUPE_TIMEOUT', 600))
@@ -0,0 +1,188 @@
+"""Module for the vote time series of the questions, aggregated with NumPy."""
+from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import FloatField, Func
+from django.utils import timezone
+from .cache import get_cache, question_version
+from .models import Choice, Vote, ArchivedVote
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def analytics_key(question_id, version, bucket):
+    """Return the cache key of the time series of the question."""
+    return 'polls:analytics:%d:%d:%d' % (question_id, version, bucket)
+
+
+class EpochSeconds(Func):
+    """Class of the database function of a datetime as epoch seconds, NULL stays NULL."""
+
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        """Return the SQL of SQLite, whose %f are the seconds with the milliseconds."""
+        template = ("(CAST(strftime('%%%%s', %(expressions)s) AS INTEGER)"
+                    " + CAST(strftime('%%%%f', %(expressions)s) AS REAL)"
+                    " - CAST(strftime('%%%%S', %(expressions)s) AS INTEGER))")
+        return self.as_sql(compiler, connection, template=template, **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        """Return the SQL of MySQL."""
+        return self.as_sql(compiler, connection, template='UNIX_TIMESTAMP(%(expressions)s)', **extra_context)
+
+
+def vote_columns(question_id, chunk_size=5000):
+    """
+    Read the votes of the question, with the archived ones, as columns.
+
+    The times are selected as epoch seconds by the database, and every
+    chunk of the votes is turned into an array at once, so no datetime is
+    built for a vote.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the question
+    chunk_size : int
+        number of the votes fetched at a time
+
+    Return:
+    tuple of the arrays of the choice ids, the cast times and the change
+    times as epoch seconds and the switches of every vote. The times are
+    NaN for the votes never changed and the votes cast before the times
+    were recorded.
+    """
+    columns = {'cast': EpochSeconds('cast_at'), 'changed': EpochSeconds('changed_at')}
+    fields = ('selected_choice_id', 'cast', 'changed', 'switches')
+    votes = Vote.objects.filter(question_id=question_id).annotate(**columns).values_list(*fields).union(
+        ArchivedVote.objects.filter(question_id=question_id).annotate(**columns).values_list(*fields), all=True)
+    rows = votes.iterator(chunk_size=chunk_size)
+    chunks = [np.empty((0, 4))]
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        # None becomes NaN in a float array.
+        chunks.append(np.array(chunk, dtype=float))
+    table = np.concatenate(chunks)
+    return table[:, 0].astype(np.int64), table[:, 1], table[:, 2], table[:, 3].astype(np.int64)
+
+
+def build_series(choice_ids, choices, cast_at, changed_at, switches, bucket, max_buckets=10000):
+    """
+    Bucket the votes into the time series of every choice.
+
+    The series starts at the bucket of the first vote cast. A vote counts
+    for its current choice from the time it was cast, or last switched, so
+    the votes of every bucket sum to the current total of the timed votes.
+    The votes cast before migration 0018 recorded the times and never
+    switched since have no time and are only counted as untimed. Only the
+    last switch of a vote has a time, so all the switches of a vote are
+    counted in the bucket of its last one.
+
+    Parameters
+    ----------
+    choice_ids : ndarray
+        sorted ids of the choices of the question
+    choices : ndarray
+        choice id of every vote
+    cast_at : ndarray
+        cast time of every vote, epoch seconds
+    changed_at : ndarray
+        last change time of every vote, NaN if never changed
+    switches : ndarray
+        times every vote was switched
+    bucket : int
+        seconds of one bucket
+    max_buckets : int
+        most buckets of the series, the bucket is widened to keep under it
+
+    Return:
+    dict of the bucket seconds, the bucket start times, the votes, the cumulative votes and
+    the cumulative share of every choice per bucket, the switches per
+    bucket and the number of the untimed votes.
+    """
+    switched = ~np.isnan(changed_at)
+    counted_at = np.where(switched, changed_at, cast_at)
+    timed = ~np.isnan(counted_at)
+    untimed = int((~timed).sum())
+    choices, cast_at, counted_at, switches = choices[timed], cast_at[timed], counted_at[timed], switches[timed]
+    if not len(counted_at):
+        return {'bucket': bucket, 'starts': np.empty(0), 'votes': np.zeros((0, len(choice_ids)), dtype=np.int64),
+                'cumulative': np.zeros((0, len(choice_ids)), dtype=np.int64),
+                'share': np.zeros((0, len(choice_ids))), 'switches': np.zeros(0, dtype=np.int64),
+                'untimed': untimed}
+    first = np.fmin(cast_at, counted_at).min()
+    span = counted_at.max() - first
+    if span // bucket >= max_buckets:
+        bucket = int(span // (max_buckets - 1)) + 1
+    start = np.floor(first / bucket) * bucket
+    rows = ((counted_at - start) // bucket).astype(np.int64)
+    buckets = int(rows.max()) + 1
+    columns = np.searchsorted(choice_ids, choices)
+    votes = np.bincount(rows * len(choice_ids) + columns,
+                        minlength=buckets * len(choice_ids)).reshape(buckets, len(choice_ids))
+    cumulative = votes.cumsum(axis=0)
+    totals = cumulative.sum(axis=1, keepdims=True)
+    share = np.divide(cumulative, totals, out=np.zeros(cumulative.shape), where=totals > 0)
+    switches = np.bincount(rows, weights=switches, minlength=buckets).astype(np.int64)
+    return {'bucket': bucket, 'starts': start + np.arange(buckets) * bucket, 'votes': votes, 'cumulative': cumulative,
+            'share': share, 'switches': switches, 'untimed': untimed}
+
+
+def get_series(question, bucket=60):
+    """
+    Get the vote time series of the question, cached under its version.
+
+    The series of a closed question is cached without a timeout, a vote
+    or an edit that bumps its version, like a reopening, makes the next
+    call build it again. The series of an open one is kept for
+    POLLS_RESULTS_TIMEOUT seconds.
+
+    Parameters
+    ----------
+    question : Question
+        the question
+    bucket : int
+        seconds of one bucket
+
+    Raises
+    ------
+    ImproperlyConfigured
+        If NumPy is not installed.
+
+    Return:
+    the JSON ready dict of the series.
+    """
+    if np is None:
+        raise ImproperlyConfigured('The vote analytics need NumPy, install numpy.')
+    cache = get_cache()
+    key = analytics_key(question.id, question_version(question.id), bucket)
+    series = cache.get(key)
+    if series is not None:
+        return series
+    choice_rows = list(Choice.objects.filter(question_id=question.id).order_by('pk').values_list('id', 'choice_text'))
+    choice_ids = np.array([choice_id for choice_id, text in choice_rows], dtype=np.int64)
+    arrays = build_series(choice_ids, *vote_columns(question.id), bucket,
+                          getattr(settings, 'POLLS_ANALYTICS_MAX_BUCKETS', 10000))
+    series = {
+        'question_id': question.id,
+        'bucket_seconds': arrays['bucket'],
+        'choices': [{'id': choice_id, 'text': text} for choice_id, text in choice_rows],
+        'buckets': [datetime.fromtimestamp(start, dt_timezone.utc).isoformat() for start in arrays['starts']],
+        'votes': arrays['votes'].tolist(),
+        'cumulative': arrays['cumulative'].tolist(),
+        'share': arrays['share'].round(4).tolist(),
+        'switches': arrays['switches'].tolist(),
+        'untimed': arrays['untimed'],
+        'total': int(arrays['votes'].sum()) + arrays['untimed'],
+    }
+    closed = question.end_date < timezone.now()
+    cache.set(key, series, None if closed else getattr(settings, 'POLLS_RESULTS_TIMEOUT', 300))
+    return series
@@ -1,8 +1,21 @@
 """Module for using in apps."""
 from django.apps import AppConfig
+from django.core import checks
 
 
 class PollsConfig(AppConfig):
     """Class for app configuration."""
 
     name = 'polls'
+
+    def ready(self):
+        """Connect the signal receivers of the polls and register their checks."""
+        from django.contrib.auth.signals import user_logged_in
+        from . import signals
+        from .checks import check_user_cache, check_auth_order
+        # Replace the receiver of auth that saves the login time in the
+        # login request, auth is ready before the polls.
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
+        user_logged_in.connect(signals.update_last_login, dispatch_uid='polls_update_last_login')
+        checks.register(check_auth_order)
+        checks.register(check_user_cache)
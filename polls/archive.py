@@ -0,0 +1,134 @@
+"""Module for freezing the final results of the closed questions."""
+from itertools import islice
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .cache import bump_question_version
+from .models import Question, Choice, Vote, ArchivedResult, ArchivedVote
+from .tally import compact_counters
+
+
+@transaction.atomic
+def freeze_question(question_id, archive_votes=False, chunk_size=2000):
+    """
+    Freeze the final results of the closed question.
+
+    The counter shards of the choices are compacted, then the votes of
+    every choice are read once under a lock and kept in one
+    ArchivedResult row, which serves the results of the question from
+    then on. Freezing a frozen question changes nothing.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the closed question
+    archive_votes : bool
+        also move the Vote rows of the question to ArchivedVote
+    chunk_size : int
+        number of the votes moved at a time
+
+    Raises
+    ------
+    ValueError
+        If the question has not closed yet.
+
+    Return:
+    the ArchivedResult of the question.
+    """
+    question = Question.objects.select_for_update().get(pk=question_id)
+    if question.end_date >= timezone.now():
+        raise ValueError('The question is not closed.')
+    archived = ArchivedResult.objects.filter(question=question).first()
+    if archived is None:
+        compact_counters([question_id])
+        rows = [list(row) for row in Choice.objects.select_for_update().filter(question=question)
+                .order_by('pk').values_list('id', 'choice_text', 'votes')]
+        archived = ArchivedResult.objects.create(question=question, total=sum(row[2] for row in rows), choices=rows)
+        transaction.on_commit(lambda: bump_question_version(question_id))
+    if archive_votes:
+        archive_question_votes(question_id, chunk_size)
+    return archived
+
+
+def archive_question_votes(question_id, chunk_size=2000):
+    """
+    Move the Vote rows of the frozen question to ArchivedVote in chunks.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the frozen question
+    chunk_size : int
+        number of the votes moved at a time
+
+    Return:
+    number of the moved votes.
+    """
+    votes = Vote.objects.filter(question_id=question_id).order_by('pk')
+    rows = votes.values_list('pk', 'user_id', 'selected_choice_id', 'cast_at', 'changed_at',
+                             'switches').iterator(chunk_size=chunk_size)
+    moved = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        ArchivedVote.objects.bulk_create([ArchivedVote(user_id=user_id, question_id=question_id,
+                                                       selected_choice_id=choice_id, cast_at=cast_at,
+                                                       changed_at=changed_at, switches=switches)
+                                          for pk, user_id, choice_id, cast_at, changed_at, switches in chunk])
+        moved += len(chunk)
+    votes.delete()
+    return moved
+
+
+@transaction.atomic
+def thaw_question(question_id):
+    """
+    Undo the freeze of a question that can vote again.
+
+    The ArchivedResult is dropped and the archived votes are moved back to
+    the Vote table, so the live counters and votes serve it again.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the reopened question
+
+    Return:
+    True if the question was frozen.
+    """
+    deleted, _ = ArchivedResult.objects.filter(question_id=question_id).delete()
+    archived = ArchivedVote.objects.filter(question_id=question_id)
+    Vote.objects.bulk_create([Vote(user_id=vote.user_id, question_id=question_id,
+                                   selected_choice_id=vote.selected_choice_id, cast_at=vote.cast_at,
+                                   changed_at=vote.changed_at, switches=vote.switches)
+                              for vote in archived.iterator()],
+                             ignore_conflicts=True)
+    archived.delete()
+    if deleted:
+        transaction.on_commit(lambda: bump_question_version(question_id))
+    return bool(deleted)
+
+
+def freeze_closed(now=None, archive_votes=False):
+    """
+    Freeze every closed question that is not frozen yet, or still has votes to archive.
+
+    Parameters
+    ----------
+    now : datetime, optional
+        the time the questions are closed at
+    archive_votes : bool
+        also move the votes of the frozen questions to ArchivedVote
+
+    Return:
+    list of the ids of the frozen questions.
+    """
+    pending = Q(archivedresult__isnull=True)
+    if archive_votes:
+        pending |= Q(vote__isnull=False)
+    question_ids = list(Question.objects.closed(now).filter(pending).order_by('pk')
+                        .values_list('pk', flat=True).distinct())
+    for question_id in question_ids:
+        freeze_question(question_id, archive_votes=archive_votes)
+    return question_ids
@@ -0,0 +1,14 @@
+"""Module for using in urls when the site runs the async views."""
+from django.urls import path
+
+from . import async_views, views
+app_name = 'polls'
+urlpatterns = [
+    path('', async_views.index, name='index'),
+    path('<int:pk>/', async_views.detail, name='detail'),
+    path('<int:pk>/results/', async_views.results, name='results'),
+    path('<int:pk>/results/stream/', views.results_stream, name='results_stream'),
+    path('<int:pk>/analytics/', views.analytics, name='analytics'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('<int:question_id>/vote/', async_views.vote, name='vote'),
+]
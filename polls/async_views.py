@@ -0,0 +1,114 @@
+"""Module for the async views of the polls, used when the site runs on ASGI."""
+import functools
+from django.contrib import messages
+from django.db.models.query import QuerySet
+from django.http import Http404, HttpResponseRedirect
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from . import views
+from .blocking import run_blocking
+from .conditional import index_etag, detail_etag, results_etag
+from .models import Question
+
+# Django 4.1 and later have the async queryset interface (aget, async for).
+ASYNC_ORM = hasattr(QuerySet, 'aget')
+
+
+async def fetch_list(queryset):
+    """Evaluate the queryset with the async ORM if there is one, in the pool otherwise."""
+    if ASYNC_ORM:
+        return [obj async for obj in queryset]
+    return await run_blocking(list, queryset)
+
+
+async def fetch_one(queryset, **kwargs):
+    """Get one object of the queryset with the async ORM if there is one, in the pool otherwise."""
+    if ASYNC_ORM:
+        return await queryset.aget(**kwargs)
+    return await run_blocking(queryset.get, **kwargs)
+
+
+async def render_response(view, context):
+    """Render the template response of the view in the pool, not in the event loop."""
+    response = view.render_to_response(context)
+    return await run_blocking(response.render)
+
+
+def conditional(etag_func):
+    """
+    Answer the async view with 304 when its ETag matches, like condition() does for the sync views.
+
+    Parameters
+    ----------
+    etag_func : callable
+        the function of polls.conditional that makes the ETag of the page
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, **kwargs):
+            etag = None
+            if request.method in ('GET', 'HEAD'):
+                etag = await run_blocking(etag_func, request, **kwargs)
+            if etag is not None:
+                etag = quote_etag(etag)
+            response = get_conditional_response(request, etag=etag) if etag is not None else None
+            if response is None:
+                response = await view(request, **kwargs)
+                if etag is not None:
+                    response.setdefault('ETag', etag)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+@conditional(index_etag)
+async def index(request):
+    """The async version of IndexView."""
+    view = views.IndexView()
+    view.setup(request)
+    view.object_list = await fetch_list(view.get_queryset())
+    context = await run_blocking(view.get_context_data)
+    return await render_response(view, context)
+
+
+@conditional(detail_etag)
+async def detail(request, pk):
+    """The async version of DetailView."""
+    view = views.DetailView()
+    view.setup(request, pk=pk)
+    try:
+        question = await fetch_one(Question.objects.with_is_open(), pk=pk)
+    except Question.DoesNotExist:
+        messages.error(request, "This poll is not exist.")
+        return HttpResponseRedirect(reverse('polls:index'))
+    if not question.is_open:
+        messages.error(request, "This poll is already closed. Can't vote!!!")
+        return HttpResponseRedirect(reverse('polls:index'))
+    view.object = question
+    context = await run_blocking(view.get_context_data, object=question)
+    return await render_response(view, context)
+
+
+@conditional(results_etag)
+async def results(request, pk):
+    """The async version of ResultsView."""
+    view = views.ResultsView()
+    view.setup(request, pk=pk)
+    try:
+        view.object = await fetch_one(view.get_queryset(), pk=pk)
+    except Question.DoesNotExist:
+        raise Http404("No question found matching the query")
+    context = await run_blocking(view.get_context_data, object=view.object)
+    return await render_response(view, context)
+
+
+async def vote(request, question_id):
+    """
+    The async version of vote.
+
+    The vote is one database transaction, which Django can only run in
+    sync code, so the whole handler runs in the pool.
+    """
+    return await run_blocking(views.vote, request, question_id)
@@ -0,0 +1,246 @@
+"""Module for the non-blocking audit trail of the logins, the logouts and the votes."""
+import atexit
+import ipaddress
+import json
+import logging
+import queue
+import threading
+from datetime import datetime, timezone as dt_timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from django.conf import settings
+from django.db import close_old_connections
+
+FIELDS = ('event', 'user', 'ip', 'question')
+# Log level of every event, the failed logins are warnings that alerts can watch.
+EVENT_LEVELS = {'login failed': logging.WARNING}
+
+audit_log = logging.getLogger("polls.audit")
+audit_log.propagate = False
+audit_log.setLevel(logging.INFO)
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Class of the handler that puts the audit records on a bounded queue without ever waiting.
+
+    ...
+
+    A record that does not fit is dropped and counted, so a slow writer
+    never slows down the request. The records are not formatted here,
+    the writers do it in the background thread.
+
+    Attributes
+    ----------
+    dropped : int
+        number of the records dropped because the queue was full
+
+    """
+
+    def __init__(self, queue):
+        """Create the handler of the bounded queue."""
+        super().__init__(queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        """Return the record as it is, its args are already the compact (event, user, ip, question) tuple."""
+        return record
+
+    def enqueue(self, record):
+        """Put the record on the queue, count it as dropped if the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class BatchingQueueListener(QueueListener):
+    """Class of the listener that hands the audit records to its writers in batches.
+
+    ...
+
+    The listener waits for one record, then takes every record already on
+    the queue, up to batch_size, and gives them to write_batch() of every
+    writer at once.
+
+    """
+
+    def __init__(self, queue, *handlers, batch_size=100):
+        """Create the listener of the queue."""
+        super().__init__(queue, *handlers)
+        self.batch_size = batch_size
+
+    def _monitor(self):
+        """Write the records of the queue in batches until the sentinel comes."""
+        stopping = False
+        while not stopping:
+            batch = []
+            record = self.dequeue(True)
+            while True:
+                if record is self._sentinel:
+                    stopping = True
+                    break
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self.dequeue(False)
+                except queue.Empty:
+                    break
+            if batch:
+                for handler in self.handlers:
+                    try:
+                        handler.write_batch(batch)
+                    except Exception:
+                        handler.handleError(batch[0])
+
+    def enqueue_sentinel(self):
+        """Put the sentinel on the queue, waiting for room so the pending records are written first."""
+        self.queue.put(self._sentinel, timeout=5)
+
+
+def as_dict(record):
+    """Return the audit record as a dict with its UTC time."""
+    values = dict(zip(FIELDS, record.args))
+    values['time'] = datetime.fromtimestamp(record.created, dt_timezone.utc).isoformat()
+    return values
+
+
+def valid_ip(ip):
+    """Return the ip if it is a valid IPv4 or IPv6 address, None otherwise."""
+    try:
+        return str(ipaddress.ip_address(ip))
+    except ValueError:
+        return None
+
+
+class LogAuditWriter(logging.Handler):
+    """Class of the writer that sends the audit records to the polls logger as text, at the level of their event."""
+
+    def write_batch(self, records):
+        """Log every record of the batch."""
+        log = logging.getLogger("polls")
+        for record in records:
+            event, user, ip, question = record.args
+            date = datetime.fromtimestamp(record.created)
+            if question is None:
+                log.log(record.levelno, '%s user: %s , IP: %s , Date: %s', event.capitalize(), user, ip, date)
+            else:
+                log.log(record.levelno, "%s user: %s, Poll's ID: %d, IP: %s , Date: %s.", event.capitalize(), user,
+                        question, ip, date)
+
+    def emit(self, record):
+        """Log one record."""
+        self.write_batch([record])
+
+
+class JsonlAuditWriter(RotatingFileHandler):
+    """Class of the writer that appends the audit records to rotating JSONL files."""
+
+    def write_batch(self, records):
+        """Write the batch as JSON lines with one write, rotating the file before it if it is full."""
+        lines = ''.join(json.dumps(as_dict(record), separators=(',', ':')) + '\n' for record in records)
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0 and self.stream.tell() + len(lines) >= self.maxBytes:
+            self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+        self.stream.write(lines)
+        self.flush()
+
+    def emit(self, record):
+        """Write one record."""
+        self.write_batch([record])
+
+
+class ModelAuditWriter(logging.Handler):
+    """Class of the writer that saves the audit records as AuditEvent rows."""
+
+    def write_batch(self, records):
+        """Save the batch with one bulk_create, an invalid ip is saved as NULL so it can not fail the batch."""
+        from .models import AuditEvent
+        close_old_connections()
+        try:
+            AuditEvent.objects.bulk_create([
+                AuditEvent(created=datetime.fromtimestamp(record.created, dt_timezone.utc), event=event,
+                           username=user or '', ip=valid_ip(ip), question_id=question)
+                for record in records for event, user, ip, question in (record.args,)])
+        finally:
+            close_old_connections()
+
+    def emit(self, record):
+        """Save one record."""
+        self.write_batch([record])
+
+
+def make_writer():
+    """Return the writer set by POLLS_AUDIT_WRITER, 'log', 'jsonl' or 'model'."""
+    writer = getattr(settings, 'POLLS_AUDIT_WRITER', 'log')
+    if writer == 'jsonl':
+        return JsonlAuditWriter(settings.POLLS_AUDIT_FILE, maxBytes=getattr(settings, 'POLLS_AUDIT_MAX_BYTES', 0),
+                                backupCount=getattr(settings, 'POLLS_AUDIT_BACKUP_COUNT', 0), delay=True)
+    if writer == 'model':
+        return ModelAuditWriter()
+    return LogAuditWriter()
+
+
+def start():
+    """Start the audit pipeline of the process unless it runs already, and return its queue handler."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            records = queue.Queue(getattr(settings, 'POLLS_AUDIT_QUEUE_SIZE', 10000))
+            handler = BoundedQueueHandler(records)
+            listener = BatchingQueueListener(records, make_writer(),
+                                             batch_size=getattr(settings, 'POLLS_AUDIT_BATCH_SIZE', 100))
+            listener.start()
+            audit_log.addHandler(handler)
+            _pipeline = (handler, listener)
+        return _pipeline[0]
+
+
+def stop():
+    """Write the pending records and stop the audit pipeline."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            return
+        handler, listener = _pipeline
+        _pipeline = None
+        audit_log.removeHandler(handler)
+        listener.stop()
+        for writer in listener.handlers:
+            writer.close()
+
+
+def dropped():
+    """Return the number of the audit records dropped by the running pipeline."""
+    pipeline = _pipeline
+    return pipeline[0].dropped if pipeline is not None else 0
+
+
+def audit(event, user, ip, question_id=None):
+    """
+    Put the audit record on the queue of the background writer.
+
+    Parameters
+    ----------
+    event : str
+        'login', 'logout', 'login failed' or 'vote'
+    user : str
+        name of the user
+    ip : str
+        client ip of the request
+    question_id : int, optional
+        id of the voted question
+    """
+    if _pipeline is None:
+        start()
+    audit_log.log(EVENT_LEVELS.get(event, logging.INFO), 'audit', event, str(user), ip, question_id)
+
+
+atexit.register(stop)
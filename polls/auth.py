@@ -0,0 +1,64 @@
+"""Module for the fast path of the authentication of the polls."""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from .cache import get_cache
+
+
+def user_key(user_id):
+    """Return the cache key of the user."""
+    return 'polls:user:%s' % user_id
+
+
+def forget_user(user_id):
+    """Drop the cached user, so the next request reads it again."""
+    get_cache().delete(user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """Class of the authentication backend that caches the user of the session.
+
+    ...
+
+    AuthenticationMiddleware loads request.user with get_user() on every
+    request. The user is kept in the polls cache for
+    POLLS_USER_CACHE_TIMEOUT seconds, by default 0, which reads it every
+    time. It is dropped when the user is saved or deleted or its groups
+    or permissions change, but not by QuerySet.update(), whose callers
+    must call forget_user(). The cache must be shared by all the workers,
+    or the other workers keep the old user until it expires. The logins
+    are checked by ModelBackend as before.
+
+    """
+
+    def get_user(self, user_id):
+        """Return the active user of the id from the cache, reading it on a miss."""
+        timeout = getattr(settings, 'POLLS_USER_CACHE_TIMEOUT', 0)
+        if not timeout:
+            return super().get_user(user_id)
+        cache = get_cache()
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, timeout)
+        return user
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """Class of the PBKDF2 hasher whose iterations are set by POLLS_PBKDF2_ITERATIONS.
+
+    ...
+
+    The algorithm name is the one of the default hasher, so it checks the
+    stored hashes of any iterations. A hash with other iterations than the
+    setting is rehashed on the next login of its user. Without the setting
+    the iterations of Django are used.
+
+    """
+
+    @property
+    def iterations(self):
+        """Return the iterations of the new hashes."""
+        return getattr(settings, 'POLLS_PBKDF2_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
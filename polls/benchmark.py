@@ -0,0 +1,237 @@
+"""Module for benchmarking the voting workflow of the polls."""
+import datetime
+import http.client
+import json
+import re
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from multiprocessing import Pool
+from urllib.parse import urlencode
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from .metrics import percentile, registry
+from .models import Question, Choice
+
+PASSWORD = 'bench-password'
+
+
+def seed(questions, choices, users):
+    """
+    Create the questions, the choices and the users of the benchmark.
+
+    Parameters
+    ----------
+    questions : int
+        number of the questions that can vote
+    choices : int
+        number of the choices of every question
+    users : int
+        number of the users, named bench0, bench1, ...
+
+    Return:
+    list of the ids of the questions.
+    """
+    now = timezone.now()
+    User = get_user_model()
+    Question.objects.bulk_create([
+        Question(question_text='Bench question %d' % number, pub_date=now - datetime.timedelta(days=1),
+                 end_date=now + datetime.timedelta(days=30)) for number in range(questions)])
+    question_ids = list(Question.objects.filter(question_text__startswith='Bench question')
+                        .order_by('id').values_list('id', flat=True))
+    Choice.objects.bulk_create([Choice(question_id=question_id, choice_text='Choice %d' % number)
+                                for question_id in question_ids for number in range(choices)])
+    template = User(username='bench')
+    template.set_password(PASSWORD)
+    User.objects.bulk_create([User(username='bench%d' % number, password=template.password)
+                              for number in range(users)])
+    User.objects.create_user('benchadmin', password=PASSWORD, is_staff=True)
+    return question_ids
+
+
+def workflow(users, question_ids):
+    """Return (username, question id, choice id) of the vote of every user."""
+    choices = defaultdict(list)
+    for choice_id, question_id in Choice.objects.filter(question_id__in=question_ids).values_list('id', 'question'):
+        choices[question_id].append(choice_id)
+    plan = []
+    for number in range(users):
+        question_id = question_ids[number % len(question_ids)]
+        plan.append(('bench%d' % number, question_id, choices[question_id][number % len(choices[question_id])]))
+    return plan
+
+
+def summarize(latencies, elapsed, queries=None):
+    """
+    Summarize the latencies of every step.
+
+    Parameters
+    ----------
+    latencies : dict
+        step to the list of its latencies in seconds
+    elapsed : float
+        seconds of the whole run
+    queries : dict, optional
+        step to the median queries of its requests
+
+    Return:
+    dict of step to the requests, req/s, latency percentiles and queries/request.
+    """
+    report = {}
+    for step, values in latencies.items():
+        report[step] = {'requests': len(values),
+                        'req_per_sec': round(len(values) / elapsed, 2) if elapsed else 0.0,
+                        'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+                        'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+                        'p99_ms': round(percentile(values, 0.99) * 1000, 3)}
+        if queries is not None:
+            report[step]['queries_per_request'] = queries.get(step)
+    return report
+
+
+def run_client(plan):
+    """
+    Drive the workflow of every user of the plan through Django's test client.
+
+    Return:
+    the summary of every step, made by summarize().
+    """
+    registry.reset()
+    latencies = defaultdict(list)
+    start = time.perf_counter()
+    for username, question_id, choice_id in plan:
+        client = Client()
+        steps = (
+            ('login', lambda: client.post(reverse('login'), {'username': username, 'password': PASSWORD})),
+            ('polls:detail', lambda: client.get(reverse('polls:detail', args=(question_id,)))),
+            ('polls:vote', lambda: client.post(reverse('polls:vote', args=(question_id,)), {'choice': choice_id})),
+            ('polls:results', lambda: client.get(reverse('polls:results', args=(question_id,)))),
+        )
+        for step, request in steps:
+            began = time.perf_counter()
+            request()
+            latencies[step].append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    queries = {step: values['queries'][0.5] for step, values in registry.summary().items()}
+    return summarize(latencies, elapsed, queries)
+
+
+class HttpSession:
+    """Class of one browser-like session against a running server, keeping its cookies."""
+
+    def __init__(self, host, port):
+        """Open the keep-alive connection to the server."""
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+        self.cookies = {}
+
+    def request(self, method, path, form=None):
+        """Send the request with the cookies and return the status, the headers and the body."""
+        headers = {'Cookie': '; '.join('%s=%s' % item for item in self.cookies.items())}
+        body = None
+        if form is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+            headers['Referer'] = 'http://%s:%d%s' % (self.connection.host, self.connection.port, path)
+            body = urlencode(form)
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        for header in response.msg.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response.status, response, content
+
+
+def drive_http(args):
+    """Drive the workflow of a part of the plan against the server, run in a worker process."""
+    host, port, prefix, plan = args
+    latencies = defaultdict(list)
+    for username, question_id, choice_id in plan:
+        session = HttpSession(host, port)
+        session.request('GET', '/account/login/')
+        steps = (
+            ('login', 'POST', '/account/login/', {'username': username, 'password': PASSWORD}),
+            ('polls:detail', 'GET', '%s%d/' % (prefix, question_id), None),
+            ('polls:vote', 'POST', '%s%d/vote/' % (prefix, question_id), {'choice': choice_id}),
+            ('polls:results', 'GET', '%s%d/results/' % (prefix, question_id), None),
+        )
+        for step, method, path, form in steps:
+            began = time.perf_counter()
+            status, response, content = session.request(method, path, form)
+            latencies[step].append(time.perf_counter() - began)
+            if status >= 400:
+                raise RuntimeError('%s %s answered %d' % (method, path, status))
+    return dict(latencies)
+
+
+def server_queries(host, port, prefix):
+    """Read the median queries of every step from the metrics page of the server."""
+    session = HttpSession(host, port)
+    session.request('GET', '/account/login/')
+    session.request('POST', '/account/login/', {'username': 'benchadmin', 'password': PASSWORD})
+    status, response, content = session.request('GET', '%smetrics/' % prefix)
+    queries = {}
+    pattern = re.compile(r'^polls_queries\{view="([^"]+)",quantile="0.5"\} (\S+)$')
+    for line in content.decode().splitlines():
+        match = pattern.match(line)
+        if match:
+            queries[match.group(1)] = float(match.group(2))
+    return queries
+
+
+def run_http(plan, host, port, processes, prefix='/polls/'):
+    """
+    Drive the workflow of every user of the plan against a running server from many processes.
+
+    Return:
+    the summary of every step, made by summarize().
+    """
+    parts = [(host, port, prefix, plan[number::processes]) for number in range(processes)]
+    start = time.perf_counter()
+    with Pool(processes) as pool:
+        results = pool.map(drive_http, parts)
+    elapsed = time.perf_counter() - start
+    latencies = defaultdict(list)
+    for result in results:
+        for step, values in result.items():
+            latencies[step].extend(values)
+    return summarize(latencies, elapsed, server_queries(host, port, prefix))
+
+
+def compare(report, baseline, tolerance):
+    """
+    Compare the report with the baseline report.
+
+    A step regresses if its p95 latency grows by more than the tolerance
+    or if it takes more queries per request.
+
+    Parameters
+    ----------
+    report : dict
+        the summary of every step of this run
+    baseline : dict
+        the summary of every step of the stored run
+    tolerance : float
+        allowed growth of the p95 latency, 0.2 is 20%
+
+    Return:
+    list of the messages of the regressions, empty if there is none.
+    """
+    regressions = []
+    for step, old in baseline.items():
+        new = report.get(step)
+        if new is None:
+            continue
+        if new['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append('%s: p95 %.3fms -> %.3fms' % (step, old['p95_ms'], new['p95_ms']))
+        old_queries, new_queries = old.get('queries_per_request'), new.get('queries_per_request')
+        if old_queries is not None and new_queries is not None and new_queries > old_queries:
+            regressions.append('%s: queries/request %s -> %s' % (step, old_queries, new_queries))
+    return regressions
+
+
+def dump(report):
+    """Return the report as indented JSON."""
+    return json.dumps(report, indent=2, sort_keys=True)
@@ -0,0 +1,92 @@
+"""Module for running the blocking work of the async code and the deferred work in bounded thread pools."""
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'POLLS_DB_THREADS', 8),
+                               thread_name_prefix='polls-db')
+# The deferred work has its own threads, so a burst of it never queues in
+# front of the database work of the async views.
+_deferred_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'POLLS_DEFER_THREADS', 1),
+                                        thread_name_prefix='polls-defer')
+_deferred_slots = threading.BoundedSemaphore(getattr(settings, 'POLLS_DEFER_QUEUE', 1000))
+logger = logging.getLogger("polls")
+
+
+def _call_blocking(func, *args, **kwargs):
+    """Call the function in a pool thread, keeping its connection as CONN_MAX_AGE allows."""
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run the blocking function in the bounded polls thread pool.
+
+    The pool has POLLS_DB_THREADS threads, so the blocking database work
+    of the async views runs in parallel without opening more database
+    connections than that. The function runs in a copy of the context of
+    the caller, so a read pinned to the primary by polls.routers stays
+    pinned in the pool thread.
+
+    Parameters
+    ----------
+    func : callable
+        the blocking function
+
+    Return:
+    the return value of the function.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, _call_blocking, func, *args, **kwargs))
+
+
+def _finish_deferred(future):
+    """Free the queue slot of the deferred function and log its exception, nobody waits for its result."""
+    try:
+        error = future.exception()
+        if error is not None:
+            logger.error('Deferred work failed: %r', error, exc_info=error)
+    finally:
+        _deferred_slots.release()
+
+
+def defer(func, *args, **kwargs):
+    """
+    Run the blocking function in the deferred thread pool without waiting for it.
+
+    It is for the work that does not change the response, so the request
+    returns without it. The pool has POLLS_DEFER_THREADS threads of its
+    own and at most POLLS_DEFER_QUEUE calls wait in it, once it is full
+    the function runs in the caller as if it was not deferred. A failure
+    of a deferred call is only logged.
+
+    Parameters
+    ----------
+    func : callable
+        the blocking function
+
+    Return:
+    the Future of the call.
+    """
+    if not _deferred_slots.acquire(blocking=False):
+        future = Future()
+        future.set_result(func(*args, **kwargs))
+        return future
+    context = contextvars.copy_context()
+    try:
+        future = _deferred_executor.submit(context.run, _call_blocking, func, *args, **kwargs)
+    except RuntimeError:
+        _deferred_slots.release()
+        raise
+    future.add_done_callback(_finish_deferred)
+    return future
@@ -0,0 +1,342 @@
+"""Module for the write-behind vote buffer."""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from django.conf import settings
+from django.db import close_old_connections
+from .admission import vote_admitted
+from .tally import record_votes
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+log = logging.getLogger("polls")
+
+
+def is_buffered():
+    """Return True if POLLS_VOTE_WRITE_MODE asks for the write-behind buffer."""
+    return getattr(settings, 'POLLS_VOTE_WRITE_MODE', 'sync') == 'buffered'
+
+
+class VoteJournal:
+    """Class of the append-only files that keep the buffered votes of one process on disk.
+
+    ...
+
+    Every vote is appended and fsynced before the user is answered. A
+    flush seals the current file and removes it once its votes are in the
+    database, so the votes of a killed process stay in its files. The
+    process holds a lock on its lock file while it lives, recover() replays
+    the files whose lock is free, the ones of the dead processes.
+
+    Attributes
+    ----------
+    directory : str
+        directory of the journal files of all the processes
+
+    Methods
+    -------
+    append(user_id, question_id, choice_id)
+        write the vote to the current file and fsync it.
+
+    seal()
+        close the current file so the next vote starts a new one.
+
+    discard(sealed)
+        remove the sealed files up to the given one.
+
+    recover()
+        read the votes of the journals of the dead processes.
+
+    close()
+        remove the files of the process and release its lock.
+
+    """
+
+    def __init__(self, directory):
+        """Create the journal in the directory, the files are opened with the first vote."""
+        self.directory = directory
+        self._token = None
+        self._lock_file = None
+        self._file = None
+        self._sequence = 0
+        self._sealed = []
+
+    def _path(self, token, sequence):
+        """Return the path of the journal file of the process token."""
+        return os.path.join(self.directory, '%s.%08d.jsonl' % (token, sequence))
+
+    def _open(self):
+        """Take the lock file of the process and open its current journal file."""
+        if self._token is None or self._token[0] != os.getpid():
+            # A forked worker gets its own files.
+            os.makedirs(self.directory, exist_ok=True)
+            self._token = (os.getpid(), 'votes-%d-%s' % (os.getpid(), uuid.uuid4().hex[:8]))
+            lock_path = os.path.join(self.directory, self._token[1] + '.lock')
+            self._lock_file = open(lock_path + '.new', 'w')
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            # Only a locked lock file is seen by recover().
+            os.rename(lock_path + '.new', lock_path)
+            self._file, self._sequence, self._sealed = None, 0, []
+        if self._file is None:
+            self._file = open(self._path(self._token[1], self._sequence), 'a')
+
+    def append(self, user_id, question_id, choice_id):
+        """Write the vote to the current file and fsync it."""
+        self._open()
+        self._file.write(json.dumps([user_id, question_id, choice_id]) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def seal(self):
+        """
+        Close the current file, the next vote starts a new one.
+
+        Return:
+        path of the sealed file, None if no vote was written to it.
+        """
+        if self._file is None:
+            return None
+        self._file.close()
+        self._file = None
+        sealed = self._path(self._token[1], self._sequence)
+        self._sealed.append(sealed)
+        self._sequence += 1
+        return sealed
+
+    def discard(self, sealed):
+        """Remove the sealed file and the ones sealed before it, their votes are in the database."""
+        if sealed is None:
+            return
+        while self._sealed:
+            path = self._sealed.pop(0)
+            os.remove(path)
+            if path == sealed:
+                break
+
+    def recover(self):
+        """
+        Read the votes of the journals whose process is gone.
+
+        Return:
+        tuple of the dict of (user id, question id) to the id of the
+        selected choice, the last vote of each, and release(written) that
+        removes the recovered files if their votes were written and frees
+        their locks.
+        """
+        batch, paths, locks = {}, [], []
+        if fcntl is not None:
+            for lock_path in sorted(glob.glob(os.path.join(self.directory, 'votes-*.lock'))):
+                lock_file = open(lock_path, 'a')
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    lock_file.close()
+                    continue
+                locks.append(lock_file)
+                token = os.path.basename(lock_path)[:-len('.lock')]
+                for path in sorted(glob.glob(os.path.join(self.directory, token + '.*.jsonl'))):
+                    with open(path) as journal:
+                        for line in journal:
+                            try:
+                                user_id, question_id, choice_id = json.loads(line)
+                            except ValueError:
+                                # The vote being written when the process died was never accepted.
+                                continue
+                            batch[(user_id, question_id)] = choice_id
+                    paths.append(path)
+                paths.append(lock_path)
+
+        def release(written):
+            if written:
+                for path in paths:
+                    os.remove(path)
+            for lock_file in locks:
+                lock_file.close()
+        return batch, release
+
+    def close(self):
+        """Remove the files of the process, every vote is flushed, and release its lock."""
+        if self._token is None or self._token[0] != os.getpid():
+            return
+        self.seal()
+        self.discard(self._sealed[-1] if self._sealed else None)
+        os.remove(os.path.join(self.directory, self._token[1] + '.lock'))
+        self._lock_file.close()
+        self._token = self._lock_file = None
+
+
+class VoteBuffer:
+    """Class of the buffer that keeps the accepted votes until they are flushed.
+
+    ...
+
+    Attributes
+    ----------
+    max_size : int
+        number of pending votes that wakes the flusher early
+    interval : float
+        seconds between two flushes of the background flusher
+    journal : VoteJournal
+        the files that keep the pending votes on disk, None if the votes
+        accepted since the last flush are lost when the process is killed
+
+    Methods
+    -------
+    add(user_id, question_id, choice_id)
+        keep the vote of the user, replacing the pending one of the same question.
+
+    flush()
+        write every pending vote to the database.
+
+    recover()
+        write the votes left in the journals of the killed processes.
+
+    stop()
+        stop the background flusher and flush the pending votes.
+
+    """
+
+    def __init__(self, max_size=None, interval=None, autostart=True, journal_dir=None):
+        """Create the buffer, the flusher starts with the first vote if autostart is True."""
+        self.max_size = max_size or getattr(settings, 'POLLS_VOTE_BUFFER_SIZE', 500)
+        self.interval = interval or getattr(settings, 'POLLS_VOTE_FLUSH_INTERVAL', 1.0)
+        journal_dir = journal_dir or getattr(settings, 'POLLS_VOTE_JOURNAL_DIR', None)
+        self.journal = VoteJournal(str(journal_dir)) if journal_dir else None
+        self.autostart = autostart
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._registered = False
+
+    def __len__(self):
+        """Return the number of pending votes."""
+        with self._lock:
+            return len(self._pending)
+
+    def add(self, user_id, question_id, choice_id):
+        """
+        Keep the vote of the user until the next flush.
+
+        Parameters
+        ----------
+        user_id : int
+            id of the user who votes
+        question_id : int
+            id of the voted question
+        choice_id : int
+            id of the selected choice
+        """
+        with self._lock:
+            if self.journal is not None:
+                self.journal.append(user_id, question_id, choice_id)
+            self._pending[(user_id, question_id)] = choice_id
+            full = len(self._pending) >= self.max_size
+        # The pending vote replaces the stored one, the same re-vote needs no write.
+        vote_admitted(user_id, question_id, choice_id)
+        if self.autostart:
+            self._start()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Write every pending vote to the database in one batch.
+
+        If the write fails the votes are put back, unless the user has
+        voted again in the meantime, and the error is raised. Their journal
+        files are kept until a later flush writes them.
+
+        Return:
+        number of the flushed votes.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                sealed = self.journal.seal() if self.journal is not None else None
+            if not batch:
+                return 0
+            try:
+                record_votes(batch)
+            except Exception:
+                with self._lock:
+                    batch.update(self._pending)
+                    self._pending = batch
+                raise
+            if self.journal is not None:
+                self.journal.discard(sealed)
+            return len(batch)
+
+    def recover(self):
+        """
+        Write the votes left in the journals of the killed processes.
+
+        Return:
+        number of the recovered votes.
+        """
+        if self.journal is None:
+            return 0
+        batch, release = self.journal.recover()
+        written = False
+        try:
+            record_votes(batch)
+            written = True
+        finally:
+            release(written)
+        if batch:
+            log.warning("Recovered %d buffered vote(s) from the journals of killed processes.", len(batch))
+        return len(batch)
+
+    def stop(self):
+        """Stop the background flusher and flush the pending votes."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self.journal is not None and not len(self):
+            self.journal.close()
+
+    def _start(self):
+        """Start the background flusher if it is not running."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='polls-vote-flusher', daemon=True)
+                self._thread.start()
+                if not self._registered:
+                    atexit.register(self.stop)
+                    self._registered = True
+
+    def _run(self):
+        """Recover the journals of the killed processes, then flush the pending votes every interval."""
+        try:
+            self.recover()
+        except Exception:
+            log.exception("Recovering the vote journals failed, they are kept for the next start.")
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopping:
+                break
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Flushing the vote buffer failed, %d vote(s) are kept.", len(self))
+
+
+vote_buffer = VoteBuffer()
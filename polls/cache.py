@@ -0,0 +1,195 @@
+"""Module for the cache and the version stamps of the polls."""
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+LIST_VERSION_KEY = 'polls:version:list'
+
+_last_seed = 0
+_seed_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the cache that keeps the polls data, set by POLLS_CACHE."""
+    return caches[getattr(settings, 'POLLS_CACHE', 'default')]
+
+
+def version_key(question_id):
+    """Return the cache key of the version of the question."""
+    return 'polls:version:%d' % question_id
+
+
+def content_key(question_id):
+    """Return the cache key of the content version of the question."""
+    return 'polls:version:content:%d' % question_id
+
+
+def votes_key(user_id):
+    """Return the cache key of the version of the votes of the user."""
+    return 'polls:version:votes:%d' % user_id
+
+
+def question_version(question_id):
+    """
+    Get the version of the question.
+
+    The version is bumped every time the votes or the content of the
+    question change, so anything cached under it is never stale. A new
+    version starts from new_version(), so it is still newer than the old
+    one if the cache has evicted it.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the question
+
+    Return:
+    the current version of the question.
+    """
+    return get_version(version_key(question_id))
+
+
+def new_version():
+    """
+    Return the first version of a version stamp that is missing.
+
+    It is the current time in microseconds, and always above the last one
+    of this process. A stamp evicted from the cache starts again above
+    its old version unless it was bumped more than once a microsecond on
+    average since it started, faster than a cache increments one key.
+    The versions stay below 2 ** 53, so the browsers read them exactly.
+
+    Return:
+    the new version.
+    """
+    global _last_seed
+    with _seed_lock:
+        _last_seed = max(time.time_ns() // 1000, _last_seed + 1)
+        return _last_seed
+
+
+def get_version(key):
+    """Get the version stamp under the key, starting it from new_version() if it is missing."""
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        version = new_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(key):
+    """Bump the version stamp under the key and return the new one."""
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = new_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+        return version
+
+
+def question_versions(question_ids, key=version_key):
+    """
+    Get the versions of many questions with one cache read.
+
+    Parameters
+    ----------
+    question_ids : iterable
+        ids of the questions
+    key : callable
+        version_key for the versions, content_key for the content versions
+
+    Return:
+    dict of question id to its current version.
+    """
+    keys = {key(question_id): question_id for question_id in question_ids}
+    versions = {keys[name]: version for name, version in get_cache().get_many(list(keys)).items()}
+    for name, question_id in keys.items():
+        if question_id not in versions:
+            versions[question_id] = get_version(name)
+    return versions
+
+
+def content_version(question_id):
+    """
+    Get the content version of the question.
+
+    It is bumped when the question or one of its choices is edited, but
+    not by the votes, so the fragments that show no votes are kept
+    through a flash poll.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the question
+
+    Return:
+    the current content version of the question.
+    """
+    return get_version(content_key(question_id))
+
+
+def bump_content_version(question_id):
+    """Bump the content version of the question."""
+    bump_version(content_key(question_id))
+
+
+def votes_version(user_id):
+    """
+    Get the version of the votes of the user.
+
+    It is bumped when a vote of the user is committed, from any session
+    or device, so a copy of the previous votes kept under it is never
+    stale.
+
+    Parameters
+    ----------
+    user_id : int
+        id of the user
+
+    Return:
+    the current version of the votes of the user.
+    """
+    return get_version(votes_key(user_id))
+
+
+def bump_votes_version(user_id):
+    """Bump the version of the votes of the user."""
+    bump_version(votes_key(user_id))
+
+
+def bump_question_version(question_id):
+    """
+    Bump the version of the question.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the question
+
+    Return:
+    the new version of the question.
+    """
+    return bump_version(version_key(question_id))
+
+
+def list_version():
+    """
+    Get the version of the list of the questions.
+
+    It is bumped every time a question is added, edited or deleted, but
+    not by the votes, which only bump the version of their question.
+
+    Return:
+    the current version of the list.
+    """
+    return get_version(LIST_VERSION_KEY)
+
+
+def bump_list_version():
+    """Bump the version of the list of the questions."""
+    bump_version(LIST_VERSION_KEY)
@@ -0,0 +1,38 @@
+"""Module for the system checks of the settings of the polls."""
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from .admission import PROCESS_CACHES
+
+CACHED_SESSIONS = ('django.contrib.sessions.backends.cache', 'django.contrib.sessions.backends.cached_db')
+
+
+def check_auth_order(app_configs, **kwargs):
+    """Check that django.contrib.auth is ready before the polls, which disconnect its login time receiver."""
+    names = [config.name for config in apps.get_app_configs()]
+    if 'django.contrib.auth' in names and names.index('django.contrib.auth') > names.index('polls'):
+        return [checks.Error(
+            'django.contrib.auth is installed after polls, so its receiver of the login time is not replaced.',
+            hint="Put 'django.contrib.auth' before 'polls.apps.PollsConfig' in INSTALLED_APPS.",
+            id='polls.E001')]
+    return []
+
+
+def check_user_cache(app_configs, **kwargs):
+    """Check that the users and the sessions are only cached in a cache shared by all the workers."""
+    warnings = []
+    alias = getattr(settings, 'POLLS_CACHE', 'default')
+    if getattr(settings, 'POLLS_USER_CACHE_TIMEOUT', 0) and settings.CACHES[alias]['BACKEND'] in PROCESS_CACHES:
+        warnings.append(checks.Warning(
+            'POLLS_USER_CACHE_TIMEOUT caches the users in a per-process cache, so the other workers '
+            'keep a changed password or a deactivation until it expires.',
+            hint='Set POLLS_CACHE to a cache shared by all the workers or POLLS_USER_CACHE_TIMEOUT to 0.',
+            id='polls.W001'))
+    alias = settings.SESSION_CACHE_ALIAS
+    if settings.SESSION_ENGINE in CACHED_SESSIONS and settings.CACHES[alias]['BACKEND'] in PROCESS_CACHES:
+        warnings.append(checks.Warning(
+            '%s keeps the sessions in a per-process cache, so the other workers keep a logged out '
+            'session until it expires.' % settings.SESSION_ENGINE,
+            hint='Set SESSION_CACHE_ALIAS to a cache shared by all the workers or POLLS_SESSION_ENGINE to db.',
+            id='polls.W001'))
+    return warnings
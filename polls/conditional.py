@@ -0,0 +1,89 @@
+"""Module for the ETags of the poll pages, so an unchanged page is answered with 304."""
+import hashlib
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from .cache import get_cache, list_version, question_version
+from .models import Question
+from .previous import previous_votes
+
+
+def transitions_key(version):
+    """Return the cache key of the publish and close times of the list version."""
+    return 'polls:transitions:%d' % version
+
+
+def last_transition(now=None):
+    """
+    Get the last time a question was published or closed.
+
+    Whether a question is listed and whether it can vote change with the
+    time alone, without any edit that bumps a version. The last and the
+    next of these times are read with one query and cached under the list
+    version, and read again only once the next one has passed.
+
+    Parameters
+    ----------
+    now : datetime, optional
+        the current time
+
+    Return:
+    the last pub_date or end_date that has passed, None if there is none.
+    """
+    now = now or timezone.now()
+    cache = get_cache()
+    key = transitions_key(list_version())
+    times = cache.get(key)
+    if times is None or (times['next'] is not None and times['next'] <= now):
+        # A question is published from its pub_date on and closed after its end_date.
+        dates = Question.objects.aggregate(last_pub=Max('pub_date', filter=Q(pub_date__lte=now)),
+                                           next_pub=Min('pub_date', filter=Q(pub_date__gt=now)),
+                                           last_end=Max('end_date', filter=Q(end_date__lt=now)),
+                                           next_end=Min('end_date', filter=Q(end_date__gte=now)))
+        times = {'last': max(filter(None, (dates['last_pub'], dates['last_end'])), default=None),
+                 'next': min(filter(None, (dates['next_pub'], dates['next_end'])), default=None)}
+        cache.set(key, times, None)
+    return times['last']
+
+
+def page_etag(request, *parts, personal=True):
+    """
+    Make the ETag of the page from the version stamps it is built from.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request from user
+    parts : tuple
+        the versions and the other values the page depends on
+    personal : bool
+        the page also shows the user, the CSRF token or the previous votes
+
+    Return:
+    the ETag, None if messages wait to be shown, the templates show them
+    and so drain them on the render.
+    """
+    if len(get_messages(request)):
+        return None
+    if personal:
+        user = request.user
+        parts += (user.pk, user.get_full_name() if user.is_authenticated else '',
+                  request.COOKIES.get(settings.CSRF_COOKIE_NAME), sorted(previous_votes(request).items()))
+    data = repr((getattr(settings, 'POLLS_ETAG_VERSION', ''),) + parts)
+    return hashlib.md5(data.encode()).hexdigest()
+
+
+def index_etag(request):
+    """Return the ETag of the index page."""
+    return page_etag(request, 'index', request.get_full_path(), list_version(), last_transition())
+
+
+def detail_etag(request, pk):
+    """Return the ETag of the detail page of the question."""
+    return page_etag(request, 'detail', pk, question_version(pk), last_transition())
+
+
+def results_etag(request, pk):
+    """Return the ETag of the results page of the question."""
+    return page_etag(request, 'results', pk, question_version(pk), last_transition(), personal=False)
@@ -0,0 +1,12 @@
+"""Module for the template context of the polls."""
+from django.conf import settings
+
+
+def fragment_cache(request):
+    """Add the seconds the template fragments of the polls are cached, set by POLLS_FRAGMENT_TIMEOUT."""
+    return {'polls_fragment_timeout': getattr(settings, 'POLLS_FRAGMENT_TIMEOUT', 300)}
+
+
+def live_results(request):
+    """Add whether the results pages open the live stream, set by POLLS_LIVE_RESULTS."""
+    return {'polls_live_results': getattr(settings, 'POLLS_LIVE_RESULTS', False)}
@@ -0,0 +1,109 @@
+"""Module for the bench command."""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from polls import benchmark
+
+
+class Command(BaseCommand):
+    """Benchmark the login, detail, vote and results workflow of the polls."""
+
+    help = ('Seed questions, choices and users in a throwaway database and drive login, detail, vote and '
+            'results through the test client or a local server, reporting req/s, latency percentiles and '
+            'queries/request per endpoint as JSON.')
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument('--questions', type=int, default=10)
+        parser.add_argument('--choices', type=int, default=4)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--http', action='store_true',
+                            help='drive a local server from many processes instead of the test client')
+        parser.add_argument('--processes', type=int, default=4, help='driver processes of --http')
+        parser.add_argument('--server', choices=['runserver', 'gunicorn'], default='runserver',
+                            help='server started by --http')
+        parser.add_argument('--port', type=int, default=8766, help='port of the server started by --http')
+        parser.add_argument('--output', help='write the report to this file')
+        parser.add_argument('--baseline', help='fail if the report regresses against this stored report')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='allowed growth of the p95 latency against the baseline')
+        parser.add_argument('--seed-only', action='store_true',
+                            help='seed the configured database and print the workflow plan, used by --http')
+
+    def handle(self, *args, **options):
+        """Run the benchmark and report it."""
+        if options['seed_only']:
+            question_ids = benchmark.seed(options['questions'], options['choices'], options['users'])
+            self.stdout.write(json.dumps(benchmark.workflow(options['users'], question_ids)))
+            return
+        if options['http']:
+            steps = self.run_http(options)
+        else:
+            steps = self.run_client(options)
+        report = {'mode': 'http' if options['http'] else 'client', 'questions': options['questions'],
+                  'choices': options['choices'], 'users': options['users'], 'steps': steps}
+        self.stdout.write(benchmark.dump(report))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(benchmark.dump(report))
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = benchmark.compare(steps, json.load(baseline)['steps'], options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against %s:\n%s' % (options['baseline'], '\n'.join(regressions)))
+
+    def run_client(self, options):
+        """Run the workflow through the test client on a throwaway test database."""
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            question_ids = benchmark.seed(options['questions'], options['choices'], options['users'])
+            with override_settings(POLLS_VOTE_USER_RATE=None, POLLS_VOTE_IP_RATE=None):
+                return benchmark.run_client(benchmark.workflow(options['users'], question_ids))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def run_http(self, options):
+        """Run the workflow against a local server on a throwaway SQLite database."""
+        manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, POLLS_SQLITE_PATH=os.path.join(directory, 'bench.sqlite3'),
+                       POLLS_VOTE_RATE_LIMITS='0')
+            subprocess.run(manage + ['migrate', '-v', '0'], env=env, check=True)
+            seeded = subprocess.run(manage + ['bench', '--seed-only', '--questions', str(options['questions']),
+                                              '--choices', str(options['choices']), '--users', str(options['users'])],
+                                    env=env, check=True, stdout=subprocess.PIPE)
+            plan = [tuple(step) for step in json.loads(seeded.stdout)]
+            port = options['port']
+            if options['server'] == 'gunicorn':
+                command = [sys.executable, '-m', 'gunicorn', 'mysite.wsgi', '-b', '127.0.0.1:%d' % port,
+                           '-w', str(options['processes']), '--log-level', 'warning']
+            else:
+                command = manage + ['runserver', '--noreload', '127.0.0.1:%d' % port]
+            server = subprocess.Popen(command, env=env, cwd=settings.BASE_DIR,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                self.wait_for(port)
+                return benchmark.run_http(plan, '127.0.0.1', port, options['processes'])
+            finally:
+                server.terminate()
+                server.wait()
+
+    def wait_for(self, port):
+        """Wait until the server answers on the port."""
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                benchmark.HttpSession('127.0.0.1', port).request('GET', '/account/login/')
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('The server did not start on port %d.' % port)
@@ -0,0 +1,19 @@
+"""Module for the compact_counters command."""
+from django.core.management.base import BaseCommand
+from polls.tally import compact_counters
+
+
+class Command(BaseCommand):
+    """Fold the deltas of the vote counter shards into Choice.votes."""
+
+    help = 'Fold the deltas of the vote counter shards into Choice.votes, run it periodically.'
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument('question_ids', nargs='*', type=int,
+                            help='ids of the questions to compact, all questions if omitted')
+
+    def handle(self, *args, **options):
+        """Compact the counters and report the choices."""
+        compacted = compact_counters(options['question_ids'] or None)
+        self.stdout.write(self.style.SUCCESS('Compacted %d choice(s).' % compacted))
@@ -0,0 +1,40 @@
+"""Module for the export_polls command."""
+from django.core.management.base import BaseCommand
+from polls.models import Question
+from polls.transfer import EXPORT_HEADERS, FORMATS, encode, export_rows
+
+
+class Command(BaseCommand):
+    """Stream the questions with their tallies or the votes as CSV or JSONL."""
+
+    help = 'Stream the choices with their questions and tallies, or the raw votes, as CSV or JSONL.'
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument('kind', choices=sorted(EXPORT_HEADERS), help='what to export')
+        parser.add_argument('question_ids', nargs='*', type=int,
+                            help='ids of the questions to export, all questions if omitted')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--anonymize', action='store_true',
+                            help='replace the user ids of the votes with pseudonyms')
+        parser.add_argument('--output', help='write to this file instead of the standard output')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='rows fetched at a time')
+
+    def handle(self, *args, **options):
+        """Write the export line by line."""
+        questions = None
+        if options['question_ids']:
+            questions = Question.objects.filter(pk__in=options['question_ids'])
+        rows = export_rows(options['kind'], questions, anonymous=options['anonymize'],
+                           chunk_size=options['chunk_size'])
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else None
+        try:
+            write = output.write if output else self.stdout.write
+            for line in encode(rows, EXPORT_HEADERS[options['kind']], options['format']):
+                if output:
+                    write(line)
+                else:
+                    write(line, ending='')
+        finally:
+            if output:
+                output.close()
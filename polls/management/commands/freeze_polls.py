@@ -0,0 +1,30 @@
+"""Module for the freeze_polls command."""
+from django.core.management.base import BaseCommand, CommandError
+from polls.archive import freeze_closed, freeze_question
+from polls.models import Question
+
+
+class Command(BaseCommand):
+    """Freeze the final results of the closed questions."""
+
+    help = 'Freeze the final results of the closed questions, optionally moving their votes to the archive table.'
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument('question_ids', nargs='*', type=int,
+                            help='ids of the closed questions to freeze, every closed question if omitted')
+        parser.add_argument('--archive-votes', action='store_true',
+                            help='move the Vote rows of the frozen questions to ArchivedVote')
+
+    def handle(self, *args, **options):
+        """Freeze the questions and report them."""
+        if options['question_ids']:
+            question_ids = options['question_ids']
+            for question_id in question_ids:
+                try:
+                    freeze_question(question_id, archive_votes=options['archive_votes'])
+                except (ValueError, Question.DoesNotExist) as error:
+                    raise CommandError('Question %d: %s' % (question_id, error))
+        else:
+            question_ids = freeze_closed(archive_votes=options['archive_votes'])
+        self.stdout.write(self.style.SUCCESS('Froze %d question(s).' % len(question_ids)))
@@ -0,0 +1,33 @@
+"""Module for the import_polls command."""
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from polls.transfer import FORMATS, import_questions, read_csv, read_jsonl
+
+
+class Command(BaseCommand):
+    """Create the questions and choices of a CSV or JSONL file in chunks."""
+
+    help = ('Create the questions and choices of a CSV file (question_text, pub_date, end_date, choice_text) '
+            'or a JSONL file ({"question_text", "pub_date", "end_date", "choices"}) with chunked bulk_create.')
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument('path', help="the file to import, '-' for the standard input")
+        parser.add_argument('--format', choices=FORMATS, help='format of the file, from its extension if omitted')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='questions created at a time')
+
+    def handle(self, *args, **options):
+        """Import the file and report the created rows."""
+        fmt = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if fmt not in FORMATS:
+            raise CommandError('Unknown format, use --format %s.' % '|'.join(FORMATS))
+        reader = read_csv if fmt == 'csv' else read_jsonl
+        lines = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        try:
+            questions, choices = import_questions(reader(lines), chunk_size=options['chunk_size'])
+        except (KeyError, ValueError) as error:
+            raise CommandError('Invalid input: %s' % error)
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+        self.stdout.write(self.style.SUCCESS('Imported %d question(s) and %d choice(s).' % (questions, choices)))
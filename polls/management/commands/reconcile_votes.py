@@ -0,0 +1,25 @@
+"""Module for the reconcile_votes command."""
+from django.core.management.base import BaseCommand
+from polls.tally import reconcile_tallies
+
+
+class Command(BaseCommand):
+    """Recount Choice.votes from the Vote rows and repair the drifted choices."""
+
+    help = 'Recount Choice.votes from the Vote rows and repair the drifted choices.'
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument('question_ids', nargs='*', type=int,
+                            help='ids of the questions to check, all questions if omitted')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='only report the drifted choices without saving')
+
+    def handle(self, *args, **options):
+        """Run the reconcile and report every drifted choice."""
+        questions = options['question_ids'] or None
+        drifted = reconcile_tallies(questions, dry_run=options['dry_run'])
+        for choice, stored, total in drifted:
+            self.stdout.write('Choice %d (%s): %d -> %d' % (choice.pk, choice, stored, total))
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS('%s %d drifted choice(s).' % (verb, len(drifted))))
@@ -0,0 +1,32 @@
+"""Module for the sync_replicas command."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from polls.routers import get_replicas
+
+
+class Command(BaseCommand):
+    """Copy the SQLite default database to its SQLite read replicas."""
+
+    help = ('Copy the SQLite default database to the SQLite read replicas of POLLS_READ_REPLICAS, '
+            'to try the replica routing locally. PostgreSQL replicas are kept by the server.')
+
+    def add_arguments(self, parser):
+        """Add the arguments of the command."""
+        parser.add_argument('aliases', nargs='*', help='aliases of the replicas to copy to, every replica if omitted')
+
+    def handle(self, *args, **options):
+        """Copy the default database to every replica with the SQLite backup API."""
+        aliases = options['aliases'] or get_replicas()
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Only SQLite replicas can be copied, the default database is %s.' % primary.vendor)
+        unknown = set(aliases) - set(get_replicas())
+        if unknown:
+            raise CommandError('Not a read replica: %s.' % ', '.join(sorted(unknown)))
+        primary.ensure_connection()
+        for alias in aliases:
+            replica = connections[alias]
+            replica.ensure_connection()
+            primary.connection.backup(replica.connection)
+            self.stdout.write('Copied %s to %s.' % (primary.settings_dict['NAME'], replica.settings_dict['NAME']))
+        self.stdout.write(self.style.SUCCESS('Synced %d replica(s).' % len(aliases)))
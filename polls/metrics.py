@@ -0,0 +1,213 @@
+"""Module for the per-request query and latency metrics of the polls."""
+import functools
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+log = logging.getLogger("polls")
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RequestTimer:
+    """Class of the timer of one request.
+
+    ...
+
+    The timer is also a database execute wrapper, so it counts and times
+    every query of the connections it is installed on.
+
+    Attributes
+    ----------
+    queries : int
+        number of the queries
+    db_time : float
+        seconds spent in the queries
+    render_time : float
+        seconds spent rendering the template response
+    wall_time : float
+        seconds of the whole request
+
+    """
+
+    def __init__(self):
+        """Start the timer."""
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.wall_time = 0.0
+        self._start = time.perf_counter()
+        self._render_start = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Run and time one query."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+    def installed(self):
+        """Return the context manager that installs the timer on every database connection."""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+    def render_started(self):
+        """Mark the start of the template rendering."""
+        self._render_start = time.perf_counter()
+
+    def render_finished(self, response=None):
+        """Mark the end of the template rendering, usable as a post-render callback."""
+        if self._render_start is not None:
+            self.render_time += time.perf_counter() - self._render_start
+            self._render_start = None
+
+    def stop(self):
+        """Stop the timer and return the wall time."""
+        self.wall_time = time.perf_counter() - self._start
+        return self.wall_time
+
+
+class MetricsRegistry:
+    """Class of the ring buffers of the request metrics of every url name.
+
+    ...
+
+    Methods
+    -------
+    record(name, timer)
+        keep the metrics of one finished request.
+
+    summary()
+        percentiles of the kept requests of every url name.
+
+    prometheus()
+        the metrics in the Prometheus text format.
+
+    """
+
+    def __init__(self, size=None):
+        """Create the registry that keeps the last size requests of every url name."""
+        self.size = size or getattr(settings, 'POLLS_METRICS_WINDOW', 1000)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget every recorded request."""
+        with self._lock:
+            self._samples = defaultdict(lambda: deque(maxlen=self.size))
+            self._totals = defaultdict(lambda: [0, 0.0])
+
+    def record(self, name, timer):
+        """
+        Keep the metrics of one finished request.
+
+        Parameters
+        ----------
+        name : str
+            url name of the request, like polls:index
+        timer : RequestTimer
+            the stopped timer of the request
+        """
+        with self._lock:
+            self._samples[name].append((timer.wall_time, timer.db_time, timer.render_time, timer.queries))
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += timer.wall_time
+
+    def summary(self):
+        """
+        Summarize the kept requests of every url name.
+
+        Return:
+        dict of url name to the count, the total wall time and the
+        percentiles of the wall, database and render time and of the
+        number of queries.
+        """
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+            totals = {name: tuple(values) for name, values in self._totals.items()}
+        result = {}
+        for name, values in sorted(samples.items()):
+            columns = list(zip(*values))
+            result[name] = {'count': totals[name][0], 'sum': totals[name][1]}
+            for field, column in zip(('wall', 'db', 'render', 'queries'), columns):
+                result[name][field] = {quantile: percentile(column, quantile) for quantile in QUANTILES}
+        return result
+
+    def prometheus(self):
+        """Return the summary in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = []
+        metrics = (('wall', 'polls_request_seconds', 'Wall time of the requests.'),
+                   ('db', 'polls_db_seconds', 'Database time of the requests.'),
+                   ('render', 'polls_render_seconds', 'Template render time of the requests.'),
+                   ('queries', 'polls_queries', 'Database queries of the requests.'))
+        for field, metric, description in metrics:
+            lines.append('# HELP %s %s' % (metric, description))
+            lines.append('# TYPE %s summary' % metric)
+            for name, values in summary.items():
+                for quantile, value in values[field].items():
+                    lines.append('%s{view="%s",quantile="%s"} %s' % (metric, name, quantile, repr(float(value))))
+                if field == 'wall':
+                    lines.append('%s_count{view="%s"} %d' % (metric, name, values['count']))
+                    lines.append('%s_sum{view="%s"} %s' % (metric, name, repr(float(values['sum']))))
+        return '\n'.join(lines) + '\n'
+
+
+def percentile(values, fraction):
+    """Return the value at the fraction of the sorted values, 0 if there is none."""
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def finish_request(request, timer):
+    """Record the stopped timer of the request and log it if it is slow."""
+    timer.stop()
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return
+    registry.record(match.view_name, timer)
+    threshold = getattr(settings, 'POLLS_SLOW_REQUEST_SECONDS', 0.5)
+    if threshold is not None and timer.wall_time > threshold:
+        log.warning("Slow request: %s %s (%s), %.3fs, %d queries, db %.3fs, render %.3fs.",
+                    request.method, request.path, match.view_name, timer.wall_time, timer.queries,
+                    timer.db_time, timer.render_time)
+
+
+def instrument(view):
+    """
+    Record the metrics of the view when RequestMetricsMiddleware is not installed.
+
+    Parameters
+    ----------
+    view : callable
+        the view function
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if hasattr(request, 'polls_timer'):
+            return view(request, *args, **kwargs)
+        timer = RequestTimer()
+        request.polls_timer = timer
+        with timer.installed():
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                timer.render_started()
+                response.render()
+                timer.render_finished()
+        finish_request(request, timer)
+        return response
+    return wrapper
+
+
+registry = MetricsRegistry()
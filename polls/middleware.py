@@ -0,0 +1,117 @@
+"""Module for the middleware of the polls."""
+import asyncio
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .metrics import RequestTimer, finish_request
+from .routers import get_replicas, use_primary
+
+
+class SyncAndAsyncMiddleware:
+    """Class of the base of the middlewares that run in both the sync and the async handler.
+
+    ...
+
+    Like the middlewares of Django, an instance whose next handler is a
+    coroutine function is marked as one itself, so the ASGI handler awaits
+    it directly instead of running it in a thread. __call__ then hands the
+    request to the coroutine __acall__ of the subclass.
+
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Keep the next handler of the chain and take its mode."""
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+
+class RequestMetricsMiddleware(SyncAndAsyncMiddleware):
+    """Class of the middleware that records the queries and the latency of every request.
+
+    ...
+
+    The query count, database time, template render time and wall time
+    of each request are kept by polls.metrics.registry under the url name
+    of the request. The timer is installed on the connections of the
+    request thread only, so the queries of the thread pool of the async
+    views, and under ASGI the queries of any view, are not counted.
+
+    """
+
+    def __call__(self, request):
+        """Time the request and record it."""
+        if self.is_async:
+            return self.__acall__(request)
+        timer = RequestTimer()
+        request.polls_timer = timer
+        with timer.installed():
+            response = self.get_response(request)
+        finish_request(request, timer)
+        return response
+
+    async def __acall__(self, request):
+        """Time the request of the async handler and record it."""
+        timer = RequestTimer()
+        request.polls_timer = timer
+        response = await self.get_response(request)
+        finish_request(request, timer)
+        return response
+
+    def process_template_response(self, request, response):
+        """Time the rendering of the template response."""
+        timer = getattr(request, 'polls_timer', None)
+        if timer is not None:
+            timer.render_started()
+            response.add_post_render_callback(timer.render_finished)
+        return response
+
+
+class ReplicaStickinessMiddleware(SyncAndAsyncMiddleware):
+    """Class of the middleware that keeps the reads of a user on the primary right after their writes.
+
+    ...
+
+    A request that may write, anything but GET, HEAD and OPTIONS, reads
+    from the primary and opens a window of POLLS_REPLICA_STICKY_SECONDS in
+    the session. The reads of the next requests of that session go to the
+    primary too until the window closes, so the results page shown after
+    a vote counts the vote even if the replicas lag behind. It must come
+    after SessionMiddleware and does nothing without POLLS_READ_REPLICAS.
+
+    """
+
+    session_key = 'polls_primary_until'
+
+    def __call__(self, request):
+        """Pin the reads of the request to the primary if it may write or follows a write."""
+        if self.is_async:
+            return self.__acall__(request)
+        if not get_replicas():
+            return self.get_response(request)
+        writes = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        if not writes and request.session.get(self.session_key, 0) <= time.time():
+            return self.get_response(request)
+        with use_primary():
+            response = self.get_response(request)
+        if writes:
+            request.session[self.session_key] = time.time() + getattr(settings, 'POLLS_REPLICA_STICKY_SECONDS', 5)
+        return response
+
+    async def __acall__(self, request):
+        """Pin the reads of the request of the async handler, loading the session in a thread."""
+        if not get_replicas():
+            return await self.get_response(request)
+        writes = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        if not writes and await sync_to_async(request.session.get)(self.session_key, 0) <= time.time():
+            return await self.get_response(request)
+        with use_primary():
+            response = await self.get_response(request)
+        if writes:
+            until = time.time() + getattr(settings, 'POLLS_REPLICA_STICKY_SECONDS', 5)
+            await sync_to_async(request.session.__setitem__)(self.session_key, until)
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.2 on 2026-10-18 10:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0010_auto_20201030_2226'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='question',
+            name='previous_vote',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.2 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0011_remove_question_previous_vote'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['pub_date', 'end_date'], name='polls_question_pub_end_idx'),
+        ),
+    ]
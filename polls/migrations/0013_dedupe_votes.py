@@ -0,0 +1,31 @@
+# Generated by Django 3.1.2 on 2026-10-18 11:40
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def dedupe_votes(apps, schema_editor):
+    """Keep only the latest vote of every (user, question) and recount the touched choices."""
+    Vote = apps.get_model('polls', 'Vote')
+    Choice = apps.get_model('polls', 'Choice')
+    duplicates = (Vote.objects.filter(user__isnull=False).values('user', 'question')
+                  .annotate(latest=Max('id'), total=Count('id')).filter(total__gt=1).order_by())
+    questions = set()
+    for duplicate in duplicates:
+        (Vote.objects.filter(user=duplicate['user'], question=duplicate['question'])
+         .exclude(id=duplicate['latest']).delete())
+        questions.add(duplicate['question'])
+    for choice in Choice.objects.filter(question__in=questions):
+        choice.votes = Vote.objects.filter(selected_choice=choice).count()
+        choice.save(update_fields=['votes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0012_question_pub_end_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_votes, migrations.RunPython.noop),
+    ]
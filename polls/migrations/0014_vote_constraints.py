@@ -0,0 +1,21 @@
+# Generated by Django 3.1.2 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0013_dedupe_votes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('user', 'question'), name='polls_vote_user_question_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['question', 'selected_choice'], name='polls_vote_question_choice_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.1.2 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0015_archivedresult_archivedvote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField()),
+                ('event', models.CharField(max_length=32)),
+                ('username', models.CharField(blank=True, max_length=150)),
+                ('ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('question_id', models.IntegerField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.1.2 on 2026-10-18 14:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0017_choicecountershard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedvote',
+            name='cast_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='archivedvote',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedvote',
+            name='switches',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='cast_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='switches',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
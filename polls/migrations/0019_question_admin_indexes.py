@@ -0,0 +1,37 @@
+# Generated by Django 3.1.2 on 2026-10-18 18:46
+
+from django.db import migrations, models
+
+PREFIX_INDEXES = {
+    'postgresql': 'CREATE INDEX polls_question_text_prefix_idx ON polls_question '
+                  '(UPPER(question_text::text) text_pattern_ops)',
+    'sqlite': 'CREATE INDEX polls_question_text_prefix_idx ON polls_question (question_text COLLATE NOCASE)',
+}
+
+
+def create_prefix_index(apps, schema_editor):
+    """Index the question text for the case-insensitive prefix search of the admin, where the backend can."""
+    sql = PREFIX_INDEXES.get(schema_editor.connection.vendor)
+    if sql:
+        schema_editor.execute(sql)
+
+
+def drop_prefix_index(apps, schema_editor):
+    """Drop the index of the prefix search."""
+    if schema_editor.connection.vendor in PREFIX_INDEXES:
+        schema_editor.execute('DROP INDEX IF EXISTS polls_question_text_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0018_vote_times'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['pub_date', 'id'], name='polls_question_pub_id_idx'),
+        ),
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
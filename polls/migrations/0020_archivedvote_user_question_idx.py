@@ -0,0 +1,17 @@
+# Generated by Django 3.1.2 on 2026-10-18 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0019_question_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedvote',
+            index=models.Index(fields=['user', 'question'], name='polls_archvote_user_q_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.1.2 on 2026-10-18 19:40
+
+from django.db import migrations, models
+from django.db.migrations.recorder import MigrationRecorder
+import django.utils.timezone
+
+
+def clear_stamped_times(apps, schema_editor):
+    """Set cast_at to NULL on the votes that 0018 stamped with the time it ran, instead of their cast time."""
+    recorder = MigrationRecorder(schema_editor.connection)
+    applied = (recorder.migration_qs.filter(app='polls', name='0018_vote_times')
+               .values_list('applied', flat=True).first())
+    if applied is None:
+        return
+    for name in ('Vote', 'ArchivedVote'):
+        model = apps.get_model('polls', name)
+        model.objects.using(schema_editor.connection.alias).filter(cast_at__lte=applied).update(cast_at=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0020_archivedvote_user_question_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedvote',
+            name='cast_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AlterField(
+            model_name='vote',
+            name='cast_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+        migrations.RunPython(clear_stamped_times, migrations.RunPython.noop),
+    ]
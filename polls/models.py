@@ -1,10 +1,84 @@
 """Module for using in models."""
 import datetime
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.contrib.auth.models import User
 
 
+class QuestionQuerySet(models.QuerySet):
+    """Class of the queryset of questions with the state predicates in SQL.
+
+    ...
+
+    Every method takes the optional now, so one request can use the same
+    time for all of them. The predicates only compare pub_date and
+    end_date, which polls_question_pub_end_idx covers.
+
+    Methods
+    -------
+    published(now=None)
+        the questions that are published.
+
+    open_for_voting(now=None)
+        the questions that can vote, like Question.can_vote().
+
+    closed(now=None)
+        the questions whose end date has passed.
+
+    recent(now=None)
+        the questions published in the last day, like Question.was_published_recently().
+
+    with_is_open(now=None)
+        annotate whether every question can vote as is_open.
+
+    with_published_recently(now=None)
+        annotate whether every question was published in the last day as published_recently.
+
+    with_total_votes()
+        annotate the votes of all the choices of every question as total_votes.
+
+    """
+
+    def published(self, now=None):
+        """Return the questions published at now."""
+        return self.filter(pub_date__lte=now or timezone.now())
+
+    def open_for_voting(self, now=None):
+        """Return the questions that can vote at now."""
+        now = now or timezone.now()
+        return self.filter(pub_date__lte=now, end_date__gte=now)
+
+    def closed(self, now=None):
+        """Return the questions that ended before now."""
+        return self.filter(end_date__lt=now or timezone.now())
+
+    def recent(self, now=None):
+        """Return the questions published in the day before now."""
+        now = now or timezone.now()
+        return self.filter(pub_date__gte=now - datetime.timedelta(days=1), pub_date__lte=now)
+
+    def with_is_open(self, now=None):
+        """Annotate whether every question can vote at now as is_open."""
+        now = now or timezone.now()
+        return self.annotate(is_open=models.ExpressionWrapper(models.Q(pub_date__lte=now, end_date__gte=now),
+                                                              output_field=models.BooleanField()))
+
+    def with_published_recently(self, now=None):
+        """Annotate whether every question was published in the day before now as published_recently."""
+        now = now or timezone.now()
+        recent = models.Q(pub_date__gte=now - datetime.timedelta(days=1), pub_date__lte=now)
+        return self.annotate(published_recently=models.ExpressionWrapper(recent, output_field=models.BooleanField()))
+
+    def with_total_votes(self):
+        """Annotate the votes of every question, with the deltas of the counter shards, as total_votes."""
+        votes = (Choice.objects.filter(question=models.OuterRef('pk')).order_by()
+                 .values('question').annotate(total=models.Sum('votes')).values('total'))
+        pending = (ChoiceCounterShard.objects.filter(choice__question=models.OuterRef('pk')).order_by()
+                   .values('choice__question').annotate(total=models.Sum('delta')).values('total'))
+        return self.annotate(total_votes=Coalesce(models.Subquery(votes), 0) + Coalesce(models.Subquery(pending), 0))
+
+
 class Question(models.Model):
     """Class of question.
 
@@ -36,7 +110,14 @@ class Question(models.Model):
     pub_date = models.DateTimeField('date published')
     end_date = models.DateTimeField(
         'date end', default=timezone.now() + datetime.timedelta(days=1))
-    previous_vote = models.CharField(max_length=200, default="")
+
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pub_date', 'end_date'], name='polls_question_pub_end_idx'),
+            models.Index(fields=['pub_date', 'id'], name='polls_question_pub_id_idx'),
+        ]
 
     def __str__(self):
         """
@@ -81,6 +162,25 @@ class Question(models.Model):
         return self.pub_date <= now <= self.end_date
 
 
+class ChoiceQuerySet(models.QuerySet):
+    """Class of the queryset of choices with the votes still kept in their counter shards.
+
+    ...
+
+    Methods
+    -------
+    with_tally()
+        annotate Choice.votes plus the deltas of the counter shards of every choice as tally.
+
+    """
+
+    def with_tally(self):
+        """Annotate the votes of every choice, with the deltas not yet compacted, as tally."""
+        pending = (ChoiceCounterShard.objects.filter(choice=models.OuterRef('pk')).order_by()
+                   .values('choice').annotate(total=models.Sum('delta')).values('total'))
+        return self.annotate(tally=models.F('votes') + Coalesce(models.Subquery(pending), 0))
+
+
 class Choice(models.Model):
     """Class of choice."""
 
@@ -88,6 +188,8 @@ class Choice(models.Model):
     choice_text = models.CharField(max_length=200)
     votes = models.IntegerField(default=0)
 
+    objects = ChoiceQuerySet.as_manager()
+
     def __str__(self):
         """
         Sting method.
@@ -98,9 +200,116 @@ class Choice(models.Model):
         return self.choice_text
 
 
+class ChoiceCounterShard(models.Model):
+    """Class of one stripe of the vote counter of a choice.
+
+    ...
+
+    With POLLS_VOTE_COUNTER_SHARDS above 1 a vote adds to a random shard
+    of its choice instead of Choice.votes, so the votes of one hot choice
+    lock different rows. The tally of a choice is Choice.votes plus the
+    delta of its shards until polls.tally.compact_counters() folds them in.
+
+    Attributes
+    ----------
+    choice : ForeignKey
+        the counted choice
+    shard : PositiveSmallIntegerField
+        number of the shard, from 0 to POLLS_VOTE_COUNTER_SHARDS - 1
+    delta : IntegerField
+        votes counted by the shard since the last compaction
+
+    """
+
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name='counter_shards')
+    shard = models.PositiveSmallIntegerField()
+    delta = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'shard'], name='polls_countershard_choice_shard_uniq'),
+        ]
+
+
 class Vote(models.Model):
-    """Class of the user vote."""
+    """Class of the user vote.
+
+    ...
+
+    Attributes
+    ----------
+    cast_at : DateTimeField
+        when the user first voted the question, None for the votes cast
+        before the times were recorded
+    changed_at : DateTimeField
+        when the user last switched to another choice, None if never
+    switches : PositiveIntegerField
+        number of the times the user switched the choice
+
+    """
 
     user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     selected_choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    cast_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
+    changed_at = models.DateTimeField(null=True, blank=True)
+    switches = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'question'], name='polls_vote_user_question_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'selected_choice'], name='polls_vote_question_choice_idx'),
+        ]
+
+
+class ArchivedResult(models.Model):
+    """Class of the frozen final results of a closed question.
+
+    ...
+
+    Attributes
+    ----------
+    question : OneToOneField
+        the closed question, also the primary key
+    total : PositiveIntegerField
+        total votes of the question
+    choices : JSONField
+        [choice id, choice text, votes] of every choice
+    frozen_at : DateTimeField
+        when the results were frozen
+
+    """
+
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True)
+    total = models.PositiveIntegerField()
+    choices = models.JSONField()
+    frozen_at = models.DateTimeField(auto_now_add=True)
+
+
+class ArchivedVote(models.Model):
+    """Class of the vote of a frozen question, moved out of the Vote table with its times."""
+
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, db_index=False)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    selected_choice = models.ForeignKey(Choice, on_delete=models.CASCADE, db_index=False)
+    cast_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
+    changed_at = models.DateTimeField(null=True, blank=True)
+    switches = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # The previous votes of a user are looked up on the first page of every session.
+        indexes = [
+            models.Index(fields=['user', 'question'], name='polls_archvote_user_q_idx'),
+        ]
+
+
+class AuditEvent(models.Model):
+    """Class of one login, logout or vote of the audit trail, written in batches by polls.audit."""
+
+    created = models.DateTimeField()
+    event = models.CharField(max_length=32)
+    username = models.CharField(max_length=150, blank=True)
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    question_id = models.IntegerField(null=True, blank=True)
@@ -0,0 +1,134 @@
+"""Module for the keyset pagination of the questions and the estimated counts of the admin."""
+import base64
+import binascii
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(question):
+    """
+    Encode the position of the question into a cursor.
+
+    Parameters
+    ----------
+    question : Question
+        the last question of the page
+
+    Return:
+    the url-safe cursor of the (pub_date, id) of the question.
+    """
+    value = '%s|%d' % (question.pub_date.isoformat(), question.id)
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode the cursor made by encode_cursor().
+
+    Parameters
+    ----------
+    cursor : str
+        the cursor from the request
+
+    Return:
+    (pub_date, id) of the cursor, None if the cursor is missing or invalid.
+    """
+    if not cursor:
+        return None
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        pub_date, pk = value.split('|')
+        pub_date, pk = parse_datetime(pub_date), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+def after_cursor(queryset, cursor):
+    """
+    Filter the questions that come after the cursor in the (-pub_date, -id) order.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+        the questions ordered by (-pub_date, -id)
+    cursor : str
+        the cursor from the request
+
+    Return:
+    the questions after the cursor, all the questions if the cursor is invalid.
+    """
+    position = decode_cursor(cursor)
+    if position is None:
+        return queryset
+    pub_date, pk = position
+    return queryset.filter(Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk))
+
+
+def estimate_count(queryset):
+    """
+    Estimate the rows of the unfiltered queryset from the statistics of the database.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+        the queryset to count
+
+    Return:
+    the row count of pg_class.reltuples on PostgreSQL or of sqlite_stat1
+    on SQLite, None if the queryset is filtered or there are no statistics.
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.low_mark or query.high_mark is not None:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            try:
+                # Every row of the table has its row count first, sqlite_stat1 only exists after ANALYZE.
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            except DatabaseError:
+                return None
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    count = int(float(str(row[0]).split()[0]))
+    return count if count > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Class of the paginator that estimates the count of the large unfiltered tables.
+
+    ...
+
+    The exact COUNT(*) of a large table reads all of it on every page.
+    When the queryset is not filtered and the statistics of the database
+    count more than POLLS_ADMIN_EXACT_COUNT rows, the estimate is used
+    instead. The filtered querysets and the smaller tables are counted
+    exactly.
+
+    Attributes
+    ----------
+    count : int
+        the estimated or the exact number of the objects.
+
+    """
+
+    @cached_property
+    def count(self):
+        """Return the estimated number of the objects when the table is large, the exact one otherwise."""
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate > getattr(settings, 'POLLS_ADMIN_EXACT_COUNT', 10000):
+            return estimate
+        return super().count
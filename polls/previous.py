@@ -0,0 +1,65 @@
+"""Module for looking up the previous votes of the user."""
+from django.conf import settings
+from .cache import votes_version
+from .models import Vote, ArchivedVote
+
+SESSION_KEY = 'polls_previous_votes'
+
+
+def previous_votes(request):
+    """
+    Get the previous votes of the user who sent the request.
+
+    The votes, with the archived ones, are loaded with one query and, unless
+    POLLS_CACHE_PREVIOUS_VOTES is False, kept in the session under the
+    version of the votes of the user. A vote from another session or
+    device bumps the version, so the next request loads them again.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request from user
+
+    Return:
+    dict of question id to the text of the choice the user voted.
+    """
+    if not request.user.is_authenticated:
+        return {}
+    use_session = getattr(settings, 'POLLS_CACHE_PREVIOUS_VOTES', True)
+    if use_session:
+        # Read before the votes, a vote committed in between bumps it past the copy.
+        version = votes_version(request.user.pk)
+        cached = request.session.get(SESSION_KEY)
+        if cached is not None and cached.get('version') == version:
+            return {int(question_id): text for question_id, text in cached['votes'].items()}
+    archived = (ArchivedVote.objects.filter(user=request.user)
+                .values_list('question_id', 'selected_choice__choice_text'))
+    votes = dict(Vote.objects.filter(user=request.user)
+                 .values_list('question_id', 'selected_choice__choice_text').union(archived, all=True))
+    if use_session:
+        request.session[SESSION_KEY] = {'version': version,
+                                        'votes': {str(question_id): text for question_id, text in votes.items()}}
+    return votes
+
+
+def remember_vote(request, question_id, choice):
+    """
+    Update the previous vote cached in the session after the user votes.
+
+    A buffered vote is shown before it is written. A written vote has
+    already bumped the version of the votes, so the next request loads
+    them again anyway.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request from user
+    question_id : int
+        id of the voted question
+    choice : Choice
+        The selected choice
+    """
+    cached = request.session.get(SESSION_KEY)
+    if cached is not None and 'votes' in cached:
+        cached['votes'][str(question_id)] = choice.choice_text
+        request.session.modified = True
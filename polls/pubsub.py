@@ -0,0 +1,166 @@
+"""Module for publishing the vote deltas to the results watchers."""
+import asyncio
+import threading
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Subscription:
+    """Class of one watcher of the vote deltas of a question.
+
+    ...
+
+    The deltas that arrive before the watcher reads them are summed
+    into one, so a burst of votes costs the watcher one update. Every
+    delta carries the version of the question it made, the ones at or
+    below the version of the snapshot the watcher started from are
+    dropped.
+
+    Methods
+    -------
+    push(delta, version=None)
+        add the delta to the pending ones, from any thread.
+
+    skip_through(version)
+        drop the deltas up to the version, they are in the snapshot.
+
+    get()
+        wait for the pending deltas and take their sum.
+
+    close()
+        stop watching the question.
+
+    """
+
+    def __init__(self, broker, question_id):
+        """Create the subscription on the running event loop."""
+        self.broker = broker
+        self.question_id = question_id
+        self._loop = asyncio.get_running_loop()
+        self._pending = []
+        self._floor = None
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+
+    def push(self, delta, version=None):
+        """
+        Add the delta to the pending deltas and wake the watcher.
+
+        Parameters
+        ----------
+        delta : dict
+            choice id to the change of its votes
+        version : int, optional
+            version of the question made by the votes of the delta
+        """
+        with self._lock:
+            self._pending.append((version, delta))
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # The event loop of the watcher is already closed.
+            self.close()
+
+    def skip_through(self, version):
+        """Drop the deltas up to the version, pending or to come, the snapshot of that version counts them."""
+        with self._lock:
+            self._floor = version
+
+    async def get(self):
+        """
+        Wait until there are pending deltas newer than the snapshot and take their sum.
+
+        Return:
+        tuple of the latest version of the deltas, None if they have none,
+        and the dict of choice id to the change of its votes since the
+        last get().
+        """
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            with self._lock:
+                pending, self._pending = self._pending, []
+                floor = self._floor
+            delta, latest = Counter(), None
+            for version, change in pending:
+                if version is not None and floor is not None and version <= floor:
+                    continue
+                delta.update(change)
+                if version is not None:
+                    latest = version if latest is None else max(latest, version)
+            delta = {choice_id: change for choice_id, change in delta.items() if change}
+            if delta:
+                return latest, delta
+
+    def close(self):
+        """Stop watching the question."""
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Class of the in-process broker of the vote deltas.
+
+    ...
+
+    Another backend can be set with POLLS_PUBSUB_BACKEND, it needs the
+    same subscribe(), unsubscribe() and publish() methods.
+
+    """
+
+    def __init__(self):
+        """Create the broker without any subscription."""
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, question_id):
+        """Return a new Subscription to the vote deltas of the question."""
+        subscription = Subscription(self, question_id)
+        with self._lock:
+            self._subscriptions[question_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove the subscription."""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.question_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.question_id]
+
+    def publish(self, question_id, delta, version=None):
+        """
+        Send the vote delta of the question to every subscription of it.
+
+        Parameters
+        ----------
+        question_id : int
+            id of the voted question
+        delta : dict
+            choice id to the change of its votes
+        version : int, optional
+            version of the question made by the votes of the delta
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(question_id, ()))
+        for subscription in subscriptions:
+            subscription.push(delta, version)
+
+    def watchers(self, question_id):
+        """Return the number of the subscriptions of the question."""
+        with self._lock:
+            return len(self._subscriptions.get(question_id, ()))
+
+
+def get_broker():
+    """Return the broker of the process, made from POLLS_PUBSUB_BACKEND."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'POLLS_PUBSUB_BACKEND', 'polls.pubsub.LocalBroker'))()
+    return _broker
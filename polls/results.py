@@ -0,0 +1,131 @@
+"""Module for the cached results snapshot of the questions."""
+import threading
+from django.conf import settings
+from django.utils import timezone
+from .archive import freeze_question
+from .cache import get_cache, question_version
+from .models import Question, Choice, ArchivedResult
+from .routers import use_primary
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def snapshot_key(question_id, version):
+    """Return the cache key of the results snapshot of the question."""
+    return 'polls:results:%d:%d' % (question_id, version)
+
+
+def make_snapshot(question_id, version, rows):
+    """
+    Make the results snapshot from the choice rows.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the question
+    version : int
+        version of the question that the rows were read at
+    rows : iterable
+        (choice id, choice text, votes) of every choice
+
+    Return:
+    dict with the question id, the version, the total votes and the
+    id, text, votes and percent of every choice.
+    """
+    rows = list(rows)
+    total = sum(votes for choice_id, text, votes in rows)
+    choices = [{'id': choice_id, 'text': text, 'votes': votes,
+                'percent': round(100.0 * votes / total, 1) if total else 0.0}
+               for choice_id, text, votes in rows]
+    return {'question_id': question_id, 'version': version, 'total': total, 'choices': choices}
+
+
+def get_snapshot(question_id, attempts=3):
+    """
+    Get the results snapshot of the question.
+
+    The snapshot is cached under the version of the question, so a vote
+    or an edit that bumps the version makes the next call rebuild it. The
+    results of a closed question are frozen into an ArchivedResult the
+    first time they are read, unless POLLS_FREEZE_ON_READ is False, and
+    are only read from it afterwards. A snapshot is always built from the
+    primary database, a lagging replica would cache old counts under the
+    new version.
+
+    The version is read again after the rows. A vote that bumped it in
+    between may already be counted in the rows, so the snapshot is built
+    again under the new version. When the votes keep coming through every
+    attempt, the last rows get the later version and are not cached, so
+    a stream never adds a delta that they may already count.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the question
+    attempts : int
+        most times the rows are read while the version moves
+
+    Return:
+    the results snapshot made by make_snapshot().
+    """
+    cache = get_cache()
+    version = question_version(question_id)
+    snapshot = cache.get(snapshot_key(question_id, version))
+    with _stats_lock:
+        _stats['hits' if snapshot is not None else 'misses'] += 1
+    for attempt in range(attempts):
+        if snapshot is not None:
+            return snapshot
+        with use_primary():
+            archived = load_archived(question_id)
+            if archived is not None:
+                rows, timeout = archived.choices, None
+            else:
+                rows = list(Choice.objects.filter(question_id=question_id).with_tally().order_by('pk')
+                            .values_list('id', 'choice_text', 'tally'))
+                timeout = getattr(settings, 'POLLS_RESULTS_TIMEOUT', 300)
+        latest = question_version(question_id)
+        if latest == version:
+            snapshot = make_snapshot(question_id, version, rows)
+            cache.set(snapshot_key(question_id, version), snapshot, timeout)
+            return snapshot
+        version = latest
+        snapshot = cache.get(snapshot_key(question_id, version))
+    return snapshot or make_snapshot(question_id, version, rows)
+
+
+def load_archived(question_id):
+    """
+    Load the frozen results of the question, freezing them if it has just closed.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the question
+
+    Return:
+    the ArchivedResult of the question, None if it can still vote.
+    """
+    question = Question.objects.select_related('archivedresult').filter(pk=question_id).first()
+    if question is None:
+        return None
+    try:
+        return question.archivedresult
+    except ArchivedResult.DoesNotExist:
+        pass
+    if getattr(settings, 'POLLS_FREEZE_ON_READ', True) and question.end_date < timezone.now():
+        return freeze_question(question_id)
+    return None
+
+
+def cache_stats():
+    """Return the hits and the misses of the results snapshot cache in this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    """Reset the hits and the misses of the results snapshot cache."""
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
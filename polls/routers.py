@@ -0,0 +1,62 @@
+"""Module for routing the reads of the polls to the read replicas."""
+import contextvars
+import random
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Apps whose rows must be read right after they are written, like the
+# session that holds the stickiness window itself.
+PRIMARY_APPS = {'sessions'}
+
+_use_primary = contextvars.ContextVar('polls_use_primary', default=False)
+
+
+def get_replicas():
+    """Return the aliases of the read replicas, set by POLLS_READ_REPLICAS."""
+    return getattr(settings, 'POLLS_READ_REPLICAS', [])
+
+
+@contextmanager
+def use_primary():
+    """Send every read of the block to the primary database."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def is_pinned():
+    """Return True if the reads of the current context go to the primary database."""
+    return _use_primary.get()
+
+
+class ReplicaRouter:
+    """Class of the router that reads from a random replica and writes to the primary.
+
+    ...
+
+    A read goes to the primary instead when the context is pinned by
+    use_primary() or ReplicaStickinessMiddleware, when a transaction is
+    open on the primary, so a locked read sees its own writes, or when it
+    reads one of PRIMARY_APPS.
+
+    """
+
+    def db_for_read(self, model, **hints):
+        """Return a replica unless the read has to see the primary."""
+        replicas = get_replicas()
+        if not replicas or _use_primary.get() or model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        """Return the primary."""
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow every relation, the replicas hold the same rows as the primary."""
+        return True
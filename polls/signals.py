@@ -0,0 +1,94 @@
+"""Module for the model signal receivers of the polls."""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .archive import thaw_question
+from .auth import forget_user
+from .blocking import defer
+from .cache import bump_content_version, bump_question_version, bump_list_version
+from .models import Question, Choice, ArchivedResult
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def bump_question(sender, instance, **kwargs):
+    """Bump the versions of the question and of the list of the questions when it is edited."""
+    bump_question_version(instance.pk)
+    bump_content_version(instance.pk)
+    bump_list_version()
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def bump_choice_question(sender, instance, **kwargs):
+    """Bump the versions of the question when one of its choices is edited."""
+    bump_question_version(instance.question_id)
+    bump_content_version(instance.question_id)
+
+
+@receiver(post_save, sender=Question)
+def thaw_reopened_question(sender, instance, created, **kwargs):
+    """Drop the frozen results of the question when its end date moves forward."""
+    if not created and instance.end_date >= timezone.now():
+        if ArchivedResult.objects.filter(question=instance).exists():
+            thaw_question(instance.pk)
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """Run POLLS_SQLITE_PRAGMAS on every new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'POLLS_SQLITE_PRAGMAS', {}).items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, instance, **kwargs):
+    """Drop the cached user when it is saved or deleted."""
+    forget_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+@receiver(m2m_changed, sender=get_user_model().user_permissions.through)
+def forget_cached_members(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drop the cached users whose groups or permissions change.
+
+    From the user side the instance is the user. From the group or the
+    permission side the users are in pk_set, or before a clear in the
+    users of the instance.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            forget_user(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        for user_id in pk_set:
+            forget_user(user_id)
+    elif action == 'pre_clear':
+        field = 'groups' if sender is get_user_model().groups.through else 'user_permissions'
+        for user_id in get_user_model()._default_manager.filter(**{field: instance}).values_list('pk', flat=True):
+            forget_user(user_id)
+
+
+def update_last_login(sender, user, **kwargs):
+    """
+    Save the login time of the user.
+
+    The update runs in the deferred thread pool after the response unless
+    POLLS_DEFER_LAST_LOGIN is False or the login is in a transaction.
+    It does not send post_save, so the cached user is kept. It is
+    connected by PollsConfig.ready() in place of the receiver of auth.
+    """
+    user.last_login = timezone.now()
+    users = get_user_model()._default_manager.filter(pk=user.pk)
+    if getattr(settings, 'POLLS_DEFER_LAST_LOGIN', True) and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        defer(users.update, last_login=user.last_login)
+    else:
+        users.update(last_login=user.last_login)
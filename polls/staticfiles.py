@@ -0,0 +1,197 @@
+"""Module for the hashed and precompressed static files of the project."""
+import gzip
+import json
+import mimetypes
+import os
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from .middleware import SyncAndAsyncMiddleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ttf', '.eot', '.otf')
+# File suffix of every encoding, the preferred one first.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress(data):
+    """
+    Compress the data with every available encoding.
+
+    Parameters
+    ----------
+    data : bytes
+        content of the file
+
+    Return:
+    dict of file suffix to the compressed bytes, only those at least 5% smaller than the data.
+    """
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {suffix: content for suffix, content in variants.items() if len(content) < len(data) * 0.95}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Class of the manifest storage that also writes the gzip and brotli variants of the collected files.
+
+    ...
+
+    The variants are written next to the files by collectstatic, .gz always
+    and .br when the brotli package is installed, so StaticFilesMiddleware
+    serves them without compressing anything at request time.
+
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Hash the files, then compress the original and the hashed name of every text file."""
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if hashed_name is not None:
+                names.update((name, hashed_name))
+        if dry_run:
+            return
+        for name in sorted(names):
+            if not name.endswith(COMPRESSIBLE) or not self.exists(name):
+                continue
+            with self.open(name) as original:
+                variants = compress(original.read())
+            for suffix, content in variants.items():
+                with open(self.path(name + suffix), 'wb') as variant:
+                    variant.write(content)
+                yield name, name + suffix, True
+
+
+def accepted_encodings(header):
+    """Return the content codings of the Accept-Encoding header that are not refused with q=0."""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        params = params.replace(' ', '')
+        try:
+            quality = float(params[2:]) if params.startswith('q=') else 1.0
+        except ValueError:
+            quality = 0.0
+        if coding.strip() and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware(SyncAndAsyncMiddleware):
+    """Class of the middleware that serves the collected static files from STATIC_ROOT.
+
+    ...
+
+    The files are listed once when the process starts, so a request for
+    STATIC_URL never touches the disk to find its file. The files named
+    in the manifest of the hashed names never change and are cached for a
+    year, the others for POLLS_STATIC_MAX_AGE seconds. The precompressed
+    variant the client accepts is sent with Vary: Accept-Encoding. The
+    middleware is not used when STATIC_ROOT has not been collected. Under
+    ASGI it is awaited directly, so the other requests reach the async
+    views without a thread hop.
+
+    """
+
+    def __init__(self, get_response):
+        """List the collected files."""
+        super().__init__(get_response)
+        root = getattr(settings, 'STATIC_ROOT', None)
+        if not root or not os.path.isdir(root) or not getattr(settings, 'POLLS_SERVE_STATIC', True):
+            raise MiddlewareNotUsed()
+        self.prefix = settings.STATIC_URL
+        self.files = self.scan(str(root))
+
+    def scan(self, root):
+        """
+        List the files of the root with their variants and headers.
+
+        Parameters
+        ----------
+        root : str
+            the STATIC_ROOT directory
+
+        Return:
+        dict of url path to the file entry.
+        """
+        immutable = set()
+        manifest = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+        if os.path.exists(manifest):
+            with open(manifest) as file:
+                immutable = set(json.load(file).get('paths', {}).values())
+        max_age = getattr(settings, 'POLLS_STATIC_MAX_AGE', 60)
+        files = {}
+        for directory, _, names in os.walk(root):
+            present = set(names)
+            for name in names:
+                if name.endswith(('.gz', '.br')) and name[:-3] in present:
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, root).replace(os.sep, '/')
+                content_type, _ = mimetypes.guess_type(name)
+                variants = [(None, path, os.stat(path))]
+                variants += [(encoding, path + suffix, os.stat(path + suffix))
+                             for encoding, suffix in ENCODINGS if name + suffix in present]
+                files[self.prefix + relative] = {
+                    'content_type': content_type or 'application/octet-stream',
+                    'cache_control': ('public, max-age=31536000, immutable' if relative in immutable
+                                      else 'public, max-age=%d' % max_age),
+                    'variants': variants,
+                }
+        return files
+
+    def __call__(self, request):
+        """Serve the static file of the path, or pass the request on."""
+        if self.is_async:
+            return self.__acall__(request)
+        entry = self.files.get(request.path_info) if request.method in ('GET', 'HEAD') else None
+        if entry is None:
+            return self.get_response(request)
+        return self.serve(request, entry)
+
+    async def __acall__(self, request):
+        """Serve the static file of the path in the async handler, or pass the request on."""
+        entry = self.files.get(request.path_info) if request.method in ('GET', 'HEAD') else None
+        if entry is None:
+            return await self.get_response(request)
+        return self.serve(request, entry)
+
+    def serve(self, request, entry):
+        """
+        Send the variant of the file the client accepts.
+
+        Parameters
+        ----------
+        request : HttpRequest
+            The request from user
+        entry : dict
+            the file entry made by scan()
+        """
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding, path, stat = entry['variants'][0]
+        for variant in entry['variants'][1:]:
+            if variant[0] in accepted:
+                encoding, path, stat = variant
+                break
+        etag = '"%x-%x%s"' % (int(stat.st_mtime), stat.st_size, '-' + encoding if encoding else '')
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        elif request.method == 'HEAD':
+            response = HttpResponse(content_type=entry['content_type'])
+            response['Content-Length'] = stat.st_size
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=entry['content_type'])
+        response['ETag'] = etag
+        response['Cache-Control'] = entry['cache_control']
+        if len(entry['variants']) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        if encoding and response.status_code == 200:
+            response['Content-Encoding'] = encoding
+        return response
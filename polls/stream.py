@@ -0,0 +1,117 @@
+"""Module for streaming the live results of a question as server-sent events."""
+import asyncio
+import json
+import re
+from django.conf import settings
+from .blocking import run_blocking
+from .models import Question
+from .pubsub import get_broker
+from .results import get_snapshot
+
+STREAM_PATH = re.compile(r'^/(?:polls/)?(?P<question_id>\d+)/results/stream/$')
+
+
+def snapshot_event(snapshot, retry=None):
+    """
+    Encode the results snapshot as a server-sent event.
+
+    Parameters
+    ----------
+    snapshot : dict
+        the results snapshot made by polls.results.make_snapshot()
+    retry : int, optional
+        milliseconds the client waits before it reconnects
+
+    Return:
+    the bytes of the event.
+    """
+    data = {'version': snapshot['version'], 'total': snapshot['total'],
+            'choices': {choice['id']: choice['votes'] for choice in snapshot['choices']}}
+    event = 'event: snapshot\ndata: %s\n\n' % json.dumps(data, separators=(',', ':'))
+    if retry is not None:
+        event = 'retry: %d\n' % retry + event
+    return event.encode()
+
+
+def delta_event(version, delta):
+    """Encode the vote delta and the version of the question it made as a server-sent event."""
+    data = {'version': version, 'choices': delta}
+    return ('event: delta\ndata: %s\n\n' % json.dumps(data, separators=(',', ':'))).encode()
+
+
+class ResultsStreamApp:
+    """Class of the ASGI app that streams /polls/<id>/results/stream/ and passes the rest to Django.
+
+    ...
+
+    Every watcher first gets the snapshot of the results, then the deltas
+    of the committed votes from the pubsub broker. The watcher subscribes
+    before the snapshot is read, so no vote is missed, and the deltas at
+    or below the version of the snapshot are dropped, so none is counted
+    twice. The deltas of a burst
+    are summed, so a watcher gets at most POLLS_STREAM_MAX_RATE events per
+    second, and no watcher ever queries the database after the snapshot.
+
+    """
+
+    def __init__(self, app):
+        """Wrap the Django ASGI app."""
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        """Stream the results if the path asks for it, otherwise call Django."""
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            match = STREAM_PATH.match(scope['path'])
+            if match:
+                return await self.stream(int(match['question_id']), receive, send)
+        return await self.app(scope, receive, send)
+
+    async def stream(self, question_id, receive, send):
+        """Send the snapshot and then the deltas of the question until the client goes away."""
+        if not await run_blocking(Question.objects.filter(pk=question_id).exists):
+            await send({'type': 'http.response.start', 'status': 404,
+                        'headers': [(b'content-type', b'text/plain')]})
+            await send({'type': 'http.response.body', 'body': b'Not Found'})
+            return
+        subscription = get_broker().subscribe(question_id)
+        try:
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', b'text/event-stream'),
+                                    (b'cache-control', b'no-cache'),
+                                    (b'x-accel-buffering', b'no')]})
+            snapshot = await run_blocking(get_snapshot, question_id)
+            subscription.skip_through(snapshot['version'])
+            await send({'type': 'http.response.body', 'body': snapshot_event(snapshot), 'more_body': True})
+            await self.forward(subscription, receive, send)
+        finally:
+            subscription.close()
+
+    async def forward(self, subscription, receive, send):
+        """Send the deltas of the subscription, at most POLLS_STREAM_MAX_RATE a second."""
+        interval = 1.0 / getattr(settings, 'POLLS_STREAM_MAX_RATE', 2)
+        keepalive = getattr(settings, 'POLLS_STREAM_KEEPALIVE', 15)
+        disconnect = asyncio.ensure_future(self.wait_disconnect(receive))
+        update = asyncio.ensure_future(subscription.get())
+        try:
+            while True:
+                done, pending = await asyncio.wait({disconnect, update}, timeout=keepalive,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if disconnect in done:
+                    return
+                if update in done:
+                    await send({'type': 'http.response.body', 'body': delta_event(*update.result()),
+                                'more_body': True})
+                    await asyncio.sleep(interval)
+                    update = asyncio.ensure_future(subscription.get())
+                else:
+                    await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+        finally:
+            disconnect.cancel()
+            update.cancel()
+
+    async def wait_disconnect(self, receive):
+        """Wait until the client closes the connection."""
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
@@ -0,0 +1,268 @@
+"""Module for tallying the votes."""
+import random
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from .admission import vote_admitted
+from .cache import bump_question_version, bump_votes_version
+from .models import Choice, ChoiceCounterShard, Vote
+from .pubsub import get_broker
+
+
+@transaction.atomic
+def record_vote(user, question, choice):
+    """
+    Record the user vote and apply the tally delta.
+
+    A first vote is one INSERT ... ON CONFLICT DO NOTHING that the unique
+    (user, question) constraint guards. Only when it conflicts is the vote
+    row of the user locked and changed. Then only the old and the new
+    choice counters are moved with F() expressions, so the cost of a vote
+    does not depend on how many choices the question has.
+
+    Parameters
+    ----------
+    user : User
+        The user who votes
+    question : Question
+        The question that is voted
+    choice : Choice
+        The selected choice of the question
+
+    Return:
+    dict of choice id to the change of its votes, empty if nothing changed.
+    """
+    transaction.on_commit(lambda: vote_admitted(user.pk, question.pk, choice.pk))
+    if insert_vote(user.pk, question.pk, choice.pk):
+        delta = {choice.pk: 1}
+    else:
+        vote = Vote.objects.select_for_update().get(user=user, question=question)
+        if vote.selected_choice_id == choice.pk:
+            return {}
+        delta = {vote.selected_choice_id: -1, choice.pk: 1}
+        vote.selected_choice = choice
+        vote.changed_at = timezone.now()
+        vote.switches += 1
+        vote.save(update_fields=['selected_choice', 'changed_at', 'switches'])
+    apply_delta(delta)
+    transaction.on_commit(lambda: vote_committed(question.pk, delta))
+    transaction.on_commit(lambda: bump_votes_version(user.pk))
+    return delta
+
+
+def vote_committed(question_id, delta):
+    """
+    Announce the committed votes of the question.
+
+    The version of the question is bumped and the delta is published to
+    the watchers of its results with the new version, so a watcher can
+    drop the deltas that its snapshot already counts.
+
+    Parameters
+    ----------
+    question_id : int
+        id of the voted question
+    delta : dict
+        choice id to the change of its votes
+    """
+    version = bump_question_version(question_id)
+    if delta:
+        get_broker().publish(question_id, delta, version)
+
+
+def insert_vote(user_id, question_id, choice_id):
+    """
+    Insert the vote unless the user has already voted the question.
+
+    Parameters
+    ----------
+    user_id : int
+        id of the user who votes
+    question_id : int
+        id of the voted question
+    choice_id : int
+        id of the selected choice
+
+    Return:
+    True if the vote is inserted, False if the user has a vote already.
+    """
+    connection = connections[router.db_for_write(Vote)]
+    ops = connection.ops
+    sql = '%s %s (%s, %s, %s, %s, %s) VALUES (%%s, %%s, %%s, %%s, %%s) %s' % (
+        ops.insert_statement(ignore_conflicts=True), ops.quote_name(Vote._meta.db_table),
+        ops.quote_name('user_id'), ops.quote_name('question_id'), ops.quote_name('selected_choice_id'),
+        ops.quote_name('cast_at'), ops.quote_name('switches'), ops.ignore_conflicts_suffix_sql(ignore_conflicts=True))
+    cast_at = Vote._meta.get_field('cast_at').get_db_prep_value(timezone.now(), connection)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, question_id, choice_id, cast_at, 0])
+        return cursor.rowcount == 1
+
+
+@transaction.atomic
+def record_votes(batch):
+    """
+    Record many votes at once and apply their tally delta.
+
+    New votes are inserted with one bulk_create and changed votes are
+    saved with one bulk_update, then every touched choice counter is
+    moved once, so the cost grows with the touched choices instead of
+    with the votes.
+
+    Parameters
+    ----------
+    batch : dict
+        (user id, question id) to the id of the selected choice
+
+    Return:
+    dict of choice id to the change of its votes.
+    """
+    if not batch:
+        return {}
+    existing = {}
+    votes = Vote.objects.select_for_update().filter(user_id__in={user_id for user_id, question_id in batch},
+                                                    question_id__in={question_id for user_id, question_id in batch})
+    for vote in votes:
+        existing[(vote.user_id, vote.question_id)] = vote
+    deltas = defaultdict(Counter)
+    created, changed = [], []
+    now = timezone.now()
+    for (user_id, question_id), choice_id in batch.items():
+        vote = existing.get((user_id, question_id))
+        if vote is None:
+            created.append(Vote(user_id=user_id, question_id=question_id, selected_choice_id=choice_id,
+                                cast_at=now))
+        elif vote.selected_choice_id != choice_id:
+            deltas[question_id][vote.selected_choice_id] -= 1
+            vote.selected_choice_id = choice_id
+            vote.changed_at = now
+            vote.switches += 1
+            changed.append(vote)
+        else:
+            continue
+        deltas[question_id][choice_id] += 1
+    Vote.objects.bulk_create(created)
+    Vote.objects.bulk_update(changed, ['selected_choice', 'changed_at', 'switches'])
+    delta = {}
+    for question_id, question_delta in deltas.items():
+        question_delta = {choice_id: change for choice_id, change in question_delta.items() if change}
+        apply_delta(question_delta)
+        delta.update(question_delta)
+        transaction.on_commit(lambda question_id=question_id, question_delta=question_delta:
+                              vote_committed(question_id, question_delta))
+    for user_id in {vote.user_id for vote in created + changed}:
+        transaction.on_commit(lambda user_id=user_id: bump_votes_version(user_id))
+    return delta
+
+
+def apply_delta(delta):
+    """
+    Move the choice counters by the given delta.
+
+    With POLLS_VOTE_COUNTER_SHARDS above 1 the change goes to a random
+    counter shard of the choice instead of Choice.votes.
+
+    Parameters
+    ----------
+    delta : dict
+        choice id to the change of its votes
+    """
+    shards = getattr(settings, 'POLLS_VOTE_COUNTER_SHARDS', 1)
+    for choice_id, change in delta.items():
+        if not change:
+            continue
+        if shards > 1:
+            add_to_shard(choice_id, random.randrange(shards), change)
+        else:
+            Choice.objects.filter(pk=choice_id).update(votes=F('votes') + change)
+
+
+def add_to_shard(choice_id, shard, change):
+    """
+    Add the change to the counter shard of the choice, creating the shard on its first vote.
+
+    Parameters
+    ----------
+    choice_id : int
+        id of the choice
+    shard : int
+        number of the shard
+    change : int
+        change of the votes of the choice
+    """
+    shards = ChoiceCounterShard.objects.filter(choice_id=choice_id, shard=shard)
+    if not shards.update(delta=F('delta') + change):
+        ChoiceCounterShard.objects.bulk_create([ChoiceCounterShard(choice_id=choice_id, shard=shard)],
+                                               ignore_conflicts=True)
+        shards.update(delta=F('delta') + change)
+
+
+@transaction.atomic
+def compact_counters(questions=None):
+    """
+    Fold the deltas of the counter shards into Choice.votes.
+
+    The shards are locked, so the votes counted meanwhile wait for the
+    fold. The tally of every choice stays the same, so no version is
+    bumped.
+
+    Parameters
+    ----------
+    questions : iterable, optional
+        ids of the questions to compact, all questions if None
+
+    Return:
+    number of the compacted choices.
+    """
+    shards = ChoiceCounterShard.objects.select_for_update().exclude(delta=0)
+    if questions is not None:
+        shards = shards.filter(choice__question_id__in=questions)
+    folded = Counter()
+    pks = []
+    for pk, choice_id, delta in shards.values_list('pk', 'choice_id', 'delta'):
+        folded[choice_id] += delta
+        pks.append(pk)
+    ChoiceCounterShard.objects.filter(pk__in=pks).update(delta=0)
+    for choice_id, delta in folded.items():
+        if delta:
+            Choice.objects.filter(pk=choice_id).update(votes=F('votes') + delta)
+    return len(folded)
+
+
+@transaction.atomic
+def reconcile_tallies(questions=None, dry_run=False):
+    """
+    Recount Choice.votes from the Vote rows and repair the drifted ones.
+
+    The counter shards are compacted first. The frozen questions are
+    skipped, their votes may be archived.
+
+    Parameters
+    ----------
+    questions : iterable, optional
+        ids of the questions to check, all questions if None
+    dry_run : bool
+        only report the drifted choices without saving
+
+    Return:
+    list of (choice, stored votes, counted votes) for every choice that drifted.
+    """
+    compact_counters(questions)
+    choices = Choice.objects.select_for_update().filter(question__archivedresult__isnull=True)
+    votes = Vote.objects.all()
+    if questions is not None:
+        choices = choices.filter(question_id__in=questions)
+        votes = votes.filter(question_id__in=questions)
+    counted = dict(votes.values_list('selected_choice').annotate(total=Count('id')).order_by())
+    drifted = []
+    for choice in choices:
+        total = counted.get(choice.pk, 0)
+        if choice.votes != total:
+            drifted.append((choice, choice.votes, total))
+            choice.votes = total
+    if drifted and not dry_run:
+        Choice.objects.bulk_update([choice for choice, stored, total in drifted], ['votes'])
+        for question_id in {choice.question_id for choice, stored, total in drifted}:
+            transaction.on_commit(lambda question_id=question_id: bump_question_version(question_id))
+    return drifted
@@ -0,0 +1,111 @@
+"""Module for testing the question admin."""
+import datetime
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from polls.admin import ChoicePageInline
+from polls.models import Question
+from polls.pagination import estimate_count
+from polls.tally import add_to_shard
+
+
+def create_question(question_text, days, end_days):
+    """Create the sample question.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    days : int
+        The published date from now
+    end_days : int
+        The end date from now
+    """
+    now = timezone.now()
+    return Question.objects.create(question_text=question_text, pub_date=now + datetime.timedelta(days=days),
+                                   end_date=now + datetime.timedelta(days=end_days))
+
+
+class QuestionAdminTest(TestCase):
+    """Class for testing the question changelist."""
+
+    def setUp(self):
+        """Log in the superuser."""
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "782543")
+        self.client.force_login(user)
+        self.url = reverse('admin:polls_question_changelist')
+
+    def test_state_filter(self):
+        """Check that the state filter selects the questions in SQL."""
+        create_question("Open question.", -1, 1)
+        create_question("Closed question.", -5, -1)
+        response = self.client.get(self.url, {'state': 'closed'})
+        self.assertEqual([question.question_text for question in response.context['cl'].result_list],
+                         ["Closed question."])
+        self.assertFalse(response.context['cl'].result_list[0].is_open)
+
+    def test_queries_do_not_depend_on_rows(self):
+        """Check that the changelist takes the same queries however many questions there are."""
+        counts = []
+        # Cache the session and the user first.
+        self.client.get(self.url)
+        for total in (2, 20):
+            for number in range(total - Question.objects.count()):
+                create_question("Question %d." % number, -1, 1 if number % 2 else -1)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_columns(self):
+        """Check that the votes and the state of every question are annotated in SQL."""
+        question = create_question("Open question.", -2, 1)
+        choice = question.choice_set.create(choice_text="Choice", votes=3)
+        add_to_shard(choice.id, 1, 2)
+        question = self.client.get(self.url).context['cl'].result_list[0]
+        self.assertEqual(question.total_votes, 5)
+        self.assertTrue(question.is_open)
+        self.assertFalse(question.published_recently)
+        self.assertIsNone(self.client.get(self.url).context['cl'].full_result_count)
+
+    def test_prefix_search(self):
+        """Check that the search matches the start of the question text only."""
+        create_question("What is new?", -1, 1)
+        create_question("So what?", -1, 1)
+        response = self.client.get(self.url, {'q': 'what'})
+        self.assertEqual([question.question_text for question in response.context['cl'].result_list],
+                         ["What is new?"])
+
+    def test_estimated_count(self):
+        """Check that the unfiltered changelist reads the count from the statistics of the database."""
+        for number in range(3):
+            create_question("Question %d." % number, -1, 1)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        create_question("Question after ANALYZE.", -1, 1)
+        self.assertEqual(estimate_count(Question.objects.all()), 3)
+        self.assertIsNone(estimate_count(Question.objects.filter(pk__gt=0)))
+        with override_settings(POLLS_ADMIN_EXACT_COUNT=2):
+            self.assertEqual(self.client.get(self.url).context['cl'].result_count, 3)
+            self.assertEqual(self.client.get(self.url, {'state': 'open'}).context['cl'].result_count, 4)
+        self.assertEqual(self.client.get(self.url).context['cl'].result_count, 4)
+
+    @override_settings(POLLS_ADMIN_INLINE_CHOICES=2)
+    def test_choice_pages(self):
+        """Check that a question with many choices shows them read-only a page at a time."""
+        question = create_question("Large question.", -1, 1)
+        for number in range(5):
+            question.choice_set.create(choice_text="Choice %d" % number)
+        url = reverse('admin:polls_question_change', args=(question.id,))
+        response = self.client.get(url, {'choices_page': 3})
+        formset = response.context['inline_admin_formsets'][0]
+        self.assertIsInstance(formset.opts, ChoicePageInline)
+        self.assertEqual([form.instance.choice_text for form in formset.formset], ["Choice 4"])
+        self.assertContains(response, '?choices_page=2')
+        small = create_question("Small question.", -1, 1)
+        response = self.client.get(reverse('admin:polls_question_change', args=(small.id,)))
+        self.assertNotIsInstance(response.context['inline_admin_formsets'][0].opts, ChoicePageInline)
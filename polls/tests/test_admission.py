@@ -0,0 +1,118 @@
+"""Module for testing the admission of the vote requests."""
+import datetime
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from polls.admission import dedupe_enabled, take_token
+from polls.models import Question, Vote
+from polls.tally import record_vote
+from polls.views import get_client_ip
+
+
+def create_question(question_text):
+    """Create the sample question that can vote with two choices.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() - datetime.timedelta(days=1),
+                                       end_date=timezone.now() + datetime.timedelta(days=1))
+    question.choice_set.create(choice_text='Yes')
+    question.choice_set.create(choice_text='No')
+    return question
+
+
+class TokenBucketTest(TestCase):
+    """Class for testing the token bucket."""
+
+    def setUp(self):
+        """Forget the buckets."""
+        cache.clear()
+
+    def test_burst_and_refill(self):
+        """Check that the bucket allows the burst, then one token every 1/refill seconds."""
+        rate = (2, 0.5)
+        self.assertEqual([take_token('bucket', rate, now=100.0) for _ in range(2)], [0, 0])
+        self.assertEqual(take_token('bucket', rate, now=100.0), 2.0)
+        self.assertEqual(take_token('bucket', rate, now=101.0), 1.0)
+        self.assertEqual(take_token('bucket', rate, now=102.0), 0)
+
+    def test_client_ip(self):
+        """Check that X-Forwarded-For is only read behind the trusted proxies, from their end."""
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='6.6.6.6, 10.0.0.1, 10.0.0.2',
+                                       REMOTE_ADDR='10.0.0.3')
+        self.assertEqual(get_client_ip(request), '10.0.0.3')
+        with override_settings(POLLS_TRUSTED_PROXIES=1):
+            self.assertEqual(get_client_ip(request), '10.0.0.2')
+        with override_settings(POLLS_TRUSTED_PROXIES=2):
+            self.assertEqual(get_client_ip(request), '10.0.0.1')
+        with override_settings(POLLS_TRUSTED_PROXIES=5):
+            self.assertEqual(get_client_ip(request), '6.6.6.6')
+
+    def test_dedupe_needs_shared_cache(self):
+        """Check that the re-vote shortcut is off with the per-process cache unless it is forced."""
+        self.assertFalse(dedupe_enabled())
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache'}}):
+            self.assertTrue(dedupe_enabled())
+        with override_settings(POLLS_VOTE_DEDUPE=True):
+            self.assertTrue(dedupe_enabled())
+
+
+@override_settings(POLLS_VOTE_USER_RATE=(2, 0.01), POLLS_VOTE_IP_RATE=None, POLLS_VOTE_DEDUPE=True,
+                   POLLS_DEFER_LAST_LOGIN=False)
+class AdmissionTest(TransactionTestCase):
+    """Class for testing the admission of the vote endpoint."""
+
+    def setUp(self):
+        """Set up the logged in user and the question."""
+        cache.clear()
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+        self.client.force_login(self.user)
+        self.question = create_question('This is a question')
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+        self.url = reverse('polls:vote', args=(self.question.id,))
+
+    @override_settings(POLLS_USER_CACHE_TIMEOUT=300, SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_same_vote_is_short_circuited(self):
+        """Check that the same re-vote is answered without any query or token."""
+        self.client.post(self.url, {'choice': self.yes.pk})
+        with self.assertNumQueries(0):
+            # Even the session and the user of the login come from the cache.
+            response = self.client.post(self.url, {'choice': self.yes.pk})
+        self.assertRedirects(response, reverse('polls:results', args=(self.question.id,)))
+        response = self.client.post(self.url, {'choice': self.no.pk})
+        self.assertEqual(Vote.objects.get().selected_choice, self.no)
+
+    def test_vote_of_other_worker(self):
+        """Check that a vote written elsewhere updates the shared last vote, so changing back is not swallowed."""
+        self.client.post(self.url, {'choice': self.yes.pk})
+        # Another worker records the switch to no in the shared cache.
+        record_vote(self.user, self.question, self.no)
+        self.client.post(self.url, {'choice': self.yes.pk})
+        self.assertEqual(Vote.objects.get().selected_choice, self.yes)
+
+    def test_user_rate_limit(self):
+        """Check that the votes over the burst of the user get 429 with Retry-After."""
+        self.client.post(self.url, {'choice': self.yes.pk})
+        self.client.post(self.url, {'choice': self.no.pk})
+        response = self.client.post(self.url, {'choice': self.yes.pk})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '100')
+        self.assertEqual(Vote.objects.get().selected_choice, self.no)
+
+    @override_settings(POLLS_VOTE_USER_RATE=None, POLLS_VOTE_IP_RATE=(1, 0.01), POLLS_TRUSTED_PROXIES=1)
+    def test_ip_rate_limit(self):
+        """Check that the IP bucket limits the votes of every user from the client ip, however it forwards."""
+        self.client.post(self.url, {'choice': self.yes.pk}, HTTP_X_FORWARDED_FOR='10.0.0.1')
+        other = get_user_model().objects.create_user("Other", password="782543")
+        self.client.force_login(other)
+        response = self.client.post(self.url, {'choice': self.yes.pk}, HTTP_X_FORWARDED_FOR='1.2.3.4, 10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(self.url, {'choice': self.yes.pk}, HTTP_X_FORWARDED_FOR='10.0.0.2')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Vote.objects.count(), 2)
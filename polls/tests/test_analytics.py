@@ -0,0 +1,135 @@
+"""Module for testing the vote time series of the questions."""
+import datetime
+import importlib
+import unittest
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from polls.analytics import get_series, np, vote_columns
+from polls.archive import freeze_question
+from polls.cache import bump_question_version
+from polls.models import Question, Vote
+from polls.tally import record_vote
+
+
+@unittest.skipUnless(np, 'NumPy is not installed')
+class AnalyticsTest(TestCase):
+    """Class for testing the vote time series and the analytics page."""
+
+    def setUp(self):
+        """Set up the question and the votes cast a minute apart."""
+        cache.clear()
+        self.start = timezone.now().replace(second=0, microsecond=0) - datetime.timedelta(hours=1)
+        self.question = Question.objects.create(question_text='This is a question',
+                                                pub_date=self.start - datetime.timedelta(days=1),
+                                                end_date=timezone.now() + datetime.timedelta(days=1))
+        self.first = self.question.choice_set.create(choice_text='First')
+        self.second = self.question.choice_set.create(choice_text='Second')
+        User = get_user_model()
+        self.users = [User.objects.create_user('User %d' % number, password='782543') for number in range(3)]
+        for minute, (user, choice) in enumerate(zip(self.users, (self.first, self.first, self.second))):
+            record_vote(user, self.question, choice)
+            Vote.objects.filter(user=user).update(cast_at=self.start + datetime.timedelta(minutes=minute))
+
+    def test_cast_times(self):
+        """Check that a new vote records its cast time and a switch its change time."""
+        vote = Vote.objects.get(user=self.users[0])
+        self.assertIsNone(vote.changed_at)
+        self.assertEqual(vote.switches, 0)
+        record_vote(self.users[0], self.question, self.second)
+        vote.refresh_from_db()
+        self.assertIsNotNone(vote.changed_at)
+        self.assertEqual(vote.switches, 1)
+
+    def test_columns(self):
+        """Check that the votes read in chunks keep their choices and their times as epoch seconds."""
+        Vote.objects.filter(user=self.users[2]).update(changed_at=self.start + datetime.timedelta(seconds=90.25))
+        choices, cast_at, changed_at, switches = vote_columns(self.question.id, chunk_size=2)
+        order = np.argsort(cast_at)
+        self.assertEqual(choices[order].tolist(), [self.first.id, self.first.id, self.second.id])
+        self.assertEqual(cast_at[order].tolist(), [self.start.timestamp() + 60 * minute for minute in range(3)])
+        self.assertTrue(np.isnan(changed_at[order][:2]).all())
+        self.assertAlmostEqual(changed_at[order][2], self.start.timestamp() + 90.25, places=3)
+        self.assertEqual(switches.tolist(), [0, 0, 0])
+        self.assertEqual(len(vote_columns(0)[0]), 0)
+
+    def test_series(self):
+        """Check the votes, the cumulative votes and the share of every minute."""
+        series = get_series(self.question)
+        self.assertEqual(series['bucket_seconds'], 60)
+        self.assertEqual([choice['text'] for choice in series['choices']], ['First', 'Second'])
+        self.assertEqual(series['buckets'][0], self.start.isoformat())
+        self.assertEqual(series['votes'], [[1, 0], [1, 0], [0, 1]])
+        self.assertEqual(series['cumulative'], [[1, 0], [2, 0], [2, 1]])
+        self.assertEqual(series['share'][-1], [0.6667, 0.3333])
+        self.assertEqual(series['switches'], [0, 0, 0])
+        self.assertEqual(series['total'], 3)
+        wide = get_series(self.question, bucket=3600)
+        self.assertEqual(sum(map(sum, wide['votes'])), 3)
+
+    def test_switch(self):
+        """Check that a switched vote counts for its new choice from the time of the switch."""
+        record_vote(self.users[0], self.question, self.second)
+        Vote.objects.filter(user=self.users[0]).update(changed_at=self.start + datetime.timedelta(minutes=3))
+        bump_question_version(self.question.id)
+        series = get_series(self.question)
+        self.assertEqual(series['votes'], [[0, 0], [1, 0], [0, 1], [0, 1]])
+        self.assertEqual(series['switches'], [0, 0, 0, 1])
+        self.assertEqual(series['total'], 3)
+
+    def test_every_switch(self):
+        """Check that a vote switched twice counts two switches in the bucket of its last one."""
+        record_vote(self.users[0], self.question, self.second)
+        record_vote(self.users[0], self.question, self.first)
+        Vote.objects.filter(user=self.users[0]).update(changed_at=self.start + datetime.timedelta(minutes=3))
+        bump_question_version(self.question.id)
+        self.assertEqual(get_series(self.question)['switches'], [0, 0, 0, 2])
+
+    def test_untimed(self):
+        """Check that the votes stamped by migration 0018 get no time and stay out of the buckets."""
+        migration = importlib.import_module('polls.migrations.0021_untimed_votes')
+        # The migration ran the day before the votes, and stamped the vote cast before it.
+        applied = self.start - datetime.timedelta(days=1)
+        MigrationRecorder(connection).migration_qs.filter(app='polls', name='0018_vote_times').update(applied=applied)
+        Vote.objects.filter(user=self.users[2]).update(cast_at=applied - datetime.timedelta(seconds=1))
+        migration.clear_stamped_times(apps, type('SchemaEditor', (), {'connection': connection})())
+        self.assertEqual(Vote.objects.filter(cast_at=None).count(), 1)
+        bump_question_version(self.question.id)
+        series = get_series(self.question)
+        self.assertEqual(series['votes'], [[1, 0], [1, 0]])
+        self.assertEqual(series['untimed'], 1)
+        self.assertEqual(series['total'], 3)
+
+    def test_max_buckets(self):
+        """Check that the bucket is widened to keep the series under the most buckets."""
+        with self.settings(POLLS_ANALYTICS_MAX_BUCKETS=2):
+            series = get_series(self.question, bucket=1)
+        self.assertLessEqual(len(series['buckets']), 2)
+        self.assertEqual(sum(map(sum, series['votes'])), 3)
+
+    def test_closed_archived(self):
+        """Check that the archived votes of a frozen question are in the series."""
+        Question.objects.filter(pk=self.question.pk).update(end_date=timezone.now() - datetime.timedelta(minutes=1))
+        self.question.refresh_from_db()
+        freeze_question(self.question.id, archive_votes=True)
+        self.assertFalse(Vote.objects.exists())
+        series = get_series(self.question)
+        self.assertEqual(series['cumulative'][-1], [2, 1])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_series(self.question), series)
+
+    def test_page(self):
+        """Check that only the admins can see the series."""
+        url = reverse('polls:analytics', args=(self.question.id,))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        get_user_model().objects.create_user('Admin', password='782543', is_staff=True)
+        self.client.login(username='Admin', password='782543')
+        response = self.client.get(url, {'bucket': 'x'})
+        self.assertEqual(response.json()['bucket_seconds'], 60)
+        self.assertEqual(response.json()['total'], 3)
+        self.assertEqual(self.client.get(url, {'bucket': 0}).json()['bucket_seconds'], 1)
@@ -0,0 +1,100 @@
+"""Module for testing the frozen results of the closed questions."""
+import datetime
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from polls.archive import freeze_question
+from polls.models import Question, Choice, Vote, ArchivedResult, ArchivedVote
+from polls.previous import previous_votes
+from polls.results import get_snapshot
+from polls.tally import record_vote, reconcile_tallies
+
+
+def create_question(question_text, end_days):
+    """Create the sample question with two choices.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    end_days : int
+        The end date from now
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() - datetime.timedelta(days=5),
+                                       end_date=timezone.now() + datetime.timedelta(days=end_days))
+    question.choice_set.create(choice_text='Yes')
+    question.choice_set.create(choice_text='No')
+    return question
+
+
+def close(question):
+    """Move the end date of the question to the past without the save signals."""
+    Question.objects.filter(pk=question.pk).update(end_date=timezone.now() - datetime.timedelta(days=1))
+
+
+class FreezeTest(TestCase):
+    """Class for testing the freeze of the closed questions."""
+
+    def setUp(self):
+        """Set up the voted question and close it."""
+        cache.clear()
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+        self.question = create_question('This is a question', 1)
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+        record_vote(self.user, self.question, self.yes)
+        close(self.question)
+
+    def test_open_question(self):
+        """Check that an open question can not be frozen."""
+        with self.assertRaises(ValueError):
+            freeze_question(create_question('Open question', 1).pk)
+
+    def test_lazy_freeze(self):
+        """Check that reading the results of a closed question freezes them and serves them from the archive."""
+        snapshot = get_snapshot(self.question.pk)
+        self.assertEqual(snapshot['total'], 1)
+        archived = ArchivedResult.objects.get(question=self.question)
+        self.assertEqual(archived.choices, [[self.yes.pk, 'Yes', 1], [self.no.pk, 'No', 0]])
+        Choice.objects.filter(pk=self.no.pk).update(votes=50)
+        cache.clear()
+        with self.assertNumQueries(1):
+            snapshot = get_snapshot(self.question.pk)
+        self.assertEqual([choice['votes'] for choice in snapshot['choices']], [1, 0])
+
+    @override_settings(POLLS_FREEZE_ON_READ=False)
+    def test_no_lazy_freeze(self):
+        """Check that the results are not frozen on read when it is turned off."""
+        get_snapshot(self.question.pk)
+        self.assertFalse(ArchivedResult.objects.exists())
+
+    def test_command_archives_votes(self):
+        """Check that the command freezes the closed questions and moves their votes out of the Vote table."""
+        out = StringIO()
+        call_command('freeze_polls', '--archive-votes', stdout=out)
+        self.assertIn('Froze 1 question(s).', out.getvalue())
+        self.assertFalse(Vote.objects.exists())
+        self.assertEqual(ArchivedVote.objects.get().selected_choice, self.yes)
+        self.assertEqual(reconcile_tallies(), [])
+        response = self.client.get(reverse('polls:results', args=(self.question.pk,)))
+        self.assertContains(response, 'Yes -- 1 vote')
+
+    def test_previous_vote_of_archived_votes(self):
+        """Check that the previous vote of the user is still found after the votes are archived."""
+        freeze_question(self.question.pk, archive_votes=True)
+        request = type('Request', (), {'user': self.user, 'session': {}})()
+        self.assertEqual(previous_votes(request), {self.question.pk: 'Yes'})
+
+    def test_reopen_thaws(self):
+        """Check that moving the end date forward drops the frozen results and restores the votes."""
+        freeze_question(self.question.pk, archive_votes=True)
+        self.question.refresh_from_db()
+        self.question.end_date = timezone.now() + datetime.timedelta(days=1)
+        self.question.save()
+        self.assertFalse(ArchivedResult.objects.exists())
+        self.assertFalse(ArchivedVote.objects.exists())
+        self.assertEqual(Vote.objects.get().selected_choice, self.yes)
@@ -0,0 +1,91 @@
+"""Module for testing the async views."""
+import datetime
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+from polls.models import Question
+
+urlpatterns = [
+    path('polls/', include('polls.async_urls')),
+    path('account/', include('django.contrib.auth.urls')),
+]
+
+FORM = 'application/x-www-form-urlencoded'
+
+
+def create_question(question_text, days):
+    """Create the sample question with two choices.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    days : int
+        Days from now to the published date
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() + datetime.timedelta(days=days),
+                                       end_date=timezone.now() + datetime.timedelta(days=days + 2))
+    question.choice_set.create(choice_text='Yes')
+    question.choice_set.create(choice_text='No')
+    return question
+
+
+@override_settings(ROOT_URLCONF='polls.tests.test_async_views', POLLS_DEFER_LAST_LOGIN=False)
+class AsyncViewsTest(TransactionTestCase):
+    """Class for testing the async views."""
+
+    def setUp(self):
+        """Set up the user, the questions and the async client."""
+        cache.clear()
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+        self.question = create_question('Past question.', -1)
+        self.future = create_question('Future question.', 5)
+        self.no = self.question.choice_set.get(choice_text='No')
+        self.client = AsyncClient()
+
+    async def test_index(self):
+        """Check that the index only lists the published questions."""
+        response = await self.client.get(reverse('polls:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Past question.')
+        self.assertNotContains(response, 'Future question.')
+
+    async def test_detail(self):
+        """Check the detail page and the redirect of a question that can not vote."""
+        response = await self.client.get(reverse('polls:detail', args=(self.question.id,)))
+        self.assertContains(response, 'Yes')
+        response = await self.client.get(reverse('polls:detail', args=(self.future.id,)))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_results(self):
+        """Check the results page and the missing question."""
+        response = await self.client.get(reverse('polls:results', args=(self.question.id,)))
+        self.assertContains(response, 'Yes -- 0 votes')
+        response = await self.client.get(reverse('polls:results', args=(0,)))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_results_not_modified(self):
+        """Check that the unchanged results page is answered with 304."""
+        url = reverse('polls:results', args=(self.question.id,))
+        response = await self.client.get(url)
+        # The AsyncClient of Django 3.1 sends the extra keys as the header names.
+        response = await self.client.get(url, **{'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    async def test_vote(self):
+        """Check that the async vote records the vote of the logged in user."""
+        url = reverse('polls:vote', args=(self.question.id,))
+        response = await self.client.post(url, urlencode({'choice': self.no.id}), content_type=FORM)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('login', response.url)
+        await sync_to_async(self.client.force_login)(self.user)
+        response = await self.client.post(url, urlencode({'choice': self.no.id}), content_type=FORM)
+        self.assertEqual(response.url, reverse('polls:results', args=(self.question.id,)))
+        response = await self.client.get(response.url)
+        self.assertContains(response, 'No -- 1 vote ')
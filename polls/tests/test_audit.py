@@ -0,0 +1,92 @@
+"""Module for testing the audit trail."""
+import json
+import logging
+import os
+import queue
+import tempfile
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from polls import audit
+from polls.models import AuditEvent
+
+
+def make_record(event, user, ip, question=None):
+    """Make the audit record like audit.audit() does."""
+    return audit.audit_log.makeRecord('polls.audit', audit.EVENT_LEVELS.get(event, logging.INFO), __file__, 0,
+                                      'audit', (event, user, ip, question), None)
+
+
+class AuditPipelineTest(SimpleTestCase):
+    """Class for testing the queue of the audit trail."""
+
+    def tearDown(self):
+        """Stop the pipeline of the test."""
+        audit.stop()
+
+    def test_full_queue_drops(self):
+        """Check that the records that do not fit the queue are dropped and counted, never waited for."""
+        handler = audit.BoundedQueueHandler(queue.Queue(2))
+        for number in range(5):
+            handler.handle(make_record('vote', 'Pazcal', '127.0.0.1', number))
+        self.assertEqual(handler.dropped, 3)
+
+    def test_jsonl_batches(self):
+        """Check that the records are written to the JSONL file by the background writer."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'audit.jsonl')
+            with override_settings(POLLS_AUDIT_WRITER='jsonl', POLLS_AUDIT_FILE=path):
+                audit.audit('login', 'Pazcal', '127.0.0.1')
+                audit.audit('vote', 'Pazcal', '127.0.0.1', 7)
+                audit.stop()
+            with open(path) as file:
+                records = [json.loads(line) for line in file]
+        self.assertEqual([(record['event'], record['question']) for record in records], [('login', None), ('vote', 7)])
+        self.assertEqual(records[0]['user'], 'Pazcal')
+
+    def test_jsonl_rotation(self):
+        """Check that a full JSONL file is rotated before the next batch."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'audit.jsonl')
+            writer = audit.JsonlAuditWriter(path, maxBytes=150, backupCount=2, delay=True)
+            writer.write_batch([make_record('login', 'Pazcal', '127.0.0.1')])
+            writer.write_batch([make_record('logout', 'Pazcal', '127.0.0.1')])
+            writer.close()
+            self.assertEqual(sorted(os.listdir(directory)), ['audit.jsonl', 'audit.jsonl.1'])
+
+
+class ModelAuditWriterTest(TestCase):
+    """Class for testing the AuditEvent writer."""
+
+    def test_bulk_create(self):
+        """Check that a batch is saved with one query."""
+        records = [make_record('login', 'Pazcal', '127.0.0.1'), make_record('vote', 'Pazcal', None, 3)]
+        with self.assertNumQueries(1):
+            audit.ModelAuditWriter().write_batch(records)
+        self.assertEqual(list(AuditEvent.objects.order_by('pk').values_list('event', 'question_id')),
+                         [('login', None), ('vote', 3)])
+
+    def test_invalid_ip(self):
+        """Check that an invalid ip is saved as NULL with the rest of the batch."""
+        records = [make_record('login', 'Pazcal', 'unknown'), make_record('vote', 'Pazcal', '::1', 3)]
+        audit.ModelAuditWriter().write_batch(records)
+        self.assertEqual(list(AuditEvent.objects.order_by('pk').values_list('ip', flat=True)), [None, '::1'])
+
+    def test_log_levels(self):
+        """Check that the failed logins are logged as warnings and the rest as info."""
+        with self.assertLogs('polls', logging.INFO) as logs:
+            audit.LogAuditWriter().write_batch([make_record('login failed', 'Pazcal', '127.0.0.1'),
+                                                make_record('vote', 'Pazcal', '127.0.0.1', 3)])
+        self.assertEqual([record.levelname for record in logs.records], ['WARNING', 'INFO'])
+
+    def test_login_is_audited(self):
+        """Check that the login receiver puts the record on the audit queue."""
+        get_user_model().objects.create_user("Pazcal", password="782543")
+        handler = audit.start()
+        records = []
+        handler.enqueue = records.append
+        try:
+            self.client.post('/account/login/', {'username': 'Pazcal', 'password': '782543'})
+        finally:
+            del handler.enqueue
+            audit.stop()
+        self.assertEqual(records[0].args, ('login', 'Pazcal', '127.0.0.1', None))
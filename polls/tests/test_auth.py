@@ -1,8 +1,13 @@
 import datetime
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.models import Group, Permission
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from django.urls import reverse
+from polls.checks import check_auth_order, check_user_cache
 from polls.models import Question
 
 
@@ -53,3 +58,78 @@ class AuthenticationTest(TestCase):
         question = create_question(question_text='This is a question', days=-5)
         response = self.client.get(reverse('polls:vote', args=(question.id,)))
         self.assertEqual(response.status_code, 200)
+
+
+# The cached sessions leave only the reads of the user to count.
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class AuthFastPathTest(TestCase):
+    """Class for testing the cached user, the login time and the tunable hasher."""
+
+    def setUp(self):
+        """Set up the user."""
+        cache.clear()
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+
+    @override_settings(POLLS_USER_CACHE_TIMEOUT=300)
+    def test_cached_user(self):
+        """Check that the user of the session is read once and dropped when it is saved."""
+        self.client.force_login(self.user)
+        self.client.get(reverse("polls:index"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("polls:metrics"))
+        self.assertEqual(response.status_code, 302)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse("polls:index"))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    @override_settings(POLLS_USER_CACHE_TIMEOUT=0)
+    def test_uncached_user(self):
+        """Check that the user is read on every request without the cache."""
+        self.client.force_login(self.user)
+        self.client.get(reverse("polls:index"))
+        with self.assertNumQueries(1):
+            self.client.get(reverse("polls:metrics"))
+
+    @override_settings(POLLS_USER_CACHE_TIMEOUT=300)
+    def test_cached_permissions(self):
+        """Check that the cached user is dropped when its groups or permissions change from either side."""
+        permission = Permission.objects.get(codename='view_question')
+        group = Group.objects.create(name='Viewers')
+        self.client.force_login(self.user)
+        for change in (lambda: self.user.user_permissions.add(permission),
+                       lambda: self.user.groups.add(group),
+                       lambda: group.user_set.remove(self.user),
+                       lambda: group.user_set.add(self.user),
+                       lambda: group.user_set.clear()):
+            self.client.get(reverse("polls:index"))
+            change()
+            with self.assertNumQueries(1, using='default'):
+                self.client.get(reverse("polls:metrics"))
+
+    def test_checks(self):
+        """Check the checks of the order of the apps and of the cache of the users and the sessions."""
+        self.assertEqual(check_auth_order(None), [])
+        self.assertEqual(len(check_user_cache(None)), 1)
+        with override_settings(POLLS_USER_CACHE_TIMEOUT=300):
+            self.assertEqual([warning.id for warning in check_user_cache(None)], ['polls.W001'] * 2)
+        with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            self.assertEqual(check_user_cache(None), [])
+
+    def test_last_login(self):
+        """Check that the login time is saved by the polls receiver instead of the one of auth."""
+        receivers = [receiver() for key, receiver in user_logged_in.receivers]
+        self.assertNotIn('django.contrib.auth.models', [receiver.__module__ for receiver in receivers])
+        self.assertEqual([receiver.__name__ for receiver in receivers].count('update_last_login'), 1)
+        self.assertTrue(self.client.login(username="Pazcal", password="782543"))
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_hasher_iterations(self):
+        """Check that a login rehashes the password with the iterations of POLLS_PBKDF2_ITERATIONS."""
+        with override_settings(POLLS_PBKDF2_ITERATIONS=1000):
+            self.assertTrue(make_password("782543").startswith("pbkdf2_sha256$1000$"))
+            self.assertTrue(self.client.login(username="Pazcal", password="782543"))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+        self.assertTrue(self.user.check_password("782543"))
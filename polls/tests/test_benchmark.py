@@ -0,0 +1,35 @@
+"""Module for testing the benchmark of the voting workflow."""
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from polls.benchmark import compare, run_client, seed, workflow
+from polls.models import Vote
+
+
+class RunClientTest(TestCase):
+    """Class for testing the benchmark through the test client."""
+
+    def test_report(self):
+        """Check that every user votes and every step is reported with its queries."""
+        cache.clear()
+        question_ids = seed(2, 3, 4)
+        report = run_client(workflow(4, question_ids))
+        self.assertEqual(Vote.objects.count(), 4)
+        self.assertEqual(set(report), {'login', 'polls:detail', 'polls:vote', 'polls:results'})
+        for step in report.values():
+            self.assertEqual(step['requests'], 4)
+            self.assertGreater(step['queries_per_request'], 0)
+            self.assertLessEqual(step['p50_ms'], step['p99_ms'])
+
+
+class CompareTest(SimpleTestCase):
+    """Class for testing the comparison with the baseline."""
+
+    def test_regressions(self):
+        """Check that a slower p95 and more queries are regressions, within the tolerance is not."""
+        baseline = {'polls:vote': {'p95_ms': 10.0, 'queries_per_request': 5},
+                    'polls:detail': {'p95_ms': 10.0, 'queries_per_request': 3}}
+        report = {'polls:vote': {'p95_ms': 11.0, 'queries_per_request': 6},
+                  'polls:detail': {'p95_ms': 13.0, 'queries_per_request': 3}}
+        self.assertEqual(compare(report, baseline, 0.2),
+                         ['polls:vote: queries/request 5 -> 6', 'polls:detail: p95 10.000ms -> 13.000ms'])
+        self.assertEqual(compare(baseline, baseline, 0.2), [])
@@ -0,0 +1,30 @@
+"""Module for testing the deferred work."""
+import threading
+from unittest import mock
+from django.test import SimpleTestCase
+from polls import blocking
+
+
+class DeferTest(SimpleTestCase):
+    """Class for testing the thread pool of the deferred work."""
+
+    def test_own_threads(self):
+        """Check that the deferred work runs in its own pool, apart from the one of the async views."""
+        future = blocking.defer(lambda: threading.current_thread().name)
+        self.assertTrue(future.result(timeout=5).startswith('polls-defer'))
+
+    def test_full_queue(self):
+        """Check that the work runs in the caller once the queue is full."""
+        with mock.patch.object(blocking, '_deferred_slots', threading.BoundedSemaphore(1)) as slots:
+            slots.acquire()
+            future = blocking.defer(lambda: threading.current_thread().name)
+        self.assertEqual(future.result(), threading.current_thread().name)
+
+    def test_failure_logged(self):
+        """Check that a failed deferred call is logged and frees its slot."""
+        with self.assertLogs('polls', level='ERROR') as logs:
+            with mock.patch.object(blocking, '_deferred_slots', threading.BoundedSemaphore(1)) as slots:
+                future = blocking.defer(lambda: 1 / 0)
+                self.assertIsInstance(future.exception(timeout=5), ZeroDivisionError)
+                self.assertTrue(slots.acquire(timeout=5))
+        self.assertIn('Deferred work failed', logs.output[0])
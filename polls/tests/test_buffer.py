@@ -0,0 +1,149 @@
+"""Module for testing the write-behind vote buffer."""
+import datetime
+import os
+import tempfile
+import unittest
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from polls.buffer import VoteBuffer, fcntl
+from polls.models import Question, Vote
+
+
+def create_question(question_text):
+    """Create the sample question that can vote with two choices.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() - datetime.timedelta(days=1),
+                                       end_date=timezone.now() + datetime.timedelta(days=1))
+    question.choice_set.create(choice_text='Yes')
+    question.choice_set.create(choice_text='No')
+    return question
+
+
+class VoteBufferTest(TestCase):
+    """Class for testing the write-behind vote buffer."""
+
+    def setUp(self):
+        """Set up the users, the question and the buffer without the flusher."""
+        User = get_user_model()
+        self.first = User.objects.create_user("Pazcal", password="782543")
+        self.second = User.objects.create_user("Other", password="782543")
+        self.question = create_question('This is a question')
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+        self.buffer = VoteBuffer(max_size=10, interval=60, autostart=False)
+
+    def votes(self):
+        """Return the votes of every choice of the question."""
+        return list(self.question.choice_set.order_by('pk').values_list('votes', flat=True))
+
+    def test_votes_wait_for_flush(self):
+        """Check that the buffered votes are not written before the flush."""
+        self.buffer.add(self.first.id, self.question.id, self.yes.id)
+        self.assertEqual(len(self.buffer), 1)
+        self.assertFalse(Vote.objects.exists())
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(self.votes(), [1, 0])
+
+    def test_coalesce(self):
+        """Check that only the last vote of the user is flushed."""
+        self.buffer.add(self.first.id, self.question.id, self.yes.id)
+        self.buffer.add(self.first.id, self.question.id, self.no.id)
+        self.buffer.add(self.second.id, self.question.id, self.no.id)
+        self.buffer.flush()
+        self.assertEqual(Vote.objects.count(), 2)
+        self.assertEqual(self.votes(), [0, 2])
+
+    def test_changed_vote(self):
+        """Check that a flushed vote replaces the stored vote of the user."""
+        self.buffer.add(self.first.id, self.question.id, self.yes.id)
+        self.buffer.flush()
+        self.buffer.add(self.first.id, self.question.id, self.no.id)
+        self.buffer.add(self.second.id, self.question.id, self.yes.id)
+        self.buffer.flush()
+        self.assertEqual(Vote.objects.get(user=self.first).selected_choice, self.no)
+        self.assertEqual(self.votes(), [1, 1])
+
+    def test_failed_flush_keeps_votes(self):
+        """Check that the votes are kept when the flush fails."""
+        self.buffer.add(self.first.id, self.question.id, self.yes.id)
+        with mock.patch('polls.buffer.record_votes', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.buffer.flush()
+        self.assertEqual(len(self.buffer), 1)
+        self.buffer.stop()
+        self.assertEqual(self.votes(), [1, 0])
+
+    @override_settings(POLLS_VOTE_WRITE_MODE='buffered')
+    def test_buffered_view(self):
+        """Check that the vote view only buffers the vote in the buffered mode."""
+        self.client.login(username="Pazcal", password="782543")
+        with mock.patch('polls.views.vote_buffer', self.buffer):
+            response = self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': self.no.id})
+        self.assertRedirects(response, reverse('polls:results', args=(self.question.id,)))
+        self.assertFalse(Vote.objects.exists())
+        self.buffer.flush()
+        self.assertEqual(self.votes(), [0, 1])
+
+
+class VoteJournalTest(TestCase):
+    """Class for testing the journal that keeps the buffered votes of a killed process."""
+
+    def setUp(self):
+        """Set up the user, the question and the journal directory."""
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+        self.question = create_question('This is a question')
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def buffer(self):
+        """Return a buffer without the flusher that journals to the directory."""
+        return VoteBuffer(max_size=10, interval=60, autostart=False, journal_dir=self.directory)
+
+    def test_flush_removes_journal(self):
+        """Check that the flushed votes leave no journal behind."""
+        buffer = self.buffer()
+        buffer.add(self.user.id, self.question.id, self.yes.id)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        buffer.flush()
+        buffer.stop()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @unittest.skipUnless(fcntl, 'the journals are recovered with flock')
+    def test_recover_killed(self):
+        """Check that the votes of a killed process are written by the next one and a live one is left alone."""
+        killed = self.buffer()
+        killed.add(self.user.id, self.question.id, self.yes.id)
+        killed.add(self.user.id, self.question.id, self.no.id)
+        live = self.buffer()
+        self.assertEqual(live.recover(), 0)
+        self.assertFalse(Vote.objects.exists())
+        # A killed process leaves its files and its lock is freed.
+        killed.journal._file.close()
+        killed.journal._lock_file.close()
+        self.assertEqual(live.recover(), 1)
+        self.assertEqual(Vote.objects.get(user=self.user).selected_choice, self.no)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_failed_flush_keeps_journal(self):
+        """Check that the journal of a failed flush stays until a later flush writes its votes."""
+        buffer = self.buffer()
+        buffer.add(self.user.id, self.question.id, self.yes.id)
+        with mock.patch('polls.buffer.record_votes', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+        buffer.add(self.user.id, self.question.id, self.no.id)
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+        buffer.flush()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        self.assertEqual(Vote.objects.get(user=self.user).selected_choice, self.no)
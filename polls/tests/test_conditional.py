@@ -0,0 +1,112 @@
+"""Module for testing the ETags and the 304 answers of the poll pages."""
+import datetime
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from polls.conditional import last_transition
+from polls.models import Question
+from polls.tally import vote_committed
+
+
+def create_question(question_text, days, end_days=1):
+    """Create the sample question with two choices.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    days : int
+        Days from now to the published date
+    end_days : int
+        Days from now to the end date
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() + datetime.timedelta(days=days),
+                                       end_date=timezone.now() + datetime.timedelta(days=end_days))
+    question.choice_set.create(choice_text='Yes')
+    question.choice_set.create(choice_text='No')
+    return question
+
+
+@override_settings(POLLS_VOTE_USER_RATE=None, POLLS_VOTE_IP_RATE=None)
+class ConditionalGetTest(TestCase):
+    """Class for testing the conditional GET of the index, the detail and the results pages."""
+
+    def setUp(self):
+        """Set up the user and the question."""
+        cache.clear()
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+        self.question = create_question('Past question.', -1)
+        self.results = reverse('polls:results', args=(self.question.id,))
+
+    def revalidate(self, url):
+        """Get the page, then get it again with its ETag and return the second response."""
+        # The first visit of a form sets the CSRF cookie, which is part of the ETag.
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_results_not_modified(self):
+        """Check that the unchanged results page costs no query and no render."""
+        etag = self.client.get(self.results)['ETag']
+        with self.assertNumQueries(0), self.assertTemplateNotUsed('polls/result.html'):
+            response = self.client.get(self.results, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_vote_changes_results(self):
+        """Check that a committed vote changes the ETag of the results."""
+        etag = self.client.get(self.results)['ETag']
+        vote_committed(self.question.id, {self.question.choice_set.first().id: 1})
+        self.assertEqual(self.client.get(self.results, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_index_and_detail(self):
+        """Check that the unchanged index and detail pages are answered with 304."""
+        self.client.force_login(self.user)
+        self.assertEqual(self.revalidate(reverse('polls:index')).status_code, 304)
+        self.assertEqual(self.revalidate(reverse('polls:detail', args=(self.question.id,))).status_code, 304)
+
+    def test_edit_changes_index(self):
+        """Check that a new question changes the ETag of the index."""
+        etag = self.client.get(reverse('polls:index'))['ETag']
+        create_question('New question.', -1)
+        response = self.client.get(reverse('polls:index'), HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'New question.')
+
+    def test_user_changes_index(self):
+        """Check that the index of another user, or after the login, is not answered with 304."""
+        etag = self.client.get(reverse('polls:index'))['ETag']
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('polls:index'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_own_vote_changes_detail(self):
+        """Check that the vote of the user changes the ETag of the pages that show it."""
+        self.client.force_login(self.user)
+        url = reverse('polls:detail', args=(self.question.id,))
+        etag = self.client.get(url)['ETag']
+        choice = self.question.choice_set.first()
+        self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': choice.id})
+        self.assertContains(self.client.get(url, HTTP_IF_NONE_MATCH=etag), 'Your previous vote')
+
+    def test_messages_skip_etag(self):
+        """Check that a page with a pending message is rendered to show it, and the next one gets its ETag again."""
+        self.client.force_login(self.user)
+        closed = create_question('Closed question.', -2, -1)
+        url = reverse('polls:index')
+        self.client.get(reverse('polls:detail', args=(closed.id,)))
+        response = self.client.get(url)
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, "This poll is already closed.")
+        response = self.client.get(url)
+        self.assertNotContains(response, "This poll is already closed.")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_last_transition(self):
+        """Check that the last transition moves when a question closes, without a new list version."""
+        now = timezone.now()
+        closing = create_question('Closing question.', -1, 0)
+        before = last_transition(now)
+        self.assertEqual(last_transition(closing.end_date + datetime.timedelta(seconds=1)), closing.end_date)
+        self.assertLess(before, closing.end_date)
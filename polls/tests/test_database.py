@@ -0,0 +1,29 @@
+"""Module for testing the database profile."""
+from django.db import connection
+from django.test import TestCase, override_settings
+from polls.signals import tune_sqlite
+
+
+class SqliteProfileTest(TestCase):
+    """Class for testing the PRAGMAs of the SQLite connections."""
+
+    def pragma(self, name):
+        """Return the value of the PRAGMA on the test connection."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA %s' % name)
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """Check that the new connections are tuned by POLLS_SQLITE_PRAGMAS."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 20000)
+
+    @override_settings(POLLS_SQLITE_PRAGMAS={'cache_size': -4000})
+    def test_custom_pragmas(self):
+        """Check that the receiver runs the PRAGMAs of the setting."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        tune_sqlite(sender=type(connection), connection=connection)
+        self.assertEqual(self.pragma('cache_size'), -4000)
@@ -0,0 +1,65 @@
+"""Module for testing the cached template fragments of the polls."""
+import datetime
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from polls.models import Question
+from polls.tally import vote_committed
+
+
+def create_question(question_text):
+    """Create the sample question that can vote with two choices.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() - datetime.timedelta(days=1),
+                                       end_date=timezone.now() + datetime.timedelta(days=1))
+    question.choice_set.create(choice_text='Yes')
+    question.choice_set.create(choice_text='No')
+    return question
+
+
+class FragmentCacheTest(TestCase):
+    """Class for testing the cached fragments and their invalidation."""
+
+    def setUp(self):
+        """Set up the question."""
+        cache.clear()
+        self.question = create_question('This is a question')
+
+    def test_choice_list_is_cached(self):
+        """Check that the cached choice list skips the choice query until a choice is edited."""
+        url = reverse('polls:detail', args=(self.question.id,))
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, 'Yes')
+        self.question.choice_set.create(choice_text='Maybe')
+        self.assertContains(self.client.get(url), 'Maybe')
+
+    def test_choice_list_kept_through_votes(self):
+        """Check that a vote does not drop the cached choice list, it shows no votes."""
+        url = reverse('polls:detail', args=(self.question.id,))
+        self.client.get(url)
+        vote_committed(self.question.id, {self.question.choice_set.first().id: 1})
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_index_row_follows_edits(self):
+        """Check that an edited question shows its new text on the index."""
+        self.client.get(reverse('polls:index'))
+        self.question.question_text = 'Edited question'
+        self.question.save()
+        self.assertContains(self.client.get(reverse('polls:index')), 'Edited question')
+
+    def test_index_row_per_auth_state(self):
+        """Check that the vote link of the cached row is only shown to the logged in user."""
+        self.assertNotContains(self.client.get(reverse('polls:index')), 'Vote!')
+        self.client.force_login(get_user_model().objects.create_user("Pazcal", password="782543"))
+        self.assertContains(self.client.get(reverse('polls:index')), 'Vote!')
@@ -0,0 +1,67 @@
+"""Module for testing the request metrics."""
+import asyncio
+import datetime
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from polls.metrics import instrument, registry
+from polls.middleware import RequestMetricsMiddleware
+from polls.models import Question
+
+
+class RequestMetricsTest(TestCase):
+    """Class for testing the request metrics middleware and the metrics page."""
+
+    def setUp(self):
+        """Set up the question and forget the recorded requests."""
+        registry.reset()
+        Question.objects.create(question_text='This is a question',
+                                pub_date=timezone.now() - datetime.timedelta(days=1))
+
+    def test_record(self):
+        """Check that the requests are recorded under their url name."""
+        self.client.get(reverse('polls:index'))
+        self.client.get(reverse('polls:index'))
+        summary = registry.summary()
+        self.assertEqual(summary['polls:index']['count'], 2)
+        self.assertGreater(summary['polls:index']['queries'][0.5], 0)
+        self.assertGreater(summary['polls:index']['render'][0.99], 0)
+
+    async def test_asgi(self):
+        """Check that the middleware is awaited by the async handler and still records the request."""
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(asyncio.iscoroutinefunction(RequestMetricsMiddleware(view)))
+        self.assertFalse(asyncio.iscoroutinefunction(RequestMetricsMiddleware(lambda request: HttpResponse())))
+        response = await AsyncClient().get(reverse('polls:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(registry.summary()['polls:index']['count'], 1)
+
+    @override_settings(POLLS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_log(self):
+        """Check that a request over the threshold is logged."""
+        with self.assertLogs('polls', level='WARNING') as logs:
+            self.client.get(reverse('polls:index'))
+        self.assertIn('Slow request: GET %s (polls:index)' % reverse('polls:index'), logs.output[0])
+
+    def test_metrics_page(self):
+        """Check that only the admins can see the metrics."""
+        self.client.get(reverse('polls:index'))
+        response = self.client.get(reverse('polls:metrics'))
+        self.assertEqual(response.status_code, 302)
+        get_user_model().objects.create_user("Admin", password="782543", is_staff=True)
+        self.client.login(username="Admin", password="782543")
+        response = self.client.get(reverse('polls:metrics'))
+        self.assertContains(response, 'polls_request_seconds{view="polls:index",quantile="0.99"}')
+        self.assertContains(response, 'polls_request_seconds_count{view="polls:index"} 1')
+
+    def test_instrument(self):
+        """Check that the decorator records a view called without the middleware."""
+        view = instrument(lambda request: HttpResponse(str(Question.objects.count())))
+        request = RequestFactory().get(reverse('polls:index'))
+        request.resolver_match = resolve(request.path)
+        view(request)
+        self.assertEqual(registry.summary()['polls:index']['queries'][0.5], 1)
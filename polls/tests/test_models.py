@@ -37,3 +37,35 @@ class QuestionModelTest(TestCase):
         time = timezone.now() - datetime.timedelta(hours=23, minutes=59, seconds=59)
         recent_question = Question(pub_date=time)
         self.assertIs(recent_question.was_published_recently(), True)
+
+
+class QuestionQuerySetTest(TestCase):
+    """Class for testing the state predicates of the question queryset."""
+
+    def setUp(self):
+        """Set up the questions in every state."""
+        now = timezone.now()
+        self.now = now
+        for text, pub_days, end_days in (('future', 5, 10), ('recent', -0.5, 1), ('open', -5, 1),
+                                         ('closed', -5, -1)):
+            Question.objects.create(question_text=text, pub_date=now + datetime.timedelta(days=pub_days),
+                                    end_date=now + datetime.timedelta(days=end_days))
+
+    def texts(self, queryset):
+        """Return the sorted texts of the questions of the queryset."""
+        return sorted(queryset.values_list('question_text', flat=True))
+
+    def test_predicates(self):
+        """Check that every predicate selects the questions in its state."""
+        questions = Question.objects.all()
+        self.assertEqual(self.texts(questions.published(self.now)), ['closed', 'open', 'recent'])
+        self.assertEqual(self.texts(questions.open_for_voting(self.now)), ['open', 'recent'])
+        self.assertEqual(self.texts(questions.closed(self.now)), ['closed'])
+        self.assertEqual(self.texts(questions.recent(self.now)), ['recent'])
+
+    def test_is_open_matches_can_vote(self):
+        """Check that the annotated is_open is can_vote() of every question, read in one query."""
+        with self.assertNumQueries(1):
+            questions = list(Question.objects.with_is_open())
+        for question in questions:
+            self.assertEqual(bool(question.is_open), question.can_vote())
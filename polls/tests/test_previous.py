@@ -0,0 +1,130 @@
+"""Module for testing the previous vote lookup."""
+import datetime
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from polls.models import ArchivedVote, Question
+from polls.tally import record_vote
+
+
+def create_question(question_text):
+    """Create the sample question that can vote with two choices.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() - datetime.timedelta(days=1),
+                                       end_date=timezone.now() + datetime.timedelta(days=1))
+    question.choice_set.create(choice_text='Yes')
+    question.choice_set.create(choice_text='No')
+    return question
+
+
+def question_writes(queries):
+    """Return the captured queries that write the question table."""
+    return [query['sql'] for query in queries
+            if query['sql'].startswith(('UPDATE "polls_question"', 'INSERT INTO "polls_question"'))]
+
+
+class PreviousVoteTest(TestCase):
+    """Class for testing the previous vote of the user."""
+
+    def setUp(self):
+        """Set up the user and the questions for testing the previous vote."""
+        cache.clear()
+        get_user_model().objects.create_user("Pazcal", password="782543")
+        self.first = create_question('First question')
+        self.second = create_question('Second question')
+
+    def vote(self, question, text):
+        """Vote the choice with the given text of the question."""
+        choice = question.choice_set.get(choice_text=text)
+        return self.client.post(reverse('polls:vote', args=(question.id,)), {'choice': choice.pk})
+
+    def test_login_and_vote_do_not_write_questions(self):
+        """Check that login and vote do not write any question."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.login(username="Pazcal", password="782543")
+            response = self.vote(self.first, 'Yes')
+        self.assertEqual(question_writes(queries), [])
+        self.assertRedirects(response, reverse('polls:results', args=(self.first.id,)))
+
+    def test_previous_vote_in_context(self):
+        """Check the previous vote of the user in the index and the detail page."""
+        self.client.login(username="Pazcal", password="782543")
+        self.vote(self.first, 'Yes')
+        self.vote(self.first, 'No')
+        response = self.client.get(reverse('polls:index'))
+        votes = {question.id: question.previous_vote for question in response.context['latest_question_list']}
+        self.assertEqual(votes, {self.first.id: 'No', self.second.id: ''})
+        response = self.client.get(reverse('polls:detail', args=(self.first.id,)))
+        self.assertEqual(response.context['previous_vote'], 'No')
+        self.assertContains(response, 'Your previous vote: No')
+
+    def test_previous_vote_is_per_user(self):
+        """Check that the vote of another user is not shown."""
+        get_user_model().objects.create_user("Other", password="782543")
+        self.client.login(username="Other", password="782543")
+        self.vote(self.first, 'Yes')
+        self.client.logout()
+        self.client.login(username="Pazcal", password="782543")
+        response = self.client.get(reverse('polls:detail', args=(self.first.id,)))
+        self.assertEqual(response.context['previous_vote'], '')
+
+    def test_session_cache(self):
+        """Check that the previous votes are read from the session after the first lookup."""
+        self.client.login(username="Pazcal", password="782543")
+        self.client.get(reverse('polls:index'))
+        self.vote(self.second, 'Yes')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('polls:detail', args=(self.second.id,)))
+        self.assertEqual(response.context['previous_vote'], 'Yes')
+        self.assertFalse([query for query in queries if 'polls_vote' in query['sql']])
+
+    @override_settings(POLLS_CACHE_PREVIOUS_VOTES=False)
+    def test_without_session_cache(self):
+        """Check the previous vote when the session cache is off."""
+        self.client.login(username="Pazcal", password="782543")
+        self.vote(self.second, 'No')
+        response = self.client.get(reverse('polls:detail', args=(self.second.id,)))
+        self.assertEqual(response.context['previous_vote'], 'No')
+        self.assertNotIn('polls_previous_votes', self.client.session)
+
+    def test_archived_lookup_index(self):
+        """Check that the archived votes of the user are found through the index instead of a scan of the archive."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        user = get_user_model().objects.get(username="Pazcal")
+        plan = ArchivedVote.objects.filter(user=user).values_list('question_id').explain()
+        self.assertIn('polls_archvote_user_q_idx', plan)
+
+
+@override_settings(POLLS_DEFER_LAST_LOGIN=False)
+class PreviousVoteVersionTest(TransactionTestCase):
+    """Class for testing that the previous votes kept in the session follow the votes of other sessions."""
+
+    def setUp(self):
+        """Set up the user and the question."""
+        cache.clear()
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+        self.question = create_question('First question')
+
+    def test_vote_of_other_device(self):
+        """Check that a vote from another session replaces the previous vote kept in the session."""
+        self.client.force_login(self.user)
+        url = reverse('polls:detail', args=(self.question.id,))
+        etag = self.client.get(url)['ETag']
+        record_vote(self.user, self.question, self.question.choice_set.get(choice_text='No'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['previous_vote'], 'No')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([query for query in queries if 'polls_vote' in query['sql']])
@@ -0,0 +1,128 @@
+"""Module for testing the routing of the reads to the read replicas."""
+import asyncio
+import datetime
+import unittest
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpResponse
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from polls.middleware import ReplicaStickinessMiddleware
+from polls.models import Question, Choice, Vote
+from polls.routers import ReplicaRouter, use_primary
+
+REPLICA = 'replica_test'
+
+
+def create_question(question_text, using):
+    """Create the sample question that can vote with two choices in the database.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    using : str
+        alias of the database
+    """
+    question = Question.objects.using(using).create(pk=1, question_text=question_text,
+                                                    pub_date=timezone.now() - datetime.timedelta(days=1),
+                                                    end_date=timezone.now() + datetime.timedelta(days=1))
+    Choice.objects.using(using).create(pk=1, question=question, choice_text='Yes')
+    Choice.objects.using(using).create(pk=2, question=question, choice_text='No')
+    return question
+
+
+@override_settings(POLLS_READ_REPLICAS=[REPLICA], POLLS_VOTE_USER_RATE=None, POLLS_VOTE_IP_RATE=None,
+                   POLLS_DEFER_LAST_LOGIN=False)
+class ReplicaRoutingTest(TransactionTestCase):
+    """Class for testing the reads from a SQLite replica that is not a copy of the primary.
+
+    ...
+
+    The replica keeps a question with another text under the same id, so
+    the page shows which database it was read from.
+
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Add the replica alias with its own test database, not a mirror of the primary, for this class only."""
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise unittest.SkipTest('SQLite only')
+        connections.databases[REPLICA] = dict(connections.databases[DEFAULT_DB_ALIAS], TEST={})
+        connections[REPLICA].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Not a class attribute, so the test runner does not set up the unknown alias itself.
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Drop the test database and the alias of the replica."""
+        try:
+            super().tearDownClass()
+        finally:
+            connections[REPLICA].creation.destroy_test_db(verbosity=0)
+            del connections[REPLICA]
+            del connections.databases[REPLICA]
+
+    def setUp(self):
+        """Create the question on both databases and the user the replica knows too."""
+        cache.clear()
+        create_question('Primary question', DEFAULT_DB_ALIAS)
+        create_question('Replica question', REPLICA)
+        self.user = get_user_model().objects.create_user('voter', password='secret')
+        get_user_model().objects.using(REPLICA).create(pk=self.user.pk, username='voter', password='!')
+
+    def test_router(self):
+        """Check that the reads go to the replica unless pinned or in a transaction."""
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Question), REPLICA)
+        self.assertEqual(router.db_for_write(Question), DEFAULT_DB_ALIAS)
+        with use_primary():
+            self.assertEqual(router.db_for_read(Question), DEFAULT_DB_ALIAS)
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Question), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_read(get_user_model()), REPLICA)
+
+    def test_pages_read_replica(self):
+        """Check that the GET pages are read from the replica."""
+        self.assertContains(self.client.get(reverse('polls:index')), 'Replica question')
+        self.assertContains(self.client.get(reverse('polls:detail', args=(1,))), 'Replica question')
+
+    def test_read_your_writes(self):
+        """Check that the vote goes to the primary and the next pages are read from it."""
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('polls:vote', args=(1,)), {'choice': 1}, follow=True)
+        self.assertContains(response, 'Primary question')
+        self.assertEqual(response.context['results']['total'], 1)
+        self.assertEqual(Vote.objects.using(DEFAULT_DB_ALIAS).count(), 1)
+        self.assertEqual(Vote.objects.using(REPLICA).count(), 0)
+        self.assertContains(self.client.get(reverse('polls:index')), 'Primary question')
+
+    async def test_asgi(self):
+        """Check that the middleware is awaited by the async handler and still pins the reads after a vote."""
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(asyncio.iscoroutinefunction(ReplicaStickinessMiddleware(view)))
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.user)
+        response = await client.post(reverse('polls:vote', args=(1,)), 'choice=1',
+                                     content_type='application/x-www-form-urlencoded')
+        self.assertEqual(response.status_code, 302)
+        self.assertContains(await client.get(reverse('polls:index')), 'Primary question')
+
+    @override_settings(POLLS_REPLICA_STICKY_SECONDS=0)
+    def test_window_closes(self):
+        """Check that the reads go back to the replica when the window has closed."""
+        self.client.force_login(self.user)
+        self.client.post(reverse('polls:vote', args=(1,)), {'choice': 1})
+        self.assertContains(self.client.get(reverse('polls:index')), 'Replica question')
+
+    @override_settings(POLLS_READ_REPLICAS=[])
+    def test_without_replicas(self):
+        """Check that everything is read from the primary without replicas."""
+        self.assertContains(self.client.get(reverse('polls:index')), 'Primary question')
@@ -0,0 +1,133 @@
+"""Module for testing the results snapshot."""
+import datetime
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from polls.cache import bump_question_version, question_version, version_key
+from polls.models import Choice, Question
+from polls.results import cache_stats, get_snapshot, reset_cache_stats, snapshot_key
+from polls.tally import record_vote
+
+
+def create_question(question_text):
+    """Create the sample question that can vote with two choices.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() - datetime.timedelta(days=1),
+                                       end_date=timezone.now() + datetime.timedelta(days=1))
+    question.choice_set.create(choice_text='Yes')
+    question.choice_set.create(choice_text='No')
+    return question
+
+
+class ResultsSnapshotTest(TestCase):
+    """Class for testing the results snapshot."""
+
+    def setUp(self):
+        """Set up the user and the question for testing the snapshot."""
+        cache.clear()
+        reset_cache_stats()
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+        self.question = create_question('This is a question')
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+
+    def test_snapshot(self):
+        """Check the counts, the total and the percentages of the snapshot."""
+        record_vote(self.user, self.question, self.yes)
+        other = get_user_model().objects.create_user("Other", password="782543")
+        third = get_user_model().objects.create_user("Third", password="782543")
+        record_vote(other, self.question, self.yes)
+        record_vote(third, self.question, self.no)
+        snapshot = get_snapshot(self.question.id)
+        self.assertEqual(snapshot['total'], 3)
+        self.assertEqual([(choice['text'], choice['votes'], choice['percent']) for choice in snapshot['choices']],
+                         [('Yes', 2, 66.7), ('No', 1, 33.3)])
+
+    def test_cache_hit(self):
+        """Check that the second read is a cache hit without any query."""
+        get_snapshot(self.question.id)
+        with self.assertNumQueries(0):
+            get_snapshot(self.question.id)
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_edit_invalidates(self):
+        """Check that editing a choice makes a new version of the snapshot."""
+        get_snapshot(self.question.id)
+        self.yes.choice_text = 'Sure'
+        self.yes.save()
+        self.assertEqual(get_snapshot(self.question.id)['choices'][0]['text'], 'Sure')
+
+    def cast_after_read(self, reads):
+        """Return the version reader that lets a vote commit after each of the first reads."""
+        calls = []
+
+        def read(question_id):
+            version = question_version(question_id)
+            calls.append(version)
+            if len(calls) <= reads:
+                Choice.objects.filter(pk=self.yes.pk).update(votes=F('votes') + 1)
+                bump_question_version(question_id)
+            return version
+        return read
+
+    def test_vote_between_reads(self):
+        """Check that a vote committed between the version and the rows gets the snapshot its version."""
+        with mock.patch('polls.results.question_version', self.cast_after_read(1)):
+            snapshot = get_snapshot(self.question.id)
+        self.assertEqual(snapshot['total'], 1)
+        self.assertEqual(snapshot['version'], question_version(self.question.id))
+        self.assertEqual(cache.get(snapshot_key(self.question.id, snapshot['version'])), snapshot)
+
+    def test_votes_through_every_read(self):
+        """Check that the rows read while the votes keep coming get the later version and are not cached."""
+        with mock.patch('polls.results.question_version', self.cast_after_read(10)):
+            snapshot = get_snapshot(self.question.id, attempts=2)
+        self.assertEqual(snapshot['total'], 2)
+        self.assertEqual(snapshot['version'], question_version(self.question.id) - 1)
+        self.assertIsNone(cache.get(snapshot_key(self.question.id, snapshot['version'])))
+
+    def test_eviction_after_rapid_bumps(self):
+        """Check that a version evicted after a burst of votes starts again above the old one."""
+        version = question_version(self.question.id)
+        for _ in range(2000):
+            latest = bump_question_version(self.question.id)
+        cache.delete(version_key(self.question.id))
+        self.assertGreater(question_version(self.question.id), latest)
+        self.assertGreater(latest, version)
+
+    def test_results_view(self):
+        """Check that the results page does not read the choices on a cache hit."""
+        url = reverse('polls:results', args=(self.question.id,))
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, 'Yes -- 0 votes')
+        self.assertEqual(cache_stats()['hits'], 1)
+
+
+class ResultsInvalidationTest(TransactionTestCase):
+    """Class for testing that a committed vote invalidates the snapshot."""
+
+    def setUp(self):
+        """Set up the user and the question for testing the invalidation."""
+        cache.clear()
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+        self.question = create_question('This is a question')
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+
+    def test_vote_invalidates(self):
+        """Check that a vote makes a new version of the snapshot."""
+        first = get_snapshot(self.question.id)
+        record_vote(self.user, self.question, self.no)
+        second = get_snapshot(self.question.id)
+        self.assertGreater(second['version'], first['version'])
+        self.assertEqual(second['total'], 1)
@@ -0,0 +1,66 @@
+"""Module for testing the hashed and precompressed static files."""
+import gzip
+import tempfile
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import AsyncClient, SimpleTestCase, override_settings
+from polls.staticfiles import accepted_encodings
+
+
+class StaticFilesTest(SimpleTestCase):
+    """Class for testing collectstatic with the compressed manifest storage and the static middleware."""
+
+    def setUp(self):
+        """Collect the static files of the polls and the project to a temporary STATIC_ROOT."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(STATIC_ROOT=directory.name,
+                                     STATICFILES_STORAGE='polls.staticfiles.CompressedManifestStaticFilesStorage')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0, ignore_patterns=['admin'])
+        self.hashed = staticfiles_storage.stored_name('css/style.css')
+
+    def test_collect(self):
+        """Check that the hashed file gets a gzip variant and the tiny file does not."""
+        self.assertRegex(self.hashed, r'^css/style\.[0-9a-f]{12}\.css$')
+        with staticfiles_storage.open(self.hashed + '.gz') as zipped:
+            with staticfiles_storage.open(self.hashed) as original:
+                self.assertEqual(gzip.decompress(zipped.read()), original.read())
+        self.assertFalse(staticfiles_storage.exists(staticfiles_storage.stored_name('polls/style.css') + '.gz'))
+
+    def test_serve_hashed(self):
+        """Check that the hashed file is cached for a year and sent gzipped to the clients that accept it."""
+        url = '/static/' + self.hashed
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn(b'padding-left', gzip.decompress(b''.join(response.streaming_content)))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 304)
+
+    def test_serve_identity(self):
+        """Check that the file is sent as it is without Accept-Encoding and the unhashed name is cached shortly."""
+        response = self.client.get('/static/css/style.css', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertIn(b'padding-left', b''.join(response.streaming_content))
+
+    async def test_asgi(self):
+        """Check that the file is served by the async handler and the other paths are passed on."""
+        response = await AsyncClient().get('/static/' + self.hashed, **{'accept-encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual((await AsyncClient().get('/static/css/missing.css')).status_code, 404)
+
+    def test_not_static(self):
+        """Check that the unknown static path is passed on to Django."""
+        self.assertEqual(self.client.get('/static/css/missing.css').status_code, 404)
+
+    def test_accepted_encodings(self):
+        """Check the parsing of Accept-Encoding."""
+        self.assertEqual(accepted_encodings('br;q=1.0, gzip;q=0.5, identity;q=0'), {'br', 'gzip'})
+        self.assertEqual(accepted_encodings(''), set())
@@ -0,0 +1,164 @@
+"""Module for testing the live results stream."""
+import asyncio
+import datetime
+import json
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from polls.models import Question
+from polls.pubsub import LocalBroker, get_broker
+from polls.stream import ResultsStreamApp
+from polls.tally import record_vote
+
+
+def create_question(question_text):
+    """Create the sample question that can vote with two choices.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() - datetime.timedelta(days=1),
+                                       end_date=timezone.now() + datetime.timedelta(days=1))
+    question.choice_set.create(choice_text='Yes')
+    question.choice_set.create(choice_text='No')
+    return question
+
+
+def events(messages):
+    """Return the (event, data) of the server-sent events in the sent body messages."""
+    body = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    found = []
+    for block in body.decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            found.append((fields['event'], json.loads(fields['data'])))
+    return found
+
+
+class BrokerTest(SimpleTestCase):
+    """Class for testing the in-process broker."""
+
+    def test_burst_is_summed(self):
+        """Check that the deltas published before the watcher reads are summed into one."""
+        async def watch():
+            broker = LocalBroker()
+            subscription = broker.subscribe(1)
+            broker.publish(1, {10: 1}, 5)
+            broker.publish(1, {10: 1, 11: -1}, 6)
+            broker.publish(1, {11: 1}, 7)
+            broker.publish(2, {20: 1}, 8)
+            delta = await subscription.get()
+            subscription.close()
+            return delta, broker.watchers(1)
+        self.assertEqual(asyncio.run(watch()), ((7, {10: 2}), 0))
+
+    def test_skip_snapshot_deltas(self):
+        """Check that the deltas up to the version of the snapshot are dropped, before and after it is read."""
+        async def watch():
+            broker = LocalBroker()
+            subscription = broker.subscribe(1)
+            broker.publish(1, {10: 1}, 5)
+            subscription.skip_through(6)
+            broker.publish(1, {10: 1}, 6)
+            broker.publish(1, {11: 1}, 7)
+            return await subscription.get()
+        self.assertEqual(asyncio.run(watch()), (7, {11: 1}))
+
+
+class StreamFallbackTest(TestCase):
+    """Class for testing the results stream url under WSGI."""
+
+    def test_snapshot_event(self):
+        """Check that the url answers one snapshot event with a retry."""
+        cache.clear()
+        question = create_question('This is a question')
+        response = self.client.get(reverse('polls:results_stream', args=(question.id,)))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.content.startswith(b'retry: 30000\n'))
+        self.assertEqual(events([{'type': 'http.response.body', 'body': response.content}])[0][1]['total'], 0)
+
+    def test_script_only_when_live(self):
+        """Check that the results page only opens the stream when the ASGI app serves it."""
+        question = create_question('This is a question')
+        url = reverse('polls:results', args=(question.id,))
+        with override_settings(POLLS_LIVE_RESULTS=False):
+            self.assertNotContains(self.client.get(url), 'EventSource')
+        with override_settings(POLLS_LIVE_RESULTS=True, POLLS_ETAG_VERSION='live'):
+            self.assertContains(self.client.get(url), 'EventSource')
+
+
+@override_settings(POLLS_STREAM_MAX_RATE=1000)
+class ResultsStreamAppTest(TransactionTestCase):
+    """Class for testing the ASGI results stream."""
+
+    def setUp(self):
+        """Set up the user and the question for testing the stream."""
+        cache.clear()
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+        self.question = create_question('This is a question')
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+
+    async def run_stream(self, path, action):
+        """Run the stream of the path, do the action after the first body message and disconnect."""
+        messages = []
+        received = asyncio.Queue()
+        sent = asyncio.Event()
+
+        async def receive():
+            return await received.get()
+
+        async def send(message):
+            messages.append(message)
+            sent.set()
+
+        async def django_app(scope, receive, send):
+            messages.append({'type': 'django'})
+
+        app = ResultsStreamApp(django_app)
+        scope = {'type': 'http', 'method': 'GET', 'path': path}
+        task = asyncio.ensure_future(app(scope, receive, send))
+        while not task.done() and not any(message.get('more_body') for message in messages):
+            sent.clear()
+            await asyncio.wait({task, asyncio.ensure_future(sent.wait())}, timeout=5,
+                               return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            count = len(messages)
+            await action()
+            while len(messages) == count:
+                sent.clear()
+                await asyncio.wait_for(sent.wait(), timeout=5)
+            await received.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, timeout=5)
+        return messages
+
+    def test_snapshot_and_delta(self):
+        """Check that a committed vote reaches the watcher as a delta after the snapshot."""
+        async def vote():
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, record_vote, self.user, self.question, self.no)
+
+        path = '/polls/%d/results/stream/' % self.question.id
+        messages = asyncio.run(self.run_stream(path, vote))
+        self.assertEqual(messages[0]['status'], 200)
+        found = events(messages)
+        self.assertEqual(found[0][0], 'snapshot')
+        self.assertEqual(found[0][1]['choices'], {str(self.yes.id): 0, str(self.no.id): 0})
+        self.assertEqual(found[1][0], 'delta')
+        self.assertEqual(found[1][1]['choices'], {str(self.no.id): 1})
+        self.assertGreater(found[1][1]['version'], found[0][1]['version'])
+        self.assertEqual(get_broker().watchers(self.question.id), 0)
+
+    def test_missing_question(self):
+        """Check that the stream of a missing question is not found."""
+        messages = asyncio.run(self.run_stream('/polls/0/results/stream/', None))
+        self.assertEqual(messages[0]['status'], 404)
+
+    def test_other_paths(self):
+        """Check that the other paths are passed to Django."""
+        messages = asyncio.run(self.run_stream('/polls/%d/results/' % self.question.id, None))
+        self.assertEqual(messages, [{'type': 'django'}])
@@ -0,0 +1,143 @@
+"""Module for testing the vote tally."""
+import datetime
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from polls.archive import freeze_question
+from polls.models import Question, Choice, ChoiceCounterShard, Vote
+from polls.results import get_snapshot
+from polls.tally import compact_counters, record_vote, reconcile_tallies
+
+
+def create_question(question_text, choices):
+    """Create the sample question that can vote.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    choices : int
+        Number of the choices of the question
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() - datetime.timedelta(days=1),
+                                       end_date=timezone.now() + datetime.timedelta(days=1))
+    for number in range(choices):
+        question.choice_set.create(choice_text='Choice %d' % number)
+    return question
+
+
+class TallyTest(TestCase):
+    """Class for testing the vote tally."""
+
+    def setUp(self):
+        """Set up the user and the question for testing the tally."""
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543")
+        self.question = create_question('This is a question', 3)
+        self.first, self.second, self.third = self.question.choice_set.all()
+
+    def votes(self):
+        """Return the votes of every choice of the question."""
+        return list(self.question.choice_set.order_by('pk').values_list('votes', flat=True))
+
+    def test_new_vote(self):
+        """Check that a new vote only increments the selected choice."""
+        delta = record_vote(self.user, self.question, self.first)
+        self.assertEqual(delta, {self.first.pk: 1})
+        self.assertEqual(self.votes(), [1, 0, 0])
+
+    def test_change_vote(self):
+        """Check that a changed vote moves one vote between the choices."""
+        record_vote(self.user, self.question, self.first)
+        delta = record_vote(self.user, self.question, self.third)
+        self.assertEqual(delta, {self.first.pk: -1, self.third.pk: 1})
+        self.assertEqual(self.votes(), [0, 0, 1])
+        self.assertEqual(Vote.objects.get(user=self.user).selected_choice, self.third)
+
+    def test_same_vote(self):
+        """Check that voting the same choice again changes nothing."""
+        record_vote(self.user, self.question, self.second)
+        self.assertEqual(record_vote(self.user, self.question, self.second), {})
+        self.assertEqual(self.votes(), [0, 1, 0])
+
+    def test_queries_do_not_depend_on_choices(self):
+        """Check that the number of queries of a vote is the same for any number of choices."""
+        counts = []
+        for question in (self.question, create_question('Big question', 30)):
+            with CaptureQueriesContext(connection) as queries:
+                record_vote(self.user, question, question.choice_set.first())
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_first_vote_is_one_insert(self):
+        """Check that a first vote touches the vote table with one INSERT only."""
+        with CaptureQueriesContext(connection) as queries:
+            record_vote(self.user, self.question, self.first)
+        votes = [query['sql'] for query in queries if '"polls_vote"' in query['sql']]
+        self.assertEqual(len(votes), 1)
+        self.assertIn('INSERT', votes[0])
+
+    def test_unique_vote(self):
+        """Check that the database refuses a second vote of the user on the question."""
+        record_vote(self.user, self.question, self.first)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Vote.objects.create(user=self.user, question=self.question, selected_choice=self.second)
+
+    def test_reconcile(self):
+        """Check that reconcile repairs the drifted choices."""
+        record_vote(self.user, self.question, self.first)
+        Choice.objects.filter(pk=self.second.pk).update(votes=7)
+        drifted = reconcile_tallies(dry_run=True)
+        self.assertEqual([(choice.pk, stored, total) for choice, stored, total in drifted],
+                         [(self.second.pk, 7, 0)])
+        self.assertEqual(self.votes(), [1, 7, 0])
+        out = StringIO()
+        call_command('reconcile_votes', stdout=out)
+        self.assertIn('Repaired 1 drifted choice(s).', out.getvalue())
+        self.assertEqual(self.votes(), [1, 0, 0])
+
+
+@override_settings(POLLS_VOTE_COUNTER_SHARDS=4)
+class CounterShardTest(TestCase):
+    """Class for testing the striped vote counters."""
+
+    def setUp(self):
+        """Set up the users and the question."""
+        self.users = [get_user_model().objects.create_user("voter%d" % number) for number in range(20)]
+        self.question = create_question('This is a question', 2)
+        self.first, self.second = self.question.choice_set.order_by('pk')
+
+    def tallies(self):
+        """Return the tally of every choice of the question."""
+        return list(self.question.choice_set.with_tally().order_by('pk').values_list('tally', flat=True))
+
+    def test_votes_go_to_shards(self):
+        """Check that the votes are counted in the shards and summed by with_tally()."""
+        for user in self.users:
+            record_vote(user, self.question, self.first)
+        record_vote(self.users[0], self.question, self.second)
+        self.assertEqual(Choice.objects.get(pk=self.first.pk).votes, 0)
+        self.assertLessEqual(ChoiceCounterShard.objects.filter(choice=self.first).count(), 4)
+        self.assertEqual(self.tallies(), [19, 1])
+        self.assertEqual([choice['votes'] for choice in get_snapshot(self.question.id)['choices']], [19, 1])
+
+    def test_compact(self):
+        """Check that the compaction moves the shards into Choice.votes and keeps the tally."""
+        for user in self.users[:5]:
+            record_vote(user, self.question, self.second)
+        self.assertEqual(compact_counters(), 1)
+        self.assertEqual(list(self.question.choice_set.order_by('pk').values_list('votes', flat=True)), [0, 5])
+        self.assertFalse(ChoiceCounterShard.objects.exclude(delta=0).exists())
+        self.assertEqual(self.tallies(), [0, 5])
+        self.assertEqual(reconcile_tallies(), [])
+
+    def test_freeze_compacts(self):
+        """Check that the frozen results count the votes of the shards."""
+        for user in self.users[:3]:
+            record_vote(user, self.question, self.first)
+        Question.objects.filter(pk=self.question.pk).update(end_date=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(freeze_question(self.question.id).total, 3)
@@ -0,0 +1,120 @@
+"""Module for testing the import and the export of the polls."""
+import csv
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from polls.archive import freeze_question
+from polls.models import Question, Choice
+from polls.tally import record_vote
+from polls.transfer import anonymize, import_questions, read_csv
+
+
+def create_question(question_text, choices):
+    """Create the sample question that can vote.
+
+    Parameters
+    ----------
+    question_text : str
+        Text of the sample question
+    choices : int
+        Number of the choices of the question
+    """
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() - datetime.timedelta(days=1),
+                                       end_date=timezone.now() + datetime.timedelta(days=1))
+    for number in range(choices):
+        question.choice_set.create(choice_text='Choice %d' % number)
+    return question
+
+
+class ImportTest(TestCase):
+    """Class for testing the import of the polls."""
+
+    def test_import_csv_chunks(self):
+        """Check that every question gets its own choices across the chunks."""
+        lines = ['question_text,pub_date,end_date,choice_text',
+                 'First,2026-01-01T00:00:00,2026-02-01T00:00:00,A',
+                 'First,2026-01-01T00:00:00,2026-02-01T00:00:00,B',
+                 'Second,,,C',
+                 'Third,2026-01-01T00:00:00+00:00,,D']
+        with self.assertNumQueries(10):
+            self.assertEqual(import_questions(read_csv(lines), chunk_size=2), (3, 4))
+        choices = {question.question_text: sorted(question.choice_set.values_list('choice_text', flat=True))
+                   for question in Question.objects.all()}
+        self.assertEqual(choices, {'First': ['A', 'B'], 'Second': ['C'], 'Third': ['D']})
+        third = Question.objects.get(question_text='Third')
+        self.assertEqual(third.end_date - third.pub_date, datetime.timedelta(days=1))
+
+    def test_import_jsonl_command(self):
+        """Check that the command imports a JSONL file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'polls.jsonl')
+            with open(path, 'w') as file:
+                file.write(json.dumps({'question_text': 'Tea?', 'choices': ['Yes', 'No']}) + '\n\n')
+            out = StringIO()
+            call_command('import_polls', path, stdout=out)
+        self.assertIn('Imported 1 question(s) and 2 choice(s).', out.getvalue())
+        self.assertEqual(Choice.objects.filter(question__question_text='Tea?').count(), 2)
+
+
+class ExportTest(TestCase):
+    """Class for testing the export of the polls."""
+
+    def setUp(self):
+        """Set up the voted question for testing the export."""
+        self.user = get_user_model().objects.create_user("Pazcal", password="782543", is_staff=True,
+                                                         is_superuser=True)
+        self.question = create_question('This is a question', 2)
+        self.first = self.question.choice_set.order_by('pk')[0]
+        record_vote(self.user, self.question, self.first)
+
+    def test_export_round_trip(self):
+        """Check that the questions export has the tallies and can be imported again."""
+        out = StringIO()
+        call_command('export_polls', 'questions', stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual([(row['choice_text'], row['votes']) for row in rows], [('Choice 0', '1'), ('Choice 1', '0')])
+        self.assertEqual(import_questions(read_csv(StringIO(out.getvalue()))), (1, 2))
+
+    def test_export_anonymous_votes(self):
+        """Check that the anonymized votes export has no user id."""
+        out = StringIO()
+        call_command('export_polls', 'votes', '--format', 'jsonl', '--anonymize', stdout=out)
+        vote = json.loads(out.getvalue())
+        self.assertEqual(vote['choice_id'], self.first.pk)
+        self.assertEqual(vote['user'], anonymize(self.user.pk))
+        self.assertNotEqual(vote['user'], str(self.user.pk))
+        self.assertEqual(vote['switches'], 0)
+        self.assertIsNotNone(vote['cast_at'])
+        self.assertFalse(vote['archived'])
+
+    def test_export_archived_votes(self):
+        """Check that the votes moved to ArchivedVote by the freeze are still exported."""
+        other = create_question('Other question', 1)
+        record_vote(self.user, other, other.choice_set.get())
+        Question.objects.filter(pk=self.question.pk).update(end_date=timezone.now() - datetime.timedelta(minutes=1))
+        freeze_question(self.question.pk, archive_votes=True)
+        out = StringIO()
+        call_command('export_polls', 'votes', stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual([(int(row['question_id']), row['archived']) for row in rows],
+                         [(other.pk, 'False'), (self.question.pk, 'True')])
+        self.assertEqual(rows[1]['choice_id'], str(self.first.pk))
+
+    def test_admin_action(self):
+        """Check that the admin action streams the results of the selected questions."""
+        other = create_question('Other question', 1)
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('admin:polls_question_changelist'),
+                                    {'action': 'export_results', '_selected_action': [self.question.pk]})
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('This is a question', content)
+        self.assertNotIn(other.question_text, content)
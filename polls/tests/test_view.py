@@ -1,9 +1,12 @@
 """Module for using in tests."""
 import datetime
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.urls import reverse
 from polls.models import Question
+from polls.conditional import last_transition
 
 
 def create_question(question_text, days):
@@ -88,6 +91,48 @@ class QuestionIndexViewTests(TestCase):
             ['<Question: Past question 2.>', '<Question: Past question 1.>']
         )
 
+    @override_settings(POLLS_INDEX_PAGE_SIZE=2)
+    def test_keyset_pages(self):
+        """Check that the pages follow each other with the next page cursor."""
+        for days in range(1, 6):
+            create_question(question_text="Past question %d." % days, days=-days)
+        seen = []
+        url = reverse('polls:index')
+        while url:
+            response = self.client.get(url)
+            seen += [question.question_text for question in response.context['latest_question_list']]
+            cursor = response.context['next_cursor']
+            url = reverse('polls:index') + '?after=' + cursor if cursor else None
+        self.assertEqual(seen, ["Past question %d." % days for days in range(1, 6)])
+
+    def test_invalid_cursor(self):
+        """Check that an invalid cursor shows the first page."""
+        create_question(question_text="Past question.", days=-30)
+        response = self.client.get(reverse('polls:index') + '?after=not-a-cursor')
+        self.assertContains(response, "Past question.")
+
+    def test_is_open(self):
+        """Check that whether the question can vote is annotated by the database."""
+        question = create_question(question_text="Closed question.", days=-30)
+        question.end_date = timezone.now() - datetime.timedelta(days=1)
+        question.save()
+        create_question(question_text="Open question.", days=-1)
+        response = self.client.get(reverse('polls:index'))
+        states = {question.question_text: question.is_open for question in response.context['latest_question_list']}
+        self.assertEqual(states, {"Closed question.": False, "Open question.": True})
+
+    @override_settings(POLLS_INDEX_PAGE_SIZE=5)
+    def test_queries_do_not_depend_on_history(self):
+        """Check that the index takes the same queries however many questions there are."""
+        counts = []
+        for total in (5, 50):
+            for number in range(total - Question.objects.count()):
+                create_question(question_text="Past question %d." % number, days=-1)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('polls:index'))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
 
 class QuestionDetailViewTests(TestCase):
     """Class for testing the detail views."""
@@ -107,3 +152,35 @@ class QuestionDetailViewTests(TestCase):
         url = reverse('polls:detail', args=(past_question.id,))
         response = self.client.get(url)
         self.assertContains(response, past_question.question_text)
+
+    def test_past_question_queries(self):
+        """Check that the detail page loads the question and its choices in at most 2 queries."""
+        past_question = create_question(
+            question_text='Past Question.', days=-5)
+        for number in range(5):
+            past_question.choice_set.create(choice_text='Choice %d' % number)
+        url = reverse('polls:detail', args=(past_question.id,))
+        # The publish and close times of the ETag are read once per list version.
+        last_transition()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'Choice 4')
+        self.assertLessEqual(len(queries), 2)
+
+    def test_is_open_queries(self):
+        """Check that the detail page reads the question with its is_open in one query and the choices once."""
+        question = create_question(question_text='Past Question.', days=-5)
+        question.choice_set.create(choice_text='Choice')
+        closed = create_question(question_text='Closed Question.', days=-5)
+        closed.end_date = timezone.now() - datetime.timedelta(days=1)
+        closed.save()
+        last_transition()
+        url = reverse('polls:detail', args=(question.id,))
+        with self.assertNumQueries(2):
+            self.assertContains(self.client.get(url), 'Choice')
+        # The choices are then kept in their fragment.
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(url), 'Choice')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('polls:detail', args=(closed.id,)))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,193 @@
+"""Module for streaming the import and the export of the polls as CSV or JSONL."""
+import csv
+import datetime
+import json
+from itertools import islice
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from django.utils.dateparse import parse_datetime
+from .cache import bump_list_version
+from .models import Question, Choice, Vote, ArchivedVote
+
+FORMATS = ('csv', 'jsonl')
+EXPORT_HEADERS = {
+    'questions': ('question_id', 'question_text', 'pub_date', 'end_date', 'choice_id', 'choice_text', 'votes'),
+    'votes': ('vote_id', 'question_id', 'choice_id', 'user', 'cast_at', 'changed_at', 'switches', 'archived'),
+}
+
+
+class Echo:
+    """Class of the pseudo buffer that returns what is written, for streaming csv.writer rows."""
+
+    def write(self, value):
+        """Return the value instead of keeping it."""
+        return value
+
+
+def read_csv(lines):
+    """
+    Read the questions from CSV lines with one row per choice.
+
+    The columns are question_text, pub_date, end_date and choice_text, the
+    rows of one question follow each other and repeat its columns. An
+    optional question_id column tells apart the questions with the same
+    columns, so the questions export can be imported again.
+
+    Parameters
+    ----------
+    lines : iterable
+        the lines of the CSV with its header
+
+    Return:
+    generator of the question dicts, like the JSONL records.
+    """
+    record = current = None
+    for row in csv.DictReader(lines):
+        key = (row.get('question_id'), row['question_text'], row.get('pub_date') or '', row.get('end_date') or '')
+        if key != current:
+            if record is not None:
+                yield record
+            current = key
+            record = {'question_text': key[1], 'pub_date': key[2], 'end_date': key[3], 'choices': []}
+        if row.get('choice_text'):
+            record['choices'].append(row['choice_text'])
+    if record is not None:
+        yield record
+
+
+def read_jsonl(lines):
+    """Read the questions from JSONL lines like {"question_text", "pub_date", "end_date", "choices": [...]}."""
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def parse_date(value, default):
+    """Return the aware datetime of the ISO 8601 value, the default if it is empty."""
+    if not value:
+        return default
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError('Invalid date: %r' % value)
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def import_questions(records, chunk_size=1000):
+    """
+    Create the questions and their choices with one bulk_create per chunk.
+
+    Parameters
+    ----------
+    records : iterable
+        the question dicts made by read_csv() or read_jsonl()
+    chunk_size : int
+        number of the questions created at a time
+
+    Return:
+    tuple of the numbers of the created questions and choices.
+    """
+    records = iter(records)
+    created_questions = created_choices = 0
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return created_questions, created_choices
+        now = timezone.now()
+        questions = []
+        for record in chunk:
+            pub_date = parse_date(record.get('pub_date'), now)
+            end_date = parse_date(record.get('end_date'), pub_date + datetime.timedelta(days=1))
+            questions.append(Question(question_text=record['question_text'], pub_date=pub_date, end_date=end_date))
+        with transaction.atomic():
+            Question.objects.bulk_create(questions)
+            if questions[0].pk is None:
+                # The backend does not return the ids of bulk_create, the
+                # ids are increasing and the chunk is the latest one.
+                ids = Question.objects.order_by('-pk').values_list('pk', flat=True)[:len(questions)]
+                for question, pk in zip(questions, reversed(list(ids))):
+                    question.pk = pk
+            choices = [Choice(question=question, choice_text=text)
+                       for question, record in zip(questions, chunk) for text in record.get('choices', ())]
+            Choice.objects.bulk_create(choices)
+            # bulk_create sends no post_save, so the list is bumped here.
+            transaction.on_commit(bump_list_version)
+        created_questions += len(questions)
+        created_choices += len(choices)
+
+
+def anonymize(user_id):
+    """Return the stable pseudonym of the user id that can not be reversed without the SECRET_KEY."""
+    if user_id is None:
+        return ''
+    return salted_hmac('polls.transfer.anonymize', str(user_id)).hexdigest()[:16]
+
+
+def export_rows(kind, questions=None, anonymous=False, chunk_size=2000):
+    """
+    Read the rows of the export without keeping them in memory.
+
+    Parameters
+    ----------
+    kind : str
+        'questions' for every choice with its question and tally, 'votes' for the Vote rows
+        and then the ArchivedVote rows of the frozen questions, whose ids are their own
+    questions : QuerySet, optional
+        only export these questions
+    anonymous : bool
+        replace the user ids of the votes with pseudonyms
+    chunk_size : int
+        number of the rows fetched at a time
+
+    Return:
+    generator of the rows, in the columns of EXPORT_HEADERS[kind].
+    """
+    if kind == 'questions':
+        querysets = [Choice.objects.with_tally().order_by('question_id', 'pk').values_list(
+            'question_id', 'question__question_text', 'question__pub_date', 'question__end_date',
+            'pk', 'choice_text', 'tally')]
+    elif kind == 'votes':
+        fields = ('pk', 'question_id', 'selected_choice_id', 'user_id', 'cast_at', 'changed_at', 'switches')
+        querysets = [Vote.objects.order_by('pk').values_list(*fields),
+                     ArchivedVote.objects.order_by('pk').values_list(*fields)]
+    else:
+        raise ValueError('Unknown export: %r' % kind)
+    if questions is not None:
+        querysets = [rows.filter(question__in=questions) for rows in querysets]
+    for archived, rows in enumerate(querysets):
+        for row in rows.iterator(chunk_size=chunk_size):
+            if kind == 'votes':
+                if anonymous:
+                    row = row[:3] + (anonymize(row[3]),) + row[4:]
+                row += (bool(archived),)
+            yield row
+
+
+def encode(rows, header, fmt):
+    """
+    Encode the rows line by line.
+
+    Parameters
+    ----------
+    rows : iterable
+        the rows made by export_rows()
+    header : tuple
+        the names of the columns
+    fmt : str
+        'csv' or 'jsonl'
+
+    Return:
+    generator of the text lines.
+    """
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+    elif fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(dict(zip(header, row)), default=str) + '\n'
+    else:
+        raise ValueError('Unknown format: %r' % fmt)
@@ -7,6 +7,9 @@ urlpatterns = [
     path('', views.IndexView.as_view(), name='index'),
     path('<int:pk>/', views.DetailView.as_view(), name='detail'),
     path('<int:pk>/results/', views.ResultsView.as_view(), name='results'),
+    path('<int:pk>/results/stream/', views.results_stream, name='results_stream'),
+    path('<int:pk>/analytics/', views.analytics, name='analytics'),
+    path('metrics/', views.metrics, name='metrics'),
     path('<int:question_id>/vote/', views.vote, name='vote'),
     # path('specifics/<int:question_id>/', views.detail, name = 'detail'),
 
@@ -1,49 +1,111 @@
 """Module for using in views."""
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 # from django.http import Http404
 from django.views import generic
 from django.utils import timezone
 from django.urls import reverse
 from django.contrib import messages
 from django.core.exceptions import ObjectDoesNotExist
-from .models import Question, Choice, Vote
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from .models import Question, Choice
+from .tally import record_vote
+from .previous import previous_votes, remember_vote
+from .results import get_snapshot
+from .cache import content_key, content_version, question_versions
+from .buffer import is_buffered, vote_buffer
+from .pagination import after_cursor, encode_cursor
+from .stream import snapshot_event
+from .metrics import registry
+from .admission import admit_vote
+from .audit import audit, dropped
+from .conditional import index_etag, detail_etag, results_etag
+from .analytics import get_series
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from datetime import datetime
 from django.dispatch import receiver
 from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
 import logging
 
+# The pages are revalidated on every visit, an unchanged one costs a 304.
+revalidate = cache_control(private=True, no_cache=True)
 
+
+@method_decorator([revalidate, condition(etag_func=index_etag)], name='dispatch')
 class IndexView(generic.ListView):
     """The view of index pages.
 
     Methods
     -------
     get_queryset():
-        get all the question order by pub_date
+        get one page of the question order by pub_date
+
+    get_context_data():
+        add the cursor of the next page, the previous vote of the user and the version to every question
 
     """
 
     template_name = 'polls/index.html'
     context_object_name = 'latest_question_list'
 
+    def get_page_size(self):
+        """Return the number of the questions on one page, set by POLLS_INDEX_PAGE_SIZE."""
+        return getattr(settings, 'POLLS_INDEX_PAGE_SIZE', 20)
+
     def get_queryset(self):
-        """Return all the question sort by published date."""
-        return Question.objects.filter(pub_date__lte=timezone.now()).order_by('-pub_date')
+        """
+        Return the page of the question sort by published date after the cursor.
+
+        The page is found with the (pub_date, id) of the last question of
+        the previous page instead of an offset, so every page costs the
+        same however many questions there are. One more question than the
+        page size is fetched to know if there is a next page, and whether
+        the question can vote is computed by the database as is_open.
+        """
+        now = timezone.now()
+        queryset = Question.objects.published(now).with_is_open(now).order_by('-pub_date', '-id')
+        queryset = after_cursor(queryset, self.request.GET.get('after'))
+        return queryset[:self.get_page_size() + 1]
 
+    def get_context_data(self, **kwargs):
+        """
+        Add the cursor of the next page and the previous vote of the user to every listed question.
 
+        The version of every question is added too, it keys the cached
+        fragment of its row in the template.
+        """
+        questions = list(self.object_list)
+        page_size = self.get_page_size()
+        next_cursor = encode_cursor(questions[page_size - 1]) if len(questions) > page_size else None
+        self.object_list = questions[:page_size]
+        context = super().get_context_data(object_list=self.object_list, **kwargs)
+        context['next_cursor'] = next_cursor
+        votes = previous_votes(self.request)
+        versions = question_versions([question.id for question in self.object_list], content_key)
+        for question in context['latest_question_list']:
+            question.previous_vote = votes.get(question.id, "")
+            question.content_version = versions[question.id]
+        return context
+
+
+@method_decorator([revalidate, condition(etag_func=detail_etag)], name='dispatch')
 class DetailView(generic.DetailView):
     """The view of detail pages.
 
     Methods
     -------
     get():
-        get the question from the request
+        get the question and its choices from the request
 
     get_queryset()
         get all the question order by pub_date
 
+    get_context_data()
+        add the previous vote of the user and the version of the question
+
     """
 
     model = Question
@@ -53,6 +115,9 @@ class DetailView(generic.DetailView):
         """
         Get the question from the request.
 
+        The question is loaded once. Its choices are only read by the
+        template when the cached fragment of the choice list has expired.
+
         Parameters
         ----------
         request : HttpRequest
@@ -64,74 +129,141 @@ class DetailView(generic.DetailView):
             If the poll does not exist.
         """
         try:
-            question = Question.objects.get(pk=kwargs['pk'])
-            if not question.can_vote():
+            question = Question.objects.with_is_open().get(pk=kwargs['pk'])
+            if not question.is_open:
                 return HttpResponseRedirect(reverse('polls:index'),
                                             messages.error(request, "This poll is already closed. Can't vote!!!"))
         except ObjectDoesNotExist:
             return HttpResponseRedirect(reverse('polls:index'), messages.error(request, "This poll is not exist."))
-        self.object = self.get_object()
-        return self.render_to_response(self.get_context_data(object=self.get_object()))
+        self.object = question
+        return self.render_to_response(self.get_context_data(object=question))
 
     def get_queryset(self):
-        """Return all the question sort by published date."""
-        return Question.objects.filter(pub_date__lte=timezone.now())
+        """Return all the published question."""
+        return Question.objects.published()
+
+    def get_context_data(self, **kwargs):
+        """Add the previous vote of the user and the version that keys the cached choice list."""
+        context = super().get_context_data(**kwargs)
+        context['previous_vote'] = previous_votes(self.request).get(self.object.id, "")
+        context['content_version'] = content_version(self.object.id)
+        return context
 
 
+@method_decorator([revalidate, condition(etag_func=results_etag)], name='dispatch')
 class ResultsView(generic.DetailView):
-    """The view of the result page."""
+    """The view of the result page.
+
+    Methods
+    -------
+    get_context_data()
+        add the cached results snapshot of the question
+
+    """
 
     model = Question
     template_name = 'polls/result.html'
 
+    def get_context_data(self, **kwargs):
+        """Add the results snapshot, so the choices are not read on a cache hit."""
+        context = super().get_context_data(**kwargs)
+        context['results'] = get_snapshot(self.object.id)
+        return context
+
+
+def results_stream(request, pk):
+    """
+    Send the results snapshot as one server-sent event.
+
+    The live stream is served by polls.stream.ResultsStreamApp on the
+    ASGI app. This view answers the same url under WSGI, and the retry
+    field makes a client that still opens it poll it again after
+    POLLS_STREAM_FALLBACK_RETRY seconds.
+    """
+    question = get_object_or_404(Question, pk=pk)
+    retry = int(1000 * getattr(settings, 'POLLS_STREAM_FALLBACK_RETRY', 30))
+    response = HttpResponse(snapshot_event(get_snapshot(question.id), retry=retry), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@staff_member_required
+def metrics(request):
+    """Show the request metrics of the polls in the Prometheus text format, for the admins only."""
+    lines = ['# HELP polls_audit_dropped_total Audit records dropped because the queue was full.',
+             '# TYPE polls_audit_dropped_total counter',
+             'polls_audit_dropped_total %d' % dropped()]
+    return HttpResponse(registry.prometheus() + '\n'.join(lines) + '\n',
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@staff_member_required
+def analytics(request, pk):
+    """
+    Send the vote time series of the question as JSON, for the admins only.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request from user, ?bucket= sets the seconds of one bucket
+    pk : int
+        id of the question
+
+    Return:
+    the JSON response of the series.
+    """
+    question = get_object_or_404(Question, pk=pk)
+    try:
+        bucket = int(request.GET.get('bucket', 60))
+    except ValueError:
+        bucket = 60
+    return JsonResponse(get_series(question, min(max(bucket, 1), 7 * 24 * 3600)))
+
 
-log = logging.getLogger("polls")
 logging.basicConfig(level=logging.INFO)
 
 
 def get_client_ip(request):
-    """Get the client ip."""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+    """
+    Get the client ip.
 
+    The client sets X-Forwarded-For as it likes, so it is only read behind
+    POLLS_TRUSTED_PROXIES proxies, which each append the address that
+    connected to them. The client is then the address appended by the
+    first of them, otherwise it is REMOTE_ADDR.
 
-@receiver(user_logged_in)
-def update_choice_login(request, **kwargs):
-    """Update the previous vote when login."""
-    for question in Question.objects.all():
-        try:
-            question.previous_vote = str(request.user.vote_set.get(question=question).selected_choice)
-            question.save()
-        except(Vote.DoesNotExist):
-            pass
+    Parameters
+    ----------
+    request : HttpRequest
+        The request from user
+
+    Return:
+    the client ip.
+    """
+    proxies = getattr(settings, 'POLLS_TRUSTED_PROXIES', 0)
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and x_forwarded_for:
+        addresses = [address.strip() for address in x_forwarded_for.split(',')]
+        return addresses[-min(proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR')
 
 
 @receiver(user_logged_in)
 def log_user_logged_in(sender, request, user, **kwargs):
-    """Log info when user login."""
-    ip = get_client_ip(request)
-    date = datetime.now()
-    log.info('Login user: %s , IP: %s , Date: %s', user, ip, str(date))
+    """Audit the login of the user."""
+    audit('login', user, get_client_ip(request))
 
 
 @receiver(user_logged_out)
 def log_user_logged_out(sender, request, user, **kwargs):
-    """Log info when user logout."""
-    ip = get_client_ip(request)
-    date = datetime.now()
-    log.info('Logout user: %s , IP: %s , Date: %s', user, ip, str(date))
+    """Audit the logout of the user."""
+    audit('logout', user, get_client_ip(request))
 
 
 @receiver(user_login_failed)
 def log_user_login_failed(sender, request, credentials, **kwargs):
-    """Log info when the login failed."""
-    ip = get_client_ip(request)
-    date = datetime.now()
-    log.warning('Login user(failed): %s , IP: %s , Date: %s', credentials['username'], ip, str(date))
+    """Audit the failed login."""
+    audit('login failed', credentials.get('username'), get_client_ip(request) if request is not None else None)
 
 
 @login_required()
@@ -139,6 +271,9 @@ def vote(request, question_id):
     """
     Vote the selected question.
 
+    The request first passes polls.admission.admit_vote(), which answers
+    the same re-vote from the cache and the flooding clients with 429.
+
     Parameters
     ----------
     request : HttpRequest
@@ -153,6 +288,9 @@ def vote(request, question_id):
         If the user enter the incorrect key
     """
     user = request.user
+    rejected = admit_vote(request, question_id, get_client_ip(request))
+    if rejected is not None:
+        return rejected
     question = get_object_or_404(Question, pk=question_id)
     if not question.can_vote():
         return HttpResponseRedirect(reverse('polls:index'))
@@ -162,19 +300,13 @@ def vote(request, question_id):
         return render(
             request,
             'polls/detail.html',
-            {'question': question, 'error_message': "You didn't select a choice.", })
+            {'question': question, 'content_version': content_version(question.id),
+             'error_message': "You didn't select a choice.", })
     else:
-        Vote.objects.update_or_create(user=user, question=question, defaults={'selected_choice': selected_choice})
-        for choice in question.choice_set.all():
-            choice.votes = Vote.objects.filter(question=question).filter(selected_choice=choice).count()
-            choice.save()
-        if Vote.objects.filter(question=question).filter(selected_choice=choice).count() == 0:
-            selected_choice.votes += 1
-            selected_choice.save()
-        for question in Question.objects.all():
-            question.previous_vote = str(request.user.vote_set.get(question=question).selected_choice)
-            question.save()
-        date = datetime.now()
-        log = logging.getLogger("polls")
-        log.info("User: %s, Poll's ID: %d, Date: %s.", user, question_id, str(date))
+        if is_buffered():
+            vote_buffer.add(user.id, question.id, selected_choice.id)
+        else:
+            record_vote(user, question, selected_choice)
+        remember_vote(request, question.id, selected_choice)
+        audit('vote', user, get_client_ip(request), question.id)
         return HttpResponseRedirect(reverse('polls:results', args=(question.id,)))